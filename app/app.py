@@ -1,18 +1,102 @@
-from app.config import settings
-from fastapi import FastAPI, File, UploadFile, WebSocket, WebSocketDisconnect, BackgroundTasks
+from app.config import LazyObject, settings
+from fastapi import FastAPI, File, UploadFile, WebSocket, WebSocketDisconnect, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
+import asyncio
+import os
 import uuid
-import mammoth
 import re
-from io import BytesIO
-import uvicorn
+import html
+import logging
+import json
+from contextlib import asynccontextmanager
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 # modules
-from app.services.llm import summarize_text
-from app.services.notifier import send_email_notification
-from app.services.notion import create_notion_page
+from app.services.logs import configure_logging
+from app.services.metrics import track_job, observe_stage, register_stats, register_job_stats, JOB_SECONDS
+from app.services.llm import summarize_text, summarize_text_stream, get_cached_summary, acquire_llm_tokens, summary_cache, structured_output_stats, get_gemini_client, close_gemini_client
+from app.services.notifier import send_email_notification, get_email_transport, outbox
+from app.services.notion import (
+    create_page as create_notion_page_properties, update_page as update_notion_page_properties, find_page_by_slug,
+    append_page_content, sync_page_content, get_notion_client, close_notion_client, is_not_found,
+)
+from app.services.cache import content_key
+from app.services.publish_index import PublishIndex
+from app.services.pipeline import Pipeline, Stage, PipelineCancelled
+from app.services.resilience import CircuitOpen
+from app.services.jobs import create_job_store, step_completed, stage_limits, WorkerPool
+from app.services.batches import BatchTracker
+from app.services.assets import asset_store
+from app.services.progress import hub
+from app.services.read_files import file_extension, is_supported
+from app.services.conversion import (
+    convert_to_html, spool_upload, extract_documents, start_conversion_pool, conversion_pool_ready, stop_conversion_pool,
+    unsupported_error, UploadTooLarge, ConversionError, ConversionTimeout,
+)
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Set once the conversion workers are up and the API clients are created (see /ready)
+app_ready = asyncio.Event()
+_warm_up_task = None
+
+
+def create_clients():
+    # Importing the SDKs is the slow part (~0.5s), so this runs in a thread after startup
+    get_gemini_client()
+    get_notion_client()
+    get_email_transport()
+
+
+async def warm_up():
+    start = asyncio.get_running_loop().time()
+    clients = asyncio.to_thread(create_clients)
+    results = await asyncio.gather(conversion_pool_ready(), clients, return_exceptions=True)
+    for error in results:
+        if isinstance(error, Exception):
+            # e.g. a missing API key: jobs report it when they need the client
+            logger.error("Warm-up failed", extra={"error": str(error)})
+    app_ready.set()
+    logger.info("Ready", extra={"warm_up_seconds": round(asyncio.get_running_loop().time() - start, 3)})
+
+
+async def start_workers():
+    """Start serving right away; conversion workers and API clients warm up in the background."""
+    global _warm_up_task
+    # Here rather than at import: LOG_FORMAT and LOG_LEVEL are settings
+    configure_logging()
+    start_conversion_pool()
+    await hub.start()
+    await worker_pool.start()
+    _warm_up_task = asyncio.create_task(warm_up())
+
+
+async def close_clients():
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+        await asyncio.gather(_warm_up_task, return_exceptions=True)
+    # Batches still converting are dropped; their uploaded files are deleted
+    for task in batch_tasks:
+        task.cancel()
+    await asyncio.gather(*batch_tasks, return_exceptions=True)
+    await worker_pool.stop()
+    job_store.close()
+    await outbox.stop()
+    await hub.stop()
+    stop_conversion_pool()
+    await close_gemini_client()
+    await close_notion_client()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_workers()
+    yield
+    await close_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "https://rila-blog-agent.vercel.app",   # production frontend
@@ -31,70 +115,57 @@ app.add_middleware(
 
 
 # --------------------------------------------------------
-#  WebSocket connection manager
+# Helper: summary section
 # --------------------------------------------------------
-class JobConnectionManager:
-    def __init__(self):
-        # job_id => WebSocket
-        self.active_jobs: dict[str, WebSocket] = {}
-
-    async def connect(self, job_id: str, websocket: WebSocket):
-        await websocket.accept()
-        self.active_jobs[job_id] = websocket
-
-    def disconnect(self, job_id: str):
-        if job_id in self.active_jobs:
-            del self.active_jobs[job_id]
-
-    async def send_step(self, job_id: str, step: str, detail: str = ""):
-        """
-        Send JSON timeline event to client.
-        React expects: { step, detail, timestamp }
-        """
-        if job_id not in self.active_jobs:
-            return
+def insert_summary_html(html_content: str, summary: str) -> str:
+    """Prepend the AI summary section to the article HTML."""
+    return f"<h2>Summary</h2><p>{html.escape(summary)}</p>" + html_content
 
-        ws = self.active_jobs[job_id]
 
-        await ws.send_json({
-            "step": step,
-            "detail": detail,
-            "timestamp": __import__("datetime").datetime.utcnow().isoformat() + "Z"
-        })
+# Jobs wait here until the websocket sends "start"
+job_store = LazyObject(create_job_store)
+# job_id => Pipeline currently running it
+running_pipelines: dict[str, Pipeline] = {}
+# Jobs of batch uploads, grouped for progress and the digest email
+batch_tracker = LazyObject(lambda: BatchTracker(job_store, settings.BATCH_TTL_SECONDS))
+# Published pages, so a re-uploaded article updates its page (INCREMENTAL_PUBLISH)
+publish_index = LazyObject(lambda: PublishIndex(settings.PUBLISH_INDEX_DB_PATH if settings.INCREMENTAL_PUBLISH else ":memory:"))
 
-manager = JobConnectionManager()
 
-# --------------------------------------------------------
-# Helper: DOCX → HTML
-# --------------------------------------------------------
-def convert_docx_to_html(file_bytes: bytes) -> str:
-    docx_file = BytesIO(file_bytes)
-    result = mammoth.convert_to_html(docx_file)
-    return result.value
-
-pending_jobs = {}
+def title_from_filename(filename: str) -> str:
+    filename = os.path.splitext(os.path.basename(filename))[0]
+    return re.sub(r"[^A-Za-z0-9 ]+", "", filename)
 # --------------------------------------------------------
 # Upload endpoint expected by React frontend
 # --------------------------------------------------------
 @app.post("/upload")
-async def upload_docx(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
-    if not file.filename.endswith(".docx"):
-        return {"error": "Only .docx files supported."}
+async def upload_docx(file: UploadFile = File(...), background_tasks: BackgroundTasks = None, no_cache: bool = False):
+    if not is_supported(file.filename):
+        return {"error": unsupported_error()}
 
     # Create job_id for WebSocket
     job_id = str(uuid.uuid4())
 
-    filename = file.filename.replace(".docx", "")
-    filename = re.sub(r"[^A-Za-z0-9 ]+", "", filename)
+    filename = title_from_filename(file.filename)
 
-    file_bytes = await file.read()
-    html_content = convert_docx_to_html(file_bytes)
+    # Stream the upload to disk, then convert it in the process pool
+    try:
+        path = await spool_upload(file, suffix=file_extension(file.filename))
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
 
-    # store job in memory; wait for websocket "start" msg
-    pending_jobs[job_id] = {
-        "title": filename,
-        "html": html_content
-    }
+    try:
+        with track_job() as timings:
+            html_content = await convert_to_html(path, file.filename)
+    except ConversionTimeout as e:
+        return JSONResponse({"error": str(e)}, status_code=504)
+    except ConversionError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    finally:
+        os.unlink(path)
+
+    # store job; wait for websocket "start" msg
+    job_store.create(job_id, title=filename, html=html_content, bypass_cache=no_cache, timings=timings)
 
     # Background processing
     # background_tasks.add_task(run_processing_pipeline, job_id, filename, html_content)
@@ -109,87 +180,591 @@ async def upload_docx(file: UploadFile = File(...), background_tasks: Background
 
 
 # --------------------------------------------------------
-# 🔥 Background Pipeline (Sends events to WebSocket)
+# Batch upload: many .docx files (or zip archives), no websocket needed
+# --------------------------------------------------------
+# Background conversions of batch uploads, kept referenced until they finish
+batch_tasks: set[asyncio.Task] = set()
+
+
+def new_batch(rejected: list[dict]) -> dict:
+    """Start a batch under a new id; `rejected` is the { filename, error } of inputs already skipped."""
+    batch = batch_tracker.create(str(uuid.uuid4()))
+    for item in rejected:
+        batch_tracker.reject(batch["id"], item["filename"], item["error"])
+    return batch
+
+
+async def queue_batch(batch: dict, documents: list[tuple[str, str]], **fields):
+    """
+    Convert documents in parallel and queue each one as a job of the batch as soon as its
+    conversion finishes, then seal the batch.
+
+    Parameters:
+    - documents (list[tuple[str, str]]): (filename, path of the document); the caller deletes the files.
+    - fields: Extra fields stored on every job (e.g. bypass_cache).
+    """
+    async def convert_and_queue(filename, path):
+        try:
+            with track_job() as timings:
+                html_content = await convert_to_html(path, filename)
+        except ConversionError as e:
+            batch_tracker.reject(batch["id"], filename, str(e))
+            return
+        job_id = str(uuid.uuid4())
+        job_store.create(job_id, title=title_from_filename(filename), html=html_content, batch_id=batch["id"],
+                         timings=timings, **fields)
+        batch_tracker.add_job(batch["id"], job_id)
+        worker_pool.submit(job_id)
+
+    await asyncio.gather(*(convert_and_queue(*doc) for doc in documents))
+    await batch_tracker.seal(batch["id"])
+
+    logger.info("Batch queued", extra={"batch_id": batch["id"], "jobs": len(batch["job_ids"]), "rejected": len(batch["rejected"])})
+
+
+async def create_batch(documents: list[tuple[str, str]], rejected: list[dict], **fields) -> dict:
+    """Convert and queue documents under a new batch (see queue_batch); returns once every job is queued."""
+    batch = new_batch(rejected)
+    await queue_batch(batch, documents, **fields)
+    return batch
+
+
+async def convert_batch_in_background(batch: dict, documents: list[tuple[str, str]], **fields):
+    """queue_batch for an upload that was already answered; deletes the documents' files."""
+    try:
+        await queue_batch(batch, documents, **fields)
+    except Exception as e:
+        logger.error("Batch conversion failed", extra={"batch_id": batch["id"], "error": str(e)})
+    finally:
+        for _, path in documents:
+            os.unlink(path)
+
+
+@app.post("/upload/batch")
+async def upload_batch(files: list[UploadFile] = File(...), no_cache: bool = False):
+    # Sizes are known once the multipart body is parsed: refuse an oversized batch before spooling it
+    document_bytes = sum(file.size or 0 for file in files if not file.filename.endswith(".zip"))
+    if document_bytes > settings.BATCH_MAX_UPLOAD_BYTES:
+        return JSONResponse({"error": f"A batch's documents can total at most {settings.BATCH_MAX_UPLOAD_BYTES} bytes."}, status_code=413)
+
+    documents, rejected = [], []
+    document_bytes = 0
+    task = None
+    try:
+        for file in files:
+            if file.filename.endswith(".zip"):
+                path = await spool_upload(file, suffix=".zip", max_bytes=settings.BATCH_MAX_UPLOAD_BYTES)
+                try:
+                    extracted, skipped = await asyncio.to_thread(
+                        extract_documents, path, settings.BATCH_MAX_FILES - len(documents), settings.BATCH_MAX_UPLOAD_BYTES,
+                    )
+                finally:
+                    os.unlink(path)
+                documents += extracted
+                rejected += skipped
+            elif is_supported(file.filename):
+                path = await spool_upload(file, suffix=file_extension(file.filename))
+                documents.append((file.filename, path))
+                document_bytes += os.path.getsize(path)
+                if document_bytes > settings.BATCH_MAX_UPLOAD_BYTES:
+                    return JSONResponse({"error": f"A batch's documents can total at most {settings.BATCH_MAX_UPLOAD_BYTES} bytes."}, status_code=413)
+            else:
+                rejected.append({"filename": file.filename, "error": unsupported_error()})
+
+            if len(documents) > settings.BATCH_MAX_FILES:
+                return JSONResponse({"error": f"A batch can contain at most {settings.BATCH_MAX_FILES} documents."}, status_code=413)
+
+        batch = new_batch(rejected)
+        # Convert and queue after responding: a large batch would otherwise hold the response for minutes
+        task = asyncio.create_task(convert_batch_in_background(batch, documents, bypass_cache=no_cache))
+        batch_tasks.add(task)
+        task.add_done_callback(batch_tasks.discard)
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    finally:
+        if task is None:
+            for _, path in documents:
+                os.unlink(path)
+
+    return {
+        "batch_id": batch["id"],
+        "status_path": f"/batch/{batch['id']}",
+        "documents": len(documents),
+        "rejected": batch["rejected"],
+        "status": "processing",
+    }
+
+
+@app.get("/batch/{batch_id}")
+def batch_status(batch_id: str):
+    progress = batch_tracker.progress(batch_id)
+    if progress is None:
+        return JSONResponse({"error": "Batch not found"}, status_code=404)
+    return progress
+
+
+# --------------------------------------------------------
+# 🔥 Background Pipeline (publishes events to the progress hub)
 # --------------------------------------------------------
+# Fields reported on the timeline as soon as they are streamed
+STREAMED_SUMMARY_FIELDS = {"slug": "Slug", "seo_keywords": "SEO keywords"}
+
+
+async def report_summary_progress(job_id: str, received: int):
+    hub.publish(job_id, "Step 2: Summarizing", f"Received {received} bytes from Gemini")
+
+
+async def report_summary_field(job_id: str, key: str, value):
+    if key in STREAMED_SUMMARY_FIELDS:
+        hub.publish(job_id, "Step 2: Metadata ready", f"{STREAMED_SUMMARY_FIELDS[key]}: {value}")
+
+
+# Page properties that come from the summary
+SUMMARY_PAGE_FIELDS = ("slug", "seo_keywords", "cover_imgUrl", "ai_summary")
+
+
+def body_hash(html_content: str) -> str:
+    # The summary mode is part of it: a summary made in the other mode doesn't fit
+    return content_key(settings.SUMMARY_MODE, html_content)
+
+
+def published_summary(llm_response: dict) -> dict:
+    """The summary as recorded in the publish index (without the locally inserted summary section)."""
+    if settings.SUMMARY_MODE == "metadata":
+        return {key: value for key, value in llm_response.items() if key != "html_content"}
+    return llm_response
+
+
+def unchanged_summary(html_content: str) -> dict | None:
+    """
+    The summary of the page published from this same article body, if any (INCREMENTAL_PUBLISH).
+    The slug is only known once the article is summarized, so the page is found by its body hash;
+    its summary is reused only if it names the slug the page is indexed under, which then keys
+    the page update and the index writes.
+    """
+    if not settings.INCREMENTAL_PUBLISH:
+        return None
+    published = publish_index.find_by_body(body_hash(html_content))
+    if published and published["summary"] and published["summary"].get("slug") == published["slug"]:
+        return published["summary"]
+    return None
+
+
+async def find_published_page(slug: str, title: str) -> dict | None:
+    """The page published under `slug`, from the publish index or else looked up in Notion."""
+    published = publish_index.get(slug)
+    if published is None:
+        async with stage_limits["notion"]:
+            page = await find_page_by_slug(slug)
+        if page is None:
+            return None
+        publish_index.save_page(slug, title, page["id"], page["url"])
+        published = publish_index.get(slug)
+    return published
+
+
 async def run_processing_pipeline(job_id: str, title: str, html_content: str):
+    r"""
+    Run the pipeline for a job as a graph of stages, checkpointing every stage in the
+    job store so a restarted job resumes after its completed stages:
+
+        summarize -> create_page -> append_content
+                                 \-> email
+    """
+    job = job_store.get(job_id) or job_store.create(job_id, title=title, html=html_content)
+    # Continue the job's event sequence if it ran on another process before
+    await hub.load(job_id)
+
     # Notify step 1
-    await manager.send_step(job_id, "Step 1: Created HTML", f"Extracted HTML from DOCX")
+    hub.publish(job_id, "Step 1: Created HTML", "Extracted HTML from the uploaded document")
 
     # Step 2 — LLM Summary
-    await manager.send_step(job_id, "Step 2: Summarizing", "Calling Gemini...")
-
-    llm_response = await summarize_text(
-        title=title,
-        html_content=html_content
-    )
+    async def summarize(_):
+        if step_completed(job, "summarized"):
+            hub.publish(job_id, "Step 2: Summary created", "Gemini summary completed")
+            return job["result"]["llm_response"]
+
+        llm_response, summary_detail = None, "Gemini summary completed"
+        if not job.get("bypass_cache"):
+            llm_response = unchanged_summary(html_content)
+            summary_detail = "Article unchanged: reused the summary of its published page"
+            if llm_response is None:
+                llm_response = get_cached_summary(title, html_content)
+                summary_detail = "Cache hit: reused previous Gemini summary"
+
+        if llm_response is None:
+            summary_detail = "Gemini summary completed"
+            hub.publish(job_id, "Step 2: Summarizing", "Calling Gemini...")
+
+            async with stage_limits["llm"]:
+                await acquire_llm_tokens(html_content)
+                if settings.GEMINI_STREAMING and settings.SUMMARY_MODE == "full":
+                    llm_response = await summarize_text_stream(
+                        title=title,
+                        html_content=html_content,
+                        on_progress=lambda received: report_summary_progress(job_id, received),
+                        on_field=lambda key, value: report_summary_field(job_id, key, value),
+                    )
+                else:
+                    llm_response = await summarize_text(
+                        title=title,
+                        html_content=html_content
+                    )
+
+        if settings.SUMMARY_MODE == "metadata":
+            # Gemini only wrote the metadata; the article body is the mammoth HTML
+            llm_response = {**llm_response, "html_content": insert_summary_html(html_content, llm_response["ai_summary"])}
+
+        job_store.complete_step(job_id, "summarized", llm_response=llm_response)
+        hub.publish(job_id, "Step 2: Summary created", summary_detail)
+        return llm_response
+
+    # Step 3 — Notion page (properties only; the body is appended by the next stage)
+    async def create_page(results):
+        if step_completed(job, "page_created"):
+            page = job["result"]["notion_page"]
+        else:
+            llm_response = results["summarize"]
+            slug = llm_response["slug"]
+            published = await find_published_page(slug, title) if settings.INCREMENTAL_PUBLISH else None
+            properties = dict(
+                title=title,
+                slug=slug,
+                ai_summary=llm_response["ai_summary"],
+                seo_keywords=llm_response["seo_keywords"],
+                coverImg=llm_response["cover_imgUrl"],
+            )
+
+            if published is not None:
+                hub.publish(job_id, "Step 3: Updating Notion page", published["url"])
+                # Re-uploading the same article leaves the page (and its lastEditedAt) alone
+                previous = published["summary"] or {}
+                unchanged = published["body_hash"] == body_hash(html_content) and published["title"] == title and all(
+                    previous.get(field) == llm_response[field] for field in SUMMARY_PAGE_FIELDS
+                )
+                try:
+                    if not unchanged:
+                        async with stage_limits["notion"]:
+                            await update_notion_page_properties(published["page_id"], **properties)
+                except Exception as e:
+                    if not is_not_found(e):
+                        raise
+                    # Deleted from Notion since it was indexed: publish a new page
+                    publish_index.forget(slug)
+                    published = None
+                else:
+                    page = {"id": published["page_id"], "url": published["url"], "updated": True}
+
+            if published is None:
+                hub.publish(job_id, "Step 3: Creating Notion page", "Sending data to Notion API")
+
+                async with stage_limits["notion"]:
+                    new_page = await create_notion_page_properties(**properties)
+
+                page = {"id": new_page["id"], "url": new_page["url"]}
+
+            if settings.INCREMENTAL_PUBLISH:
+                publish_index.save_page(slug, title, page["id"], page["url"])
+            job_store.complete_step(job_id, "page_created", notion_page=page)
+
+        hub.publish(job_id, "Step 3: Notion page updated" if page.get("updated") else "Step 3: Notion page created", page["url"])
+        return page
+
+    # Step 3b — article body, appended while the email goes out
+    async def append_content(results):
+        if step_completed(job, "content_appended"):
+            return
+        page, llm_response = results["create_page"], results["summarize"]
+        # The page was created by an earlier attempt, which may have written part of the body
+        resume = step_completed(job, "page_created")
+
+        if page.get("updated"):
+            blocks = None if resume else publish_index.get(llm_response["slug"])["blocks"]
+            # Until the sync succeeds the recorded blocks may no longer match the page:
+            # a later upload must fetch them from Notion instead of diffing against stale ones
+            publish_index.forget_blocks(llm_response["slug"])
+            async with stage_limits["notion"]:
+                try:
+                    counts, blocks = await sync_page_content(page["id"], llm_response["html_content"], blocks)
+                except Exception as e:
+                    if blocks is None or not is_not_found(e):
+                        raise
+                    # A recorded block was deleted in Notion: diff against the page as it is now
+                    counts, blocks = await sync_page_content(page["id"], llm_response["html_content"])
+            step = "Step 3: Notion content updated"
+            detail = (f"Updated {counts['updated']}, inserted {counts['inserted']} and deleted "
+                      f"{counts['deleted']} blocks in {counts['requests']} requests")
+        else:
+            async def checkpoint(appended):
+                job_store.save_result(job_id, blocks_appended=appended)
+
+            blocks = [] if settings.INCREMENTAL_PUBLISH else None
+            async with stage_limits["notion"]:
+                requests_made = await append_page_content(
+                    page["id"],
+                    llm_response["html_content"],
+                    appended=job["result"].get("blocks_appended", 0),
+                    resume=resume,
+                    on_progress=checkpoint,
+                    published=blocks,
+                )
+            step, detail = "Step 3: Notion content added", f"Appended blocks in {requests_made} requests"
+
+        if settings.INCREMENTAL_PUBLISH:
+            # Blocks of a resumed append are unknown; they are fetched from Notion on the next update
+            publish_index.save_content(
+                llm_response["slug"], body_hash(html_content), published_summary(llm_response), blocks or None,
+            )
+        job_store.complete_step(job_id, "content_appended")
+        hub.publish(job_id, step, detail)
+
+    # Step 4 — Email notification; only needs the page URL
+    async def email(results):
+        # Batch jobs are reported together in the batch's digest email
+        if step_completed(job, "emailed") or job.get("batch_id"):
+            return
+        hub.publish(job_id, "Step 4: Sending email", "Sending email confirmation...")
+
+        # The outbox bounds concurrent sends (EMAIL_CONCURRENCY) and may merge this email into a digest
+        await send_email_notification(title, results["create_page"]["url"])
+
+        job_store.complete_step(job_id, "emailed")
+
+    pipeline = Pipeline([
+        Stage("summarize", summarize, timeout=settings.SUMMARY_TIMEOUT_SECONDS),
+        Stage("create_page", create_page, after=["summarize"], timeout=settings.NOTION_TIMEOUT_SECONDS),
+        Stage("append_content", append_content, after=["summarize", "create_page"], timeout=settings.NOTION_TIMEOUT_SECONDS),
+        Stage("email", email, after=["create_page"], timeout=settings.EMAIL_TIMEOUT_SECONDS),
+    ])
+
+    running_pipelines[job_id] = pipeline
+    with track_job(job.get("timings")) as timings:
+        try:
+            await pipeline.run()
+        finally:
+            running_pipelines.pop(job_id, None)
+
+            report = pipeline.report()
+            for stage, seconds in report["stages"].items():
+                observe_stage(stage, seconds)
+            timings.update(critical_path=report["critical_path"], critical_path_seconds=report["critical_path_seconds"])
+            job_store.update(job_id, timings=timings)
+
+    JOB_SECONDS.observe(timings["critical_path_seconds"])
+    logger.info("Job finished", extra={"job_id": job_id, "timings": timings})
+
+    # The final event closes the job's websockets and event streams
+    if job.get("batch_id"):
+        # No email of its own: the page goes into the batch's digest once every job has finished
+        step = "Step 5: Published, the batch digest email will list it"
+    else:
+        step = f"Step 5: Email sent to {settings.EMAIL_TO}"
+    hub.publish(job_id, step, "Upload blog successfully!", final=True, timings=timings)
 
-    await manager.send_step(job_id, "Step 2: Summary created", "Gemini summary completed")
 
-    # Step 3 — Notion Page
-    await manager.send_step(job_id, "Step 3: Creating Notion page", "Sending data to Notion API")
+async def process_job(job: dict):
+    try:
+        html_content = job_store.payload(job["id"])
+        if html_content is None:
+            raise RuntimeError("The uploaded document of this job is no longer available")
+        await run_processing_pipeline(job["id"], job["title"], html_content)
+    except PipelineCancelled as e:
+        # Nobody is listening any more (except, possibly, an event stream)
+        hub.publish(job["id"], "Cancelled", str(e), final=True)
+        raise
+    except CircuitOpen as e:
+        # The worker pool queues the job again; completed steps are not repeated
+        hub.publish(job["id"], "Waiting", str(e))
+        raise
+    except Exception as e:
+        # Tell the client, then let the worker pool mark the job as failed
+        hub.publish(job["id"], "Error", str(e), final=True)
+        raise
+
+
+worker_pool = LazyObject(lambda: WorkerPool(
+    job_store, process_job, settings.JOB_WORKERS,
+    on_finished=batch_tracker.job_finished, lease_seconds=settings.JOB_LEASE_SECONDS,
+    pending_ttl=settings.JOB_PENDING_TTL_SECONDS,
+))
 
-    notion_response = await create_notion_page(
-        title=title,
-        slug=llm_response["slug"],
-        ai_summary=llm_response["ai_summary"],
-        seo_keywords=llm_response["seo_keywords"],
-        coverImg=llm_response["cover_imgUrl"],
-        html_content=llm_response["html_content"]
-    )
 
-    if notion_response["status"] == "success":
-        await manager.send_step(job_id, "Step 3: Notion page created", notion_response["url"])
+# --------------------------------------------------------
+# Progress: WebSockets with a Server-Sent Events fallback
+# --------------------------------------------------------
+# Seconds between SSE comments that keep idle proxies from closing the stream
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def start_job(job_id: str) -> str | None:
+    """Queue a pending job; returns why it was not queued, if it wasn't."""
+    job = job_store.get(job_id)
+    if job is None:
+        return "Job not found"
+    if job["status"] != "pending":
+        return f"Job already started: {job['status']}"
+    # A worker runs it even if the client goes away
+    if not worker_pool.submit(job_id):
+        return "Job already started: queued"
+    return None
+
+
+async def handle_socket_message(subscription, msg: str, default_job_id: str = ""):
+    """
+    Commands a client can send over its socket:
+    - "start": start the job of /ws/process/{job_id}
+    - {"action": "subscribe", "job_id": ..., "since": seq}: follow a job, replaying events after seq
+    - {"action": "unsubscribe", "job_id": ...}
+    - {"action": "start", "job_id": ...}
+    """
+    if msg == "start":
+        command = {"action": "start"}
     else:
-        await manager.send_step(job_id, "Error", "Failed to create Notion page")
+        try:
+            command = json.loads(msg)
+        except ValueError:
+            command = {}
+        if not isinstance(command, dict):
+            command = {}
+
+    job_id = str(command.get("job_id") or default_job_id)
+    action = command.get("action")
+    if not job_id:
+        hub.notify(subscription, job_id, "Error", "Missing job_id")
+    elif action == "start":
+        error = start_job(job_id)
+        if error:
+            hub.notify(subscription, job_id, "Error" if job_store.get(job_id) is None else "Job already started", error)
+    elif action == "subscribe":
+        try:
+            since = int(command.get("since", 0))
+        except (TypeError, ValueError):
+            since = 0
+        await hub.follow(subscription, job_id, since)
+    elif action == "unsubscribe":
+        hub.unsubscribe(subscription, job_id)
+    else:
+        hub.notify(subscription, job_id, "Error", f"Unknown command: {msg[:100]}")
 
-    # Step 4 — Email Notification
-    await manager.send_step(job_id, "Step 4: Sending email", "Sending email confirmation...")
-    send_email_notification(title, notion_response.get("url", ""))
 
-    await manager.send_step(job_id, f"Step 5: Email sent to {settings.EMAIL_TO}", "Upload blog successfully!")
+async def serve_progress_socket(websocket: WebSocket, job_id: str = "", since: int = 0, close_when_finished: bool = False):
+    """
+    Stream hub events to a socket from a separate sender task, so neither the pipeline
+    nor this socket's commands ever wait on the client's network.
+    """
+    subscription = await hub.connect(websocket)
+    if job_id:
+        hub.notify(subscription, job_id, "WebSocket connected", f"Job {job_id}")
+        await hub.follow(subscription, job_id, since)
+    sender = asyncio.create_task(hub.send_events(websocket, subscription, close_when_finished))
 
-    # Properly close WS
-    ws = manager.active_jobs.get(job_id)
-    if ws:
-        await ws.close()
-    manager.disconnect(job_id)
+    try:
+        while True:
+            await handle_socket_message(subscription, await websocket.receive_text(), job_id)
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away (or the sender closed the socket); jobs keep running without it
+        pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        abandoned = hub.unsubscribe_all(subscription)
+        if settings.CANCEL_ON_DISCONNECT:
+            for abandoned_id in abandoned:
+                if abandoned_id in running_pipelines:
+                    running_pipelines[abandoned_id].cancel("Client disconnected")
 
 
+@app.websocket("/ws/process/{job_id}")
+async def websocket_endpoint(websocket: WebSocket, job_id: str, since: int = 0):
+    # Reconnecting clients pass the last seq they received to replay what they missed
+    await serve_progress_socket(websocket, job_id, since, close_when_finished=True)
+
+
+@app.websocket("/ws/progress")
+async def progress_websocket(websocket: WebSocket):
+    # One socket for many jobs: the client sends "subscribe" commands
+    await serve_progress_socket(websocket)
+
+
+@app.post("/jobs/{job_id}/start")
+def start_job_endpoint(job_id: str):
+    # For clients following progress over /events instead of a websocket
+    error = start_job(job_id)
+    if error:
+        return JSONResponse({"error": error}, status_code=404 if job_store.get(job_id) is None else 409)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/events/{job_id}")
+async def job_events(job_id: str, since: int = 0, last_event_id: str | None = Header(None)):
+    """Server-Sent Events fallback: the same events as /ws/process/{job_id}, ending after the final one."""
+    if job_store.get(job_id) is None and job_id not in hub.jobs:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    if last_event_id and last_event_id.isdigit():
+        # Sent by EventSource when it reconnects
+        since = int(last_event_id)
+
+    subscription = hub.subscription()
+    await hub.follow(subscription, job_id, since)
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+                if event.get("final"):
+                    return
+        finally:
+            hub.unsubscribe(subscription, job_id)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 # --------------------------------------------------------
-# WebSocket endpoint
+# Images extracted from uploads
 # --------------------------------------------------------
-@app.websocket("/ws/process/{job_id}")
-async def websocket_endpoint(websocket: WebSocket, job_id: str):
-    await websocket.accept()
-    
-    # Register WS
-    manager.active_jobs[job_id] = websocket
+@app.get("/assets/{name}")
+def get_asset(name: str):
+    path = asset_store.path_for(name)
+    if path is None or not os.path.exists(path):
+        return JSONResponse({"error": "Asset not found"}, status_code=404)
+    # Names are content hashes, so the file never changes
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
-    # initial message
-    await manager.send_step(job_id, "WebSocket connected", f"Job {job_id}")
 
-    try:
-        while True:
-            try:
-                msg = await websocket.receive_text()
+# --------------------------------------------------------
+# Summary cache / LLM / job stats
+# --------------------------------------------------------
+@app.get("/cache/stats")
+def cache_stats():
+    return summary_cache.stats()
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    return structured_output_stats
 
-                if msg == "start":
-                    # Start pipeline ONLY NOW
-                    data = pending_jobs.pop(job_id, None)
-                    if data:
-                        title = data["title"]
-                        html_content = data["html"]
-                        await run_processing_pipeline(job_id, title, html_content)
-                    else:
-                        await manager.send_step(job_id, "Error", "Job not found")
-            except RuntimeError:
-                # WebSocket was closed
-                break
 
-    except WebSocketDisconnect:
-        manager.disconnect(job_id)
+@app.get("/jobs/stats")
+def job_stats():
+    return job_store.stats()
+
+
+# --------------------------------------------------------
+# Prometheus metrics
+# --------------------------------------------------------
+register_stats(summary_cache, structured_output_stats)
+register_job_stats(job_store)
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 # --------------------------------------------------------
@@ -200,5 +775,15 @@ def read_root():
     return {"message": "Welcome to RILA's Notion Blog Agent API!"}
 
 
+@app.get("/ready")
+def readiness():
+    # The platform routes traffic only once this returns 200
+    if not app_ready.is_set():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready"}
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app.app:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,75 @@
+"""
+Bulk import: publish many documents (.docx, .pdf, .md, .html, or zip archives of them) without the web UI.
+Uses the same job queue, rate limits and digest email as /upload/batch.
+
+    python -m app.cli posts/ more-posts.zip single-post.docx
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+
+def collect_documents(paths: list[str]):
+    """Expand directories and zip archives into (filename, path) pairs; returns (documents, rejected, temp paths)."""
+    from app.services.conversion import extract_documents, unsupported_error
+    from app.services.read_files import is_supported
+
+    documents, rejected, temp_paths = [], [], []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                documents += [(name, os.path.join(root, name)) for name in sorted(names) if is_supported(name)]
+        elif path.endswith(".zip"):
+            extracted, skipped = extract_documents(path)
+            documents += extracted
+            rejected += skipped
+            temp_paths += [tmp for _, tmp in extracted]
+        elif is_supported(path) and os.path.isfile(path):
+            documents.append((os.path.basename(path), path))
+        else:
+            rejected.append({"filename": path, "error": f"Not a directory or zip archive. {unsupported_error()}"})
+    return documents, rejected, temp_paths
+
+
+async def run(args) -> int:
+    from app.app import start_workers, close_clients, create_batch, batch_tracker
+
+    documents, rejected, temp_paths = collect_documents(args.paths)
+    if not documents:
+        print("No documents found.")
+        return 1
+
+    await start_workers()
+    try:
+        try:
+            batch = await create_batch(documents, rejected, bypass_cache=args.no_cache)
+        finally:
+            for path in temp_paths:
+                os.unlink(path)
+
+        waiter = asyncio.create_task(batch_tracker.wait(batch["id"]))
+        while not waiter.done():
+            progress = batch_tracker.progress(batch["id"])
+            print(f"{progress['finished']}/{progress['total']} finished {progress['counts']}")
+            await asyncio.wait([waiter], timeout=args.interval)
+    finally:
+        await close_clients()
+
+    progress = batch_tracker.progress(batch["id"])
+    for job in progress["jobs"]:
+        print(f"{job['status']:<10}{job['title']}  {job['url'] or job['error']}")
+    for item in progress["rejected"]:
+        print(f"{'rejected':<10}{item['filename']}  {item['error']}")
+    print(f"Batch {batch['id']}: {progress['counts'].get('done', 0)}/{progress['total']} published "
+          f"in {progress['elapsed_seconds']:.1f}s")
+
+    return 0 if progress["counts"].get("done", 0) == progress["total"] and not progress["rejected"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="documents, zip archives or directories")
+    parser.add_argument("--no-cache", action="store_true", help="always request a fresh Gemini summary")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between progress lines")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,10 +8,175 @@ class Settings(BaseSettings):
     BREVO_API_KEY: str = ""
     BREVO_SENDER_EMAIL: str = ""
     EMAIL_TO: str = ""
+    # Email transport: "brevo", "smtp", or "file" (writes .eml files to EMAIL_FILE_DIR instead of sending)
+    EMAIL_TRANSPORT: str = "brevo"
+    # From address; defaults to BREVO_SENDER_EMAIL
+    EMAIL_SENDER: str = ""
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 587
+    SMTP_USERNAME: str = ""
+    SMTP_PASSWORD: str = ""
+    SMTP_STARTTLS: bool = True
+    EMAIL_FILE_DIR: str = "outbox"
+    # Blog notifications queued within this many seconds are sent as one digest (0 = one email each)
+    EMAIL_COALESCE_SECONDS: float = 0
+    EMAIL_DIGEST_MAX_POSTS: int = 50
     GEMINI_AI_MODEL: str = "gemini-2.5-flash-lite"
+    # Stream the Gemini response and report progress while it is generated
+    GEMINI_STREAMING: bool = False
+    # Use JSON mode with a response schema, re-asking only for invalid fields
+    GEMINI_STRUCTURED_OUTPUT: bool = False
+    GEMINI_MAX_REPAIR_RETRIES: int = 2
+    # "full": Gemini returns the article HTML with the summary prepended
+    # "metadata": Gemini returns only metadata and the summary is spliced in locally
+    SUMMARY_MODE: str = "full"
+    # Metadata mode: longer articles are sent as an "excerpt" or summarized chunk by chunk ("map_reduce")
+    SUMMARY_MAX_INPUT_TOKENS: int = 8000
+    SUMMARY_LONG_ARTICLE_STRATEGY: str = "excerpt"
+    SUMMARY_CHUNK_TOKENS: int = 4000
+
+    # Notion allows ~3 requests/second per integration
+    NOTION_REQUESTS_PER_SECOND: float = 3.0
+    NOTION_BURST: int = 3
+    NOTION_MAX_RATE_LIMIT_RETRIES: int = 5
+    # Re-uploading an article updates its page (found by slug) in place, writing only the blocks
+    # that changed, and an unchanged article body reuses its summary instead of calling Gemini
+    INCREMENTAL_PUBLISH: bool = False
+    # Local index of published pages (slug, page id, block ids and hashes) that saves the lookups
+    PUBLISH_INDEX_DB_PATH: str = "published.db"
+
+    # Override API endpoints, e.g. to point at local stubs for benchmarks
+    GEMINI_BASE_URL: str = ""
+    NOTION_BASE_URL: str = ""
+    BREVO_API_HOST: str = ""
+
+    # Uploads are streamed to a temp file and converted in a process pool
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    UPLOAD_TMP_DIR: str = ""
+    CONVERSION_TIMEOUT_SECONDS: float = 60
+    # 0 = one worker per CPU core
+    CONVERSION_WORKERS: int = 0
+
+    # Embedded images are written to ASSET_DIR and served from PUBLIC_BASE_URL/assets/<hash>
+    # instead of being inlined as base64 (Notion needs PUBLIC_BASE_URL to fetch them)
+    ASSET_OFFLOAD_IMAGES: bool = True
+    ASSET_DIR: str = "assets"
+    PUBLIC_BASE_URL: str = ""
+    # Downscale images larger than this (needs Pillow; 0 = keep original size)
+    ASSET_MAX_IMAGE_DIMENSION: int = 2000
+
+    # Retries of Gemini, Notion and Brevo calls: exponential backoff with jitter, honoring Retry-After
+    RETRY_MAX_ATTEMPTS: int = 4
+    RETRY_BASE_DELAY_SECONDS: float = 0.5
+    RETRY_MAX_DELAY_SECONDS: float = 30
+    # Consecutive failures before a dependency's circuit opens; jobs wait until it is retried
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RESET_SECONDS: float = 30
+    EMAIL_REQUEST_TIMEOUT_SECONDS: float = 10
+
+    # Logging: "json" (one object per line) or "text"
+    LOG_FORMAT: str = "json"
+    LOG_LEVEL: str = "INFO"
+
+    # Job queue: "memory" (default), "sqlite" for jobs that survive restarts,
+    # or "redis" to share jobs between processes and machines
+    JOB_STORE: str = "memory"
+    JOB_DB_PATH: str = "jobs.db"
+    JOB_WORKERS: int = 4
+    # A job is claimed by one process at a time; others resume it if the claim is not renewed for this long
+    JOB_LEASE_SECONDS: float = 30
+    # Uploaded jobs never started (no "start" from a client) are deleted after this long (0 = kept)
+    JOB_PENDING_TTL_SECONDS: float = 3600
+    # Memory store: job HTML is compressed ("zlib", "zstd" or "none") and, past this many
+    # compressed bytes in memory, written to temp files under JOB_PAYLOAD_SPILL_DIR (default: system temp dir)
+    JOB_PAYLOAD_MEMORY_BYTES: int = 64 * 1024 * 1024
+    JOB_PAYLOAD_COMPRESSION: str = "zlib"
+    JOB_PAYLOAD_SPILL_DIR: str = ""
+    # Progress events: "memory" (one process) or "redis" (shared, for several workers or machines)
+    PROGRESS_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    # Max concurrent calls per pipeline stage, across all workers
+    LLM_CONCURRENCY: int = 4
+    NOTION_CONCURRENCY: int = 2
+    EMAIL_CONCURRENCY: int = 4
+    # Estimated Gemini tokens per minute across all jobs (0 = unlimited)
+    LLM_TOKENS_PER_MINUTE: int = 0
+    # Batch uploads: max documents per batch (zip archives count the documents they contain)
+    BATCH_MAX_FILES: int = 500
+    BATCH_MAX_UPLOAD_BYTES: int = 500 * 1024 * 1024
+    # Seconds a finished batch's progress stays available (0 = forever)
+    BATCH_TTL_SECONDS: float = 24 * 3600
+    # Per-stage timeouts (seconds) for the job pipeline
+    SUMMARY_TIMEOUT_SECONDS: float = 300
+    NOTION_TIMEOUT_SECONDS: float = 300
+    EMAIL_TIMEOUT_SECONDS: float = 60
+    # Cancel a running job when its websocket disconnects (by default jobs finish without a client)
+    CANCEL_ON_DISCONNECT: bool = False
+    # Progress events: kept per job for replay on reconnect, and queued per client before the oldest is dropped
+    PROGRESS_BUFFER_SIZE: int = 256
+    PROGRESS_SUBSCRIBER_QUEUE_SIZE: int = 256
+    PROGRESS_MAX_JOBS: int = 1000
+
+    # Gemini summary cache: in-memory LRU plus an optional SQLite tier
+    SUMMARY_CACHE_MAX_ENTRIES: int = 128
+    SUMMARY_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    SUMMARY_CACHE_DB_PATH: str = ""
+    SUMMARY_CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024
 
     class Config:
         env_file = ".env"
 
 
-settings = Settings()
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+class LazyObject:
+    """
+    Stands in for an object built by `factory` on first use, so modules can define
+    singletons that read settings without reading them at import time.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def _get(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            instance = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+    def __getitem__(self, key):
+        return self._get()[key]
+
+    def __iter__(self):
+        return iter(self._get())
+
+    def __len__(self):
+        return len(self._get())
+
+    def __contains__(self, item):
+        return item in self._get()
+
+    def __bool__(self):
+        return bool(self._get())
+
+
+class LazySettings(LazyObject):
+    """Reads the environment and .env on first use instead of at import time."""
+
+    def __init__(self):
+        super().__init__(get_settings)
+
+
+settings = LazySettings()
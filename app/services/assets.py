@@ -0,0 +1,82 @@
+import hashlib
+import io
+import os
+import re
+from app.config import LazyObject, settings
+
+# Content types we keep, and the extension they are stored under
+IMAGE_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/bmp": "bmp",
+    "image/svg+xml": "svg",
+}
+
+ASSET_NAME = re.compile(r"^[0-9a-f]{32}\.[a-z]+$")
+
+
+class AssetStore:
+    """
+    Content-addressed file store for images extracted from uploads.
+    Identical images (by sha256 of the original bytes) are stored once.
+
+    Parameters:
+    - root (str): Directory holding the files.
+    - max_dimension (int): Larger images are downscaled to fit (needs Pillow; 0 = keep size).
+    """
+
+    def __init__(self, root: str, max_dimension: int = 0):
+        self.root = root
+        self.max_dimension = max_dimension
+
+    def path_for(self, name: str) -> str | None:
+        if not ASSET_NAME.match(name):
+            return None
+        return os.path.join(self.root, name)
+
+    def save(self, data: bytes, content_type: str) -> str:
+        """Store image bytes and return the asset name (<hash>.<ext>)."""
+        extension = IMAGE_EXTENSIONS.get(content_type, "bin")
+        name = f"{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+        path = os.path.join(self.root, name)
+
+        if not os.path.exists(path):
+            os.makedirs(self.root, exist_ok=True)
+            data = self._downscale(data, extension)
+            # Write then rename, so concurrent workers never serve a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        return name
+
+    def _downscale(self, data: bytes, extension: str) -> bytes:
+        if not self.max_dimension or extension in ("svg", "gif", "bin"):
+            return data
+        try:
+            # Imported here: Pillow is optional and slow to import
+            from PIL import Image
+        except ImportError:
+            return data
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if max(image.size) <= self.max_dimension:
+                    return data
+                image.thumbnail((self.max_dimension, self.max_dimension))
+                out = io.BytesIO()
+                # Pillow names formats, not extensions: .jpg is "JPEG"
+                image.save(out, format=image.format or Image.registered_extensions().get(f".{extension}", extension.upper()))
+                return out.getvalue()
+        except Exception:
+            # Unreadable image: keep the original bytes
+            return data
+
+
+def asset_url(name: str) -> str:
+    return f"{settings.PUBLIC_BASE_URL.rstrip('/')}/assets/{name}"
+
+
+asset_store = LazyObject(lambda: AssetStore(settings.ASSET_DIR, settings.ASSET_MAX_IMAGE_DIMENSION))
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from app.services.jobs import FINISHED_STATUSES, JobStore
+from app.services.notifier import send_digest_notification
+
+
+class BatchTracker:
+    """
+    Groups the jobs of a batch upload, reports their aggregated progress and
+    sends one digest email once every job of the batch has finished.
+
+    Parameters:
+    - store (JobStore): Where the batch's jobs live.
+    - ttl (float): Seconds a finished batch is kept for progress queries (0 = forever).
+    """
+
+    def __init__(self, store: JobStore, ttl: float = 0):
+        self.store = store
+        self.ttl = ttl
+        # batch_id => { id, job_ids, rejected, sealed, created_at, finished_at, digest_sent }
+        self.batches: dict[str, dict] = {}
+        self._finished: dict[str, asyncio.Event] = {}
+
+    def create(self, batch_id: str) -> dict:
+        """Start an empty batch; jobs are added as their documents are converted."""
+        self._expire()
+        batch = {
+            "id": batch_id,
+            "job_ids": [],
+            "rejected": [],
+            # No more jobs will be added; the batch can finish
+            "sealed": False,
+            "created_at": time.time(),
+            "finished_at": None,
+            "digest_sent": False,
+        }
+        self.batches[batch_id] = batch
+        self._finished[batch_id] = asyncio.Event()
+        return batch
+
+    def _expire(self):
+        """Forget batches that finished more than `ttl` seconds ago."""
+        if not self.ttl:
+            return
+        finished_before = time.time() - self.ttl
+        for batch_id in [
+            batch_id for batch_id, batch in self.batches.items()
+            if batch["finished_at"] is not None and batch["finished_at"] < finished_before
+        ]:
+            del self.batches[batch_id]
+            del self._finished[batch_id]
+
+    def add_job(self, batch_id: str, job_id: str):
+        self.batches[batch_id]["job_ids"].append(job_id)
+
+    def reject(self, batch_id: str, filename: str, error: str):
+        self.batches[batch_id]["rejected"].append({"filename": filename, "error": error})
+
+    async def seal(self, batch_id: str):
+        """Mark the batch complete; sends the digest now if every job already finished."""
+        self.batches[batch_id]["sealed"] = True
+        await self._finish_if_done(self.batches[batch_id])
+
+    def progress(self, batch_id: str) -> dict | None:
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+
+        jobs = []
+        counts = {}
+        for job_id in batch["job_ids"]:
+            job = self.store.get(job_id) or {"id": job_id, "title": "", "status": "failed", "error": "Job not found"}
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+            jobs.append({
+                "id": job["id"],
+                "title": job["title"],
+                "status": job["status"],
+                "step": job.get("step", ""),
+                "url": job.get("result", {}).get("notion_page", {}).get("url", ""),
+                "error": job.get("error", ""),
+            })
+
+        finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+        return {
+            "batch_id": batch_id,
+            "total": len(jobs),
+            "finished": finished,
+            "counts": counts,
+            "rejected": batch["rejected"],
+            "sealed": batch["sealed"],
+            "digest_sent": batch["digest_sent"],
+            "elapsed_seconds": round((batch["finished_at"] or time.time()) - batch["created_at"], 3),
+            "jobs": jobs,
+        }
+
+    async def job_finished(self, job_id: str):
+        """WorkerPool callback: send the digest when the job's batch is complete."""
+        job = self.store.get(job_id)
+        batch = self.batches.get(job.get("batch_id")) if job else None
+        if batch is not None:
+            await self._finish_if_done(batch)
+
+    async def _finish_if_done(self, batch: dict):
+        if not batch["sealed"] or batch["finished_at"] is not None:
+            return
+
+        progress = self.progress(batch["id"])
+        if progress["finished"] < progress["total"]:
+            return
+
+        batch["finished_at"] = time.time()
+        posts = [{"title": job["title"], "url": job["url"]} for job in progress["jobs"] if job["status"] == "done"]
+        failed = [
+            {"title": job["title"], "error": job["error"] or job["status"]}
+            for job in progress["jobs"] if job["status"] != "done"
+        ] + [{"title": item["filename"], "error": item["error"]} for item in batch["rejected"]]
+
+        try:
+            if posts or failed:
+                batch["digest_sent"] = await send_digest_notification(posts, failed)
+        finally:
+            self._finished[batch["id"]].set()
+
+    async def wait(self, batch_id: str):
+        """Wait until the batch is sealed, every job has finished and the digest was sent."""
+        finished = self._finished.get(batch_id)
+        if finished is not None:
+            await finished.wait()
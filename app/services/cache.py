@@ -0,0 +1,132 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_key(*parts) -> str:
+    """Stable sha256 over the given JSON-serializable parts."""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for JSON-serializable results.
+
+    Parameters:
+    - max_entries (int): Size of the in-memory LRU tier.
+    - ttl (float): Seconds an entry stays valid (0 = forever).
+    - db_path (str): Optional SQLite file for the on-disk tier.
+    - max_disk_bytes (int): The disk tier evicts least recently used entries beyond this size.
+    """
+
+    def __init__(self, max_entries: int, ttl: float = 0, db_path: str = "", max_disk_bytes: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - created_at > self.ttl
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and not self._expired(entry[0], now):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+            value = self._disk_get(key, now)
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._memory_set(key, value[0], value[1])
+            return value[1]
+
+    def set(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._memory_set(key, now, value)
+            self._disk_set(key, now, value)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
+
+    def _memory_set(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[1], now):
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return row[1], json.loads(row[0])
+
+    def _disk_set(self, key, now, value):
+        if self._db is None:
+            return
+        data = json.dumps(value)
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now, now),
+        )
+        self._evict_disk(now)
+        self._db.commit()
+
+    def _evict_disk(self, now):
+        if self.ttl:
+            self._db.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl,))
+        if not self.max_disk_bytes:
+            return
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        # Drop least recently used entries until under budget
+        for key, size in self._db.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from app.config import settings
+from app.services.metrics import observe_stage
+from app.services.read_files import read_document, import_readers, file_extension, is_supported, supported_formats
+
+_executor = None
+# Futures of the warm-up task submitted to each worker
+_warming = []
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class ConversionError(Exception):
+    pass
+
+
+class ConversionTimeout(ConversionError):
+    pass
+
+
+def _warm_up():
+    # Runs once per worker so the first real conversion doesn't pay for imports
+    import_readers()
+    return os.getpid()
+
+
+def _convert_file(path: str, extension: str, offload_images: bool = True) -> str:
+    """Runs in a worker process; the worker reads the file itself, so only the path is pickled."""
+    return read_document(path, extension, offload_images)
+
+
+def conversion_workers() -> int:
+    return settings.CONVERSION_WORKERS or os.cpu_count() or 1
+
+
+def start_conversion_pool():
+    """Create the process pool and start every worker up front, without waiting for them to be ready."""
+    global _executor, _warming
+    if _executor is None:
+        workers = conversion_workers()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _warming = [_executor.submit(_warm_up) for _ in range(workers)]
+    return _executor
+
+
+async def conversion_pool_ready():
+    """Wait until every worker has started and imported the document readers."""
+    start_conversion_pool()
+    await asyncio.gather(*(asyncio.wrap_future(future) for future in _warming))
+
+
+def stop_conversion_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _warming.clear()
+
+
+async def spool_upload(upload, suffix: str = "", max_bytes: int = 0) -> str:
+    """
+    Stream an UploadFile to a temp file in chunks, enforcing max_bytes (default MAX_UPLOAD_BYTES).
+    Returns the temp file path; the caller deletes it.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.UPLOAD_TMP_DIR or None)
+    try:
+        with tmp:
+            while chunk := await upload.read(settings.UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds the {max_bytes} byte upload limit.")
+                tmp.write(chunk)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return tmp.name
+
+
+def unsupported_error() -> str:
+    return f"Unsupported file type. Supported: {supported_formats()}."
+
+
+def extract_documents(zip_path: str, max_files: int | None = None, max_bytes: int | None = None) -> tuple[list[tuple[str, str]], list[dict]]:
+    """
+    Extract the supported documents (.docx, .pdf, .md, .html) of a zip archive to temp files.
+    Returns ([(filename, temp path)], [{ filename, error }] for skipped entries); the caller deletes the files.
+
+    Parameters:
+    - max_files (int): Raise UploadTooLarge, before extracting anything, if the archive has more documents.
+    - max_bytes (int): Same for the documents' total uncompressed size.
+    """
+    entries, rejected = [], []
+    try:
+        archive = zipfile.ZipFile(zip_path)
+    except zipfile.BadZipFile as e:
+        return [], [{"filename": os.path.basename(zip_path), "error": f"Invalid zip archive: {e}"}]
+
+    with archive:
+        for entry in archive.infolist():
+            filename = os.path.basename(entry.filename)
+            if entry.is_dir() or filename.startswith(".") or "__MACOSX" in entry.filename:
+                continue
+            if not is_supported(filename):
+                rejected.append({"filename": entry.filename, "error": unsupported_error()})
+                continue
+            if entry.file_size > settings.MAX_UPLOAD_BYTES:
+                rejected.append({"filename": entry.filename, "error": f"File exceeds the {settings.MAX_UPLOAD_BYTES} byte upload limit."})
+                continue
+            entries.append(entry)
+
+        # Sizes come from the archive's directory; reading an entry never yields more than its file_size
+        if max_files is not None and len(entries) > max_files:
+            raise UploadTooLarge(f"The archive has {len(entries)} documents; at most {max_files} more fit in the batch.")
+        total = sum(entry.file_size for entry in entries)
+        if max_bytes is not None and total > max_bytes:
+            raise UploadTooLarge(f"The archive's documents exceed the {max_bytes} byte upload limit once extracted.")
+
+        documents = []
+        try:
+            for entry in entries:
+                filename = os.path.basename(entry.filename)
+                tmp = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension(filename), dir=settings.UPLOAD_TMP_DIR or None)
+                documents.append((filename, tmp.name))
+                with tmp, archive.open(entry) as member:
+                    shutil.copyfileobj(member, tmp, settings.UPLOAD_CHUNK_BYTES)
+        except BaseException:
+            for _, path in documents:
+                os.unlink(path)
+            raise
+
+    return documents, rejected
+
+
+async def convert_to_html(path: str, filename: str) -> str:
+    """
+    Convert a document to HTML in the process pool, off the event loop;
+    the reader is chosen by the extension of `filename`.
+    Raises ConversionTimeout after CONVERSION_TIMEOUT_SECONDS (the worker finishes the
+    abandoned conversion in the background).
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    extension = file_extension(filename)
+    future = loop.run_in_executor(start_conversion_pool(), _convert_file, path, extension, settings.ASSET_OFFLOAD_IMAGES)
+    try:
+        html_content = await asyncio.wait_for(future, settings.CONVERSION_TIMEOUT_SECONDS)
+        observe_stage(f"{extension.lstrip('.')}_conversion", time.perf_counter() - start)
+        return html_content
+    except asyncio.TimeoutError:
+        raise ConversionTimeout(f"Conversion took longer than {settings.CONVERSION_TIMEOUT_SECONDS}s.")
+    except Exception as e:
+        raise ConversionError(f"Could not convert document: {e}") from e
@@ -0,0 +1,569 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from app.config import LazyObject, settings
+from app.services.pipeline import PipelineCancelled
+from app.services.resilience import CircuitOpen
+from app.services.metrics import JOBS
+from app.services.payloads import PayloadStore
+
+logger = logging.getLogger(__name__)
+
+# Pipeline checkpoints. Content upload and email both follow page creation and run
+# concurrently, so a job records every completed step in `completed`, and `step` is the latest
+JOB_STEPS = ["uploaded", "summarized", "page_created", "content_appended", "emailed"]
+
+# Jobs in these states are picked up again after a restart
+UNFINISHED_STATUSES = ("queued", "running")
+# Finished jobs no longer need their HTML
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+def step_completed(job: dict, step: str) -> bool:
+    return step in job.get("completed", ["uploaded"])
+
+
+def stored_job(job: dict) -> dict:
+    """The job as stored: without its HTML once it has finished."""
+    if job["status"] in FINISHED_STATUSES and "html" in job:
+        return {key: value for key, value in job.items() if key != "html"}
+    return job
+
+
+class JobStore:
+    """
+    Interface for job storage.
+    A job is a dict: { id, title, html, status, step, completed, result, error, created_at, updated_at }
+    status is one of: pending (uploaded, not started), queued, running, done, failed, cancelled.
+    A job waiting for a dependency whose circuit is open is queued again.
+
+    When several processes share a store, a job is only run by the process holding its
+    lease (claim), which renews it while the job is queued or running. Jobs whose lease
+    expired (their process died) are claimed and resumed by another process.
+    """
+
+    def create(self, job_id: str, title: str, html: str, **fields) -> dict:
+        now = time.time()
+        job = {
+            "id": job_id,
+            "title": title,
+            "html": html,
+            "status": "pending",
+            "step": "uploaded",
+            "completed": ["uploaded"],
+            "result": {},
+            "error": "",
+            "created_at": now,
+            "updated_at": now,
+            **fields,
+        }
+        self.save(job)
+        return job
+
+    def update(self, job_id: str, **fields) -> dict | None:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields, updated_at=time.time())
+        self.save(job)
+        return job
+
+    def complete_step(self, job_id: str, step: str, **result) -> dict | None:
+        """Checkpoint a finished step, merging its outputs into the job's result."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        completed = job.get("completed", ["uploaded"])
+        job.update(
+            step=step,
+            completed=completed + [step] if step not in completed else completed,
+            result={**job["result"], **result},
+            updated_at=time.time(),
+        )
+        self.save(job)
+        return job
+
+    def save_result(self, job_id: str, **result) -> dict | None:
+        """Merge outputs into the job's result without completing a step (progress within a step)."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(result={**job["result"], **result}, updated_at=time.time())
+        self.save(job)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def payload(self, job_id: str) -> str | None:
+        """The job's HTML (None once the job has finished or expired)."""
+        job = self.get(job_id)
+        return job.get("html") if job else None
+
+    def save(self, job: dict):
+        raise NotImplementedError
+
+    def delete(self, job_id: str):
+        raise NotImplementedError
+
+    def unfinished(self) -> list[dict]:
+        raise NotImplementedError
+
+    def expire_pending(self, updated_before: float) -> list[str]:
+        """Delete pending jobs (uploaded but never started) last updated before this time; returns their ids."""
+        raise NotImplementedError
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs by status."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"jobs": self.counts()}
+
+    def close(self):
+        pass
+
+    def claim(self, job_id: str, owner: str, ttl: float) -> bool:
+        """Take the job's lease unless another owner holds an unexpired one."""
+        raise NotImplementedError
+
+    def renew(self, job_id: str, owner: str, ttl: float) -> bool:
+        """Extend a lease held by `owner`; False if it was lost."""
+        raise NotImplementedError
+
+    def release(self, job_id: str, owner: str):
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Default store: jobs live as long as the process. Their HTML is kept apart, compressed,
+    in a PayloadStore (which spills to disk past its memory budget): get() returns jobs
+    without it, payload() returns it.
+
+    Parameters:
+    - payloads (PayloadStore): Where the HTML of unfinished jobs is kept.
+    """
+
+    def __init__(self, payloads: PayloadStore | None = None):
+        self.jobs: dict[str, dict] = {}
+        # job_id => (owner, expires_at)
+        self.leases: dict[str, tuple[str, float]] = {}
+        self.payloads = payloads or PayloadStore(64 * 1024 * 1024)
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def payload(self, job_id):
+        return self.payloads.get(job_id)
+
+    def save(self, job):
+        job = dict(job)
+        html = job.pop("html", None)
+        if job["status"] in FINISHED_STATUSES:
+            self.payloads.discard(job["id"])
+        elif html is not None:
+            self.payloads.put(job["id"], html)
+        self.jobs[job["id"]] = job
+
+    def delete(self, job_id):
+        self.jobs.pop(job_id, None)
+        self.leases.pop(job_id, None)
+        self.payloads.discard(job_id)
+
+    def unfinished(self):
+        return [dict(job) for job in self.jobs.values() if job["status"] in UNFINISHED_STATUSES]
+
+    def expire_pending(self, updated_before):
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job["status"] == "pending" and job["updated_at"] < updated_before
+        ]
+        for job_id in expired:
+            self.delete(job_id)
+        return expired
+
+    def counts(self):
+        return dict(Counter(job["status"] for job in self.jobs.values()))
+
+    def stats(self):
+        return {"jobs": self.counts(), "payloads": self.payloads.stats()}
+
+    def close(self):
+        self.payloads.close()
+
+    def claim(self, job_id, owner, ttl):
+        lease = self.leases.get(job_id)
+        if lease is not None and lease[1] > time.time():
+            return False
+        self.leases[job_id] = (owner, time.time() + ttl)
+        return True
+
+    def renew(self, job_id, owner, ttl):
+        lease = self.leases.get(job_id)
+        if lease is None or lease[0] != owner:
+            return False
+        self.leases[job_id] = (owner, time.time() + ttl)
+        return True
+
+    def release(self, job_id, owner):
+        if self.leases.get(job_id, ("",))[0] == owner:
+            del self.leases[job_id]
+
+
+class SQLiteJobStore(JobStore):
+    """Durable store: jobs survive restarts (put the file on a persistent volume)."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                job_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+        self._db.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, job):
+        job = stored_job(job)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, data, updated_at) VALUES (?, ?, ?, ?)",
+                (job["id"], job["status"], json.dumps(job), job["updated_at"]),
+            )
+            self._db.commit()
+
+    def delete(self, job_id):
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._db.execute("DELETE FROM leases WHERE job_id = ?", (job_id,))
+            self._db.commit()
+
+    def unfinished(self):
+        placeholders = ",".join("?" for _ in UNFINISHED_STATUSES)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT data FROM jobs WHERE status IN ({placeholders}) ORDER BY updated_at",
+                UNFINISHED_STATUSES,
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def expire_pending(self, updated_before):
+        with self._lock:
+            expired = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'pending' AND updated_at < ?", (updated_before,)
+            ).fetchall()]
+            self._db.execute(
+                "DELETE FROM leases WHERE job_id IN (SELECT id FROM jobs WHERE status = 'pending' AND updated_at < ?)",
+                (updated_before,),
+            )
+            self._db.execute("DELETE FROM jobs WHERE status = 'pending' AND updated_at < ?", (updated_before,))
+            self._db.commit()
+        return expired
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def claim(self, job_id, owner, ttl):
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                """
+                INSERT INTO leases (job_id, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE leases.expires_at < ?
+                """,
+                (job_id, owner, now + ttl, now),
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def renew(self, job_id, owner, ttl):
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE leases SET expires_at = ? WHERE job_id = ? AND owner = ?", (time.time() + ttl, job_id, owner)
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def release(self, job_id, owner):
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE job_id = ? AND owner = ?", (job_id, owner))
+            self._db.commit()
+
+
+# Lease updates that only apply if the caller still owns the lease
+RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end
+return 0
+"""
+RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+
+
+class RedisJobStore(JobStore):
+    """
+    Shared store: every process and machine using the same Redis sees the same jobs.
+    Pending jobs are saved with a Redis expiry of `pending_ttl` seconds (0 = none) instead of being swept.
+    """
+
+    def __init__(self, url: str, prefix: str = "blogagent", pending_ttl: float = 0):
+        try:
+            import redis  # optional: only needed for JOB_STORE=redis
+        except ImportError:
+            raise RuntimeError("JOB_STORE=redis needs the redis package: pip install redis")
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.pending_ttl = pending_ttl
+        self._renew = self._redis.register_script(RENEW_LEASE)
+        self._release = self._redis.register_script(RELEASE_LEASE)
+        # Ids of queued and running jobs, by last update
+        self._unfinished_key = f"{prefix}:jobs:unfinished"
+
+    def _key(self, job_id: str) -> str:
+        return f"{self._prefix}:job:{job_id}"
+
+    def _lease_key(self, job_id: str) -> str:
+        return f"{self._prefix}:lease:{job_id}"
+
+    def get(self, job_id):
+        data = self._redis.get(self._key(job_id))
+        return json.loads(data) if data else None
+
+    def save(self, job):
+        job = stored_job(job)
+        expires = self.pending_ttl if job["status"] == "pending" and self.pending_ttl else None
+        pipe = self._redis.pipeline()
+        # Saving without an expiry clears the one set while the job was pending
+        pipe.set(self._key(job["id"]), json.dumps(job), px=int(expires * 1000) if expires else None)
+        if job["status"] in UNFINISHED_STATUSES:
+            pipe.zadd(self._unfinished_key, {job["id"]: job["updated_at"]})
+        else:
+            pipe.zrem(self._unfinished_key, job["id"])
+        pipe.execute()
+
+    def delete(self, job_id):
+        pipe = self._redis.pipeline()
+        pipe.delete(self._key(job_id), self._lease_key(job_id))
+        pipe.zrem(self._unfinished_key, job_id)
+        pipe.execute()
+
+    def unfinished(self):
+        job_ids = [job_id.decode() for job_id in self._redis.zrange(self._unfinished_key, 0, -1)]
+        if not job_ids:
+            return []
+        jobs = [json.loads(data) for data in self._redis.mget([self._key(job_id) for job_id in job_ids]) if data]
+        return [job for job in jobs if job["status"] in UNFINISHED_STATUSES]
+
+    def expire_pending(self, updated_before):
+        # Redis expires pending jobs itself
+        return []
+
+    def counts(self):
+        # Counting every status would scan all job keys; queued and running jobs are indexed
+        return {"unfinished": self._redis.zcard(self._unfinished_key)}
+
+    def claim(self, job_id, owner, ttl):
+        return bool(self._redis.set(self._lease_key(job_id), owner, nx=True, px=int(ttl * 1000)))
+
+    def renew(self, job_id, owner, ttl):
+        return bool(self._renew(keys=[self._lease_key(job_id)], args=[owner, int(ttl * 1000)]))
+
+    def release(self, job_id, owner):
+        self._release(keys=[self._lease_key(job_id)], args=[owner])
+
+
+def create_job_store() -> JobStore:
+    if settings.JOB_STORE == "sqlite":
+        return SQLiteJobStore(settings.JOB_DB_PATH)
+    if settings.JOB_STORE == "redis":
+        return RedisJobStore(settings.REDIS_URL, pending_ttl=settings.JOB_PENDING_TTL_SECONDS)
+    if settings.JOB_STORE == "memory":
+        return InMemoryJobStore(PayloadStore(
+            settings.JOB_PAYLOAD_MEMORY_BYTES, settings.JOB_PAYLOAD_COMPRESSION, settings.JOB_PAYLOAD_SPILL_DIR,
+        ))
+    raise ValueError(f"Unknown JOB_STORE: {settings.JOB_STORE}")
+
+
+# Per-stage concurrency limits shared by all workers
+stage_limits = LazyObject(lambda: {
+    "llm": asyncio.Semaphore(settings.LLM_CONCURRENCY),
+    "notion": asyncio.Semaphore(settings.NOTION_CONCURRENCY),
+})
+
+
+class WorkerPool:
+    """
+    Bounded pool of asyncio workers that run queued jobs,
+    independently of whether a client is connected.
+
+    Parameters:
+    - store (JobStore): Where jobs and their checkpoints live.
+    - handler (async callable): Runs one job, given the job dict.
+    - workers (int): Number of jobs processed at the same time.
+    - on_finished (async callable): Called with the job id once a job is done, failed or cancelled.
+    - lease_seconds (float): How long a job stays claimed by this process without being renewed.
+    - pending_ttl (float): Pending jobs not started within this many seconds are deleted (0 = never).
+    """
+
+    def __init__(self, store: JobStore, handler, workers: int, on_finished=None, lease_seconds: float = 30,
+                 pending_ttl: float = 0):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.on_finished = on_finished
+        self.lease_seconds = lease_seconds
+        self.pending_ttl = pending_ttl
+        # Identifies this process in job leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Jobs this process has claimed: queued here or running
+        self.held: set[str] = set()
+        # job_id => task running the job's handler
+        self.running: dict[str, asyncio.Task] = {}
+        self.queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        # Resume jobs that were queued or running when their process stopped
+        self._claim_unfinished()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._keep_leases()))
+        if self.pending_ttl:
+            self._tasks.append(asyncio.create_task(self._expire_pending()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Let another process pick up what was left
+        for job_id in self.held:
+            self.store.release(job_id, self.owner)
+        self.held.clear()
+
+    def submit(self, job_id: str) -> bool:
+        """Queue a job here; False if another process already claimed it."""
+        if not self.store.claim(job_id, self.owner, self.lease_seconds):
+            return False
+        self.held.add(job_id)
+        self.store.update(job_id, status="queued")
+        self.queue.put_nowait(job_id)
+        return True
+
+    def _claim_unfinished(self):
+        for job in self.store.unfinished():
+            if job["id"] not in self.held and self.store.claim(job["id"], self.owner, self.lease_seconds):
+                logger.info("Resuming job", extra={"job_id": job["id"], "step": job["step"]})
+                self.held.add(job["id"])
+                self.queue.put_nowait(job["id"])
+
+    async def _keep_leases(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for job_id in list(self.held):
+                if not self.store.renew(job_id, self.owner, self.lease_seconds):
+                    logger.warning("Job lease lost", extra={"job_id": job_id})
+                    self.held.discard(job_id)
+                    # Another process may claim and resume the job: it must not run twice
+                    task = self.running.get(job_id)
+                    if task is not None:
+                        task.cancel()
+            # Jobs left behind by a process that died
+            self._claim_unfinished()
+
+    async def _expire_pending(self):
+        # Uploads whose client never sent "start" would otherwise keep their HTML forever
+        while True:
+            await asyncio.sleep(min(self.pending_ttl / 4, 60))
+            try:
+                expired = self.store.expire_pending(time.time() - self.pending_ttl)
+            except Exception as e:
+                logger.error("Expiring pending jobs failed", extra={"error": str(e)})
+                continue
+            if expired:
+                JOBS.labels("expired").inc(len(expired))
+                logger.info("Expired jobs that were never started", extra={"jobs": len(expired)})
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            if job_id not in self.held:
+                # Claimed by another process since it was queued here
+                self.queue.task_done()
+                continue
+
+            requeued = lost = False
+            try:
+                job = self.store.update(job_id, status="running")
+                if job is None:
+                    continue
+                self.running[job_id] = asyncio.create_task(self.handler(job))
+                try:
+                    await self.running[job_id]
+                finally:
+                    del self.running[job_id]
+                self.store.update(job_id, status="done")
+                JOBS.labels("done").inc()
+            except asyncio.CancelledError:
+                if job_id in self.held:
+                    # The pool is stopping
+                    raise
+                # The lease was lost: the job now belongs to whichever process claims it
+                logger.warning("Job stopped after losing its lease", extra={"job_id": job_id})
+                lost = True
+            except CircuitOpen as e:
+                # A dependency is down: keep the job (and its checkpoints) and try again once it may be back
+                logger.warning("Dependency unavailable, job requeued", extra={"job_id": job_id, "error": str(e)})
+                self.store.update(job_id, status="queued", error=str(e))
+                asyncio.get_running_loop().call_later(e.retry_in, self.queue.put_nowait, job_id)
+                requeued = True
+            except PipelineCancelled as e:
+                logger.info("Job cancelled", extra={"job_id": job_id, "error": str(e)})
+                self.store.update(job_id, status="cancelled", error=str(e))
+                JOBS.labels("cancelled").inc()
+            except Exception as e:
+                logger.error("Job failed", extra={"job_id": job_id, "error": str(e)})
+                self.store.update(job_id, status="failed", error=str(e))
+                JOBS.labels("failed").inc()
+            finally:
+                if not (requeued or lost):
+                    self.held.discard(job_id)
+                    self.store.release(job_id, self.owner)
+                    if self.on_finished is not None:
+                        try:
+                            await self.on_finished(job_id)
+                        except Exception as e:
+                            logger.error("Job completion callback failed", extra={"job_id": job_id, "error": str(e)})
+                self.queue.task_done()
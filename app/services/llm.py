@@ -1,39 +1,110 @@
+import asyncio
+import html
 import json
+import logging
 import re
-from google import genai
-from google.genai import types
-from app.config import settings
+import time
+import httpx
+from pydantic import BaseModel, Field, ValidationError, create_model
+from app.config import LazyObject, settings
+from app.services.cache import ResultCache, content_key
+from app.services.ratelimit import TokenBucket, parse_retry_after
+from app.services.resilience import Failure, call_with_retry, status_failure
+from app.services.metrics import observe_gemini
 
+logger = logging.getLogger(__name__)
 
-async def summarize_text(title, html_content: str) -> str:
-    print("Summarizing text with Gemini for title:", title)
+SYSTEM_INSTRUCTION = (
+    "Give me some high ranking SEO keywords separated by comma for this article in HTML format, a slug from the title provided below, also an image URL for the cover image of this article, and add an interesting, thought-provoking, informative one paragraph summary at the beginning of the HTML content using HTML tags <h2>Summary</h2> and <p> for the summary content, then also add this summary paragraph as plain text to the final json. Response as a json with this structure: { title: "
+    ", slug: "
+    ", seo_keywords: "
+    " , cover_imgUrl: "
+    ", plain_text_summary: "
+    ", html_content: "
+    " }:"
+)
 
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
+summary_cache = LazyObject(lambda: ResultCache(
+    max_entries=settings.SUMMARY_CACHE_MAX_ENTRIES,
+    ttl=settings.SUMMARY_CACHE_TTL_SECONDS,
+    db_path=settings.SUMMARY_CACHE_DB_PATH,
+    max_disk_bytes=settings.SUMMARY_CACHE_DISK_MAX_BYTES,
+))
 
-    response = client.models.generate_content(
-        model=settings.GEMINI_AI_MODEL,
-        config=types.GenerateContentConfig(
-            system_instruction="Give me some high ranking SEO keywords separated by comma for this article in HTML format, a slug from the title provided below, also an image URL for the cover image of this article, and add an interesting, thought-provoking, informative one paragraph summary at the beginning of the HTML content using HTML tags <h2>Summary</h2> and <p> for the summary content, then also add this summary paragraph as plain text to the final json. Response as a json with this structure: { title: "
-            ", slug: "
-            ", seo_keywords: "
-            " , cover_imgUrl: "
-            ", plain_text_summary: "
-            ", html_content: "
-            " }:",
-        ),
-        contents="Title {title}\n\nArticle Content in HTML format:\n{html_content}".format(
-            title=title, html_content=html_content
-        ),
-    )
+# Tokens-per-minute budget shared by all summaries in the process (0 = unlimited)
+llm_token_budget = LazyObject(lambda: TokenBucket(settings.LLM_TOKENS_PER_MINUTE / 60, settings.LLM_TOKENS_PER_MINUTE))
+
+_client = None
+
+
+def get_gemini_client():
+    """Long-lived Gemini client, so the underlying HTTP connections are reused across jobs."""
+    global _client
+    if _client is None:
+        # Imported on first use: google-genai takes ~0.3s to import
+        from google import genai
+        from google.genai import types
+
+        http_options = types.HttpOptions(base_url=settings.GEMINI_BASE_URL) if settings.GEMINI_BASE_URL else None
+        _client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
+    return _client
+
+
+async def close_gemini_client():
+    global _client
+    if _client is not None:
+        await _client.aio.aclose()
+        _client = None
+
+
+def classify_gemini_error(e: Exception) -> Failure:
+    from google.genai import errors as genai_errors
+
+    if isinstance(e, genai_errors.APIError):
+        headers = getattr(e.response, "headers", None) or {}
+        retry_after = headers.get("retry-after")
+        return status_failure(e.code, parse_retry_after(retry_after) if retry_after else None)
+    if isinstance(e, (httpx.TransportError, asyncio.TimeoutError)):
+        return Failure(retry=True, outage=True)
+    return Failure(retry=False)
+
+
+async def generate_content(client, kind: str, **kwargs):
+    """
+    client.aio.models.generate_content with retries, recording latency, prompt size
+    and token usage under `kind`.
+    """
+    async def attempt():
+        start = time.perf_counter()
+        response = await client.aio.models.generate_content(**kwargs)
+        observe_gemini(kind, time.perf_counter() - start, len(kwargs["contents"].encode("utf-8")), response.usage_metadata)
+        return response
+
+    return await call_with_retry("gemini", attempt, classify=classify_gemini_error)
+
+
+def summary_cache_key(title, html_content: str) -> str:
+    """The summary depends only on these inputs, so they address the cache."""
+    if settings.SUMMARY_MODE == "metadata":
+        instruction = [METADATA_INSTRUCTION, settings.SUMMARY_LONG_ARTICLE_STRATEGY, settings.SUMMARY_MAX_INPUT_TOKENS]
+    else:
+        instruction = SYSTEM_INSTRUCTION
+    return content_key(settings.GEMINI_AI_MODEL, instruction, title, html_content)
 
-    cleaned_output = re.sub(
-        r"^```json\s*|\s*```$", "", response.text, flags=re.MULTILINE
+
+def get_cached_summary(title, html_content: str) -> dict | None:
+    return summary_cache.get(summary_cache_key(title, html_content))
+
+
+def build_prompt(title, html_content: str) -> str:
+    return "Title {title}\n\nArticle Content in HTML format:\n{html_content}".format(
+        title=title, html_content=html_content
     )
 
-    # Parse as JSON
-    data = json.loads(cleaned_output)
 
-    response_in_json = {
+def to_summary_response(data: dict) -> dict:
+    """Map the model's JSON onto the shape the pipeline uses."""
+    return {
         "title": data.get("title", ""),
         "slug": data.get("slug", ""),
         "seo_keywords": data.get("seo_keywords", ""),
@@ -42,4 +113,474 @@ async def summarize_text(title, html_content: str) -> str:
         "html_content": data.get("html_content", ""),
     }
 
+
+async def summarize_text(title, html_content: str) -> dict:
+    from google.genai import types
+
+    if settings.SUMMARY_MODE == "metadata":
+        return await summarize_metadata(title, html_content)
+    if settings.GEMINI_STRUCTURED_OUTPUT:
+        return await summarize_text_structured(title, html_content)
+
+    logger.info("Summarizing text with Gemini", extra={"title": title})
+
+    client = get_gemini_client()
+
+    response = await generate_content(
+        client, "summary",
+        model=settings.GEMINI_AI_MODEL,
+        config=types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+        ),
+        contents=build_prompt(title, html_content),
+    )
+
+    cleaned_output = strip_code_fences(response.text)
+
+    # Parse as JSON
+    data = json.loads(cleaned_output)
+
+    response_in_json = to_summary_response(data)
+
+    summary_cache.set(summary_cache_key(title, html_content), response_in_json)
+
+    return response_in_json
+
+
+class StreamingJSONObject:
+    """
+    Incremental parser for the top-level fields of a streamed JSON object.
+    Text before the opening brace (e.g. a ```json fence) is ignored, and each
+    top-level value is decoded as soon as it is complete, so short fields like
+    `slug` are available long before a large `html_content` finishes.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = "key"  # key -> colon -> value -> comma
+        self._buf = []
+        self._key = None
+
+    def feed(self, text: str) -> list[tuple[str, object]]:
+        """Consume a chunk; return the (key, value) pairs completed by it."""
+        completed = []
+
+        for ch in text:
+            if self.done:
+                break
+
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                continue
+
+            if self._state in ("key", "value") and (self._buf or self._in_string or not ch.isspace()):
+                self._buf.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        completed.extend(self._end_token())
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._state == "value":
+                        self._buf.pop()
+                        completed.extend(self._end_value())
+                    self.done = True
+                elif self._depth == 1 and self._state == "value":
+                    completed.extend(self._end_value())
+            elif ch == ":" and self._depth == 1 and self._state == "colon":
+                self._state = "value"
+            elif ch == "," and self._depth == 1:
+                if self._state == "value":
+                    self._buf.pop()
+                    completed.extend(self._end_value())
+                self._state = "key"
+
+        return completed
+
+    def _end_token(self):
+        # A top-level string just closed: either a key or a whole string value
+        if self._state == "key":
+            self._key = json.loads("".join(self._buf))
+            self._buf = []
+            self._state = "colon"
+            return []
+        if self._state == "value" and self._buf and self._buf[0] == '"':
+            return self._end_value()
+        return []
+
+    def _end_value(self):
+        raw = "".join(self._buf).strip()
+        self._buf = []
+        self._state = "comma"
+        if not raw:
+            return []
+        value = json.loads(raw)
+        self.fields[self._key] = value
+        return [(self._key, value)]
+
+
+async def summarize_text_stream(title, html_content: str, on_progress=None, on_field=None,
+                                progress_interval: float = 0.25) -> dict:
+    """
+    Streaming variant of summarize_text.
+
+    Parameters:
+    - on_progress (async callable): Called with the number of bytes received, at most every `progress_interval` seconds.
+    - on_field (async callable): Called with (key, value) as soon as each top-level JSON field is complete.
+    """
+    from google.genai import types
+
+    logger.info("Streaming summary from Gemini", extra={"title": title})
+
+    client = get_gemini_client()
+    prompt = build_prompt(title, html_content)
+
+    async def read_stream():
+        # A retry starts over; fields already reported are reported again
+        parser = StreamingJSONObject()
+        received = 0
+        last_progress = 0.0
+        usage = None
+        start = time.perf_counter()
+
+        stream = await client.aio.models.generate_content_stream(
+            model=settings.GEMINI_AI_MODEL,
+            config=types.GenerateContentConfig(
+                system_instruction=SYSTEM_INSTRUCTION,
+            ),
+            contents=prompt,
+        )
+
+        async for chunk in stream:
+            usage = chunk.usage_metadata or usage
+            text = chunk.text or ""
+            received += len(text.encode("utf-8"))
+
+            for key, value in parser.feed(text):
+                if on_field:
+                    await on_field(key, value)
+
+            now = time.monotonic()
+            if on_progress and now - last_progress >= progress_interval:
+                last_progress = now
+                await on_progress(received)
+
+        observe_gemini("stream", time.perf_counter() - start, len(prompt.encode("utf-8")), usage)
+
+        if not parser.done:
+            raise ValueError(f"Incomplete JSON from Gemini after {received} bytes")
+        return parser
+
+    parser = await call_with_retry("gemini", read_stream, classify=classify_gemini_error)
+
+    response_in_json = to_summary_response(parser.fields)
+
+    summary_cache.set(summary_cache_key(title, html_content), response_in_json)
+
+    return response_in_json
+
+
+
+# --------------------------------------------------------
+# Structured output: JSON mode + response schema + field repair
+# --------------------------------------------------------
+class SummaryResponse(BaseModel):
+    """Schema Gemini must follow; mirrors the keys read by to_summary_response."""
+    title: str = Field(min_length=1)
+    slug: str = Field(pattern=r"^[a-z0-9]+(?:-[a-z0-9]+)*$", description="lowercase words separated by hyphens")
+    seo_keywords: str = Field(min_length=1, description="SEO keywords separated by comma")
+    cover_imgUrl: str = Field(pattern=r"^https?://", description="image URL for the cover image")
+    plain_text_summary: str = Field(min_length=1, description="the summary paragraph as plain text")
+    html_content: str = Field(min_length=1, description="the article HTML with the summary prepended")
+
+
+# Fields that need the article itself to be regenerated
+ARTICLE_FIELDS = {"plain_text_summary", "html_content"}
+
+# parse_failures: summaries whose response failed validation (once each, however many repairs it took);
+# repair_retries: repair requests sent; unrecovered: summaries still invalid after every repair
+structured_output_stats = {
+    "parse_failures": 0,
+    "repair_retries": 0,
+    "repaired_fields": 0,
+    "unrecovered": 0,
+}
+
+
+def strip_code_fences(text: str) -> str:
+    return re.sub(r"^```json\s*|\s*```$", "", text, flags=re.MULTILINE)
+
+
+def validate_summary(text: str) -> tuple[dict, set[str]]:
+    """
+    Parse a JSON reply against SummaryResponse.
+    Returns (valid_fields, invalid_or_missing_field_names).
+    """
+    try:
+        data = json.loads(strip_code_fences(text))
+    except (json.JSONDecodeError, TypeError):
+        return {}, set(SummaryResponse.model_fields)
+    if not isinstance(data, dict):
+        return {}, set(SummaryResponse.model_fields)
+
+    try:
+        return SummaryResponse.model_validate(data).model_dump(), set()
+    except ValidationError as e:
+        invalid = {str(error["loc"][0]) for error in e.errors() if error["loc"]}
+        valid = {k: v for k, v in data.items() if k in SummaryResponse.model_fields and k not in invalid}
+        return valid, invalid
+
+
+def build_repair_prompt(title, html_content: str, valid: dict, fields: set[str]) -> str:
+    """Ask again for just the broken fields, with only as much context as they need."""
+    hints = "\n".join(
+        f"- {name}: {SummaryResponse.model_fields[name].description or 'required'}"
+        for name in sorted(fields)
+    )
+    context = {k: v for k, v in valid.items() if k != "html_content"}
+    prompt = (
+        "The previous answer was missing or had invalid values for these fields:\n"
+        f"{hints}\n\nReturn only these fields. Already accepted values:\n{json.dumps(context)}"
+    )
+    if fields & ARTICLE_FIELDS:
+        prompt += "\n\n" + build_prompt(title, html_content)
+    else:
+        prompt += f"\n\nTitle {title}"
+    return prompt
+
+
+async def summarize_text_structured(title, html_content: str) -> dict:
+    """
+    Summarize with Gemini's JSON mode and response schema, validated into SummaryResponse.
+    Invalid or missing fields are re-requested on their own (up to GEMINI_MAX_REPAIR_RETRIES),
+    instead of regenerating the whole article.
+    """
+    from google.genai import types
+
+    logger.info("Summarizing text with Gemini (structured output)", extra={"title": title})
+
+    client = get_gemini_client()
+
+    response = await generate_content(
+        client, "structured",
+        model=settings.GEMINI_AI_MODEL,
+        config=types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            response_mime_type="application/json",
+            response_schema=SummaryResponse,
+        ),
+        contents=build_prompt(title, html_content),
+    )
+
+    data, invalid = validate_summary(response.text)
+    if invalid:
+        structured_output_stats["parse_failures"] += 1
+
+    for attempt in range(settings.GEMINI_MAX_REPAIR_RETRIES):
+        if not invalid:
+            break
+
+        structured_output_stats["repair_retries"] += 1
+        logger.warning("Gemini returned invalid fields", extra={"fields": sorted(invalid), "retry": attempt + 1})
+
+        repair_schema = create_model(
+            "SummaryRepair",
+            **{name: (str, SummaryResponse.model_fields[name]) for name in invalid},
+        )
+        response = await generate_content(
+            client, "repair",
+            model=settings.GEMINI_AI_MODEL,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=repair_schema,
+            ),
+            contents=build_repair_prompt(title, html_content, data, invalid),
+        )
+
+        merged = {**data}
+        try:
+            repaired = json.loads(strip_code_fences(response.text))
+            if isinstance(repaired, dict):
+                merged.update({k: v for k, v in repaired.items() if k in invalid})
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+        data, still_invalid = validate_summary(json.dumps(merged))
+        structured_output_stats["repaired_fields"] += len(invalid - still_invalid)
+        invalid = still_invalid
+
+    if invalid:
+        structured_output_stats["unrecovered"] += 1
+        raise ValueError(f"Gemini response still invalid after retries: {sorted(invalid)}")
+
+    response_in_json = to_summary_response(data)
+
+    summary_cache.set(summary_cache_key(title, html_content), response_in_json)
+
+    return response_in_json
+
+
+
+# --------------------------------------------------------
+# Metadata-only mode: the article HTML is never echoed back
+# --------------------------------------------------------
+METADATA_INSTRUCTION = (
+    "Give me some high ranking SEO keywords separated by comma for this article, a slug from the title provided, "
+    "an image URL for the cover image of this article, and an interesting, thought-provoking, informative "
+    "one paragraph plain text summary of the article. Do not return the article itself."
+)
+
+CHUNK_INSTRUCTION = (
+    "Summarize this part of an article in at most three sentences of plain text, "
+    "keeping the key facts and terms."
+)
+
+# Rough size of a token for budgeting prompts
+CHARS_PER_TOKEN = 4
+MAP_CONCURRENCY = 4
+
+
+class MetadataResponse(BaseModel):
+    title: str
+    slug: str
+    seo_keywords: str
+    cover_imgUrl: str
+    plain_text_summary: str
+
+
+class ChunkSummary(BaseModel):
+    summary: str
+
+
+def html_to_text(html_content: str) -> str:
+    """Cheap tag strip; the model only needs the words to write metadata."""
+    text = re.sub(r"<(h[1-6]|p|li|tr|br)[^>]*>", "\n", html_content)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"\n\s*\n+", "\n", html.unescape(text))
+    return text.strip()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def estimate_summary_tokens(html_content: str) -> int:
+    """Rough prompt + response tokens of summarizing an article in the configured mode."""
+    tokens = estimate_tokens(html_content)
+    if settings.SUMMARY_MODE != "metadata":
+        # The full-mode response echoes the article back
+        return 2 * tokens
+    if settings.SUMMARY_LONG_ARTICLE_STRATEGY == "map_reduce":
+        return tokens + settings.SUMMARY_MAX_INPUT_TOKENS
+    return min(tokens, settings.SUMMARY_MAX_INPUT_TOKENS)
+
+
+async def acquire_llm_tokens(html_content: str):
+    """Wait until the token budget allows summarizing this article."""
+    tokens = min(estimate_summary_tokens(html_content), llm_token_budget.capacity)
+    await llm_token_budget.acquire(tokens)
+
+
+def article_excerpt(text: str, max_tokens: int) -> str:
+    """Leading part of the article that fits the token budget, cut at a line or word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def split_chunks(text: str, chunk_tokens: int) -> list[str]:
+    chunks = []
+    while text:
+        chunk = article_excerpt(text, chunk_tokens)
+        chunks.append(chunk)
+        text = text[len(chunk):].lstrip()
+    return chunks
+
+
+async def summarize_chunk(client, chunk: str, semaphore: asyncio.Semaphore) -> str:
+    from google.genai import types
+
+    async with semaphore:
+        response = await generate_content(
+            client, "chunk",
+            model=settings.GEMINI_AI_MODEL,
+            config=types.GenerateContentConfig(
+                system_instruction=CHUNK_INSTRUCTION,
+                response_mime_type="application/json",
+                response_schema=ChunkSummary,
+            ),
+            contents=chunk,
+        )
+    return ChunkSummary.model_validate_json(strip_code_fences(response.text)).summary
+
+
+async def article_digest(client, title, html_content: str) -> str:
+    """
+    Text of the article that fits SUMMARY_MAX_INPUT_TOKENS: the whole text if it fits,
+    otherwise an excerpt or (map-reduce) the concatenated summaries of its chunks.
+    """
+    text = html_to_text(html_content)
+    if estimate_tokens(text) <= settings.SUMMARY_MAX_INPUT_TOKENS:
+        return text
+
+    if settings.SUMMARY_LONG_ARTICLE_STRATEGY == "map_reduce":
+        chunks = split_chunks(text, settings.SUMMARY_CHUNK_TOKENS)
+        logger.info("Article is long, summarizing chunks first", extra={"title": title, "chunks": len(chunks)})
+        semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+        summaries = await asyncio.gather(*(summarize_chunk(client, chunk, semaphore) for chunk in chunks))
+        return article_excerpt("\n".join(summaries), settings.SUMMARY_MAX_INPUT_TOKENS)
+
+    return article_excerpt(text, settings.SUMMARY_MAX_INPUT_TOKENS)
+
+
+async def summarize_metadata(title, html_content: str) -> dict:
+    """
+    Ask Gemini only for title/slug/keywords/cover/summary.
+    The returned html_content is empty; the pipeline splices the summary into the original HTML.
+    """
+    from google.genai import types
+
+    logger.info("Generating metadata with Gemini", extra={"title": title})
+
+    client = get_gemini_client()
+    digest = await article_digest(client, title, html_content)
+
+    response = await generate_content(
+        client, "metadata",
+        model=settings.GEMINI_AI_MODEL,
+        config=types.GenerateContentConfig(
+            system_instruction=METADATA_INSTRUCTION,
+            response_mime_type="application/json",
+            response_schema=MetadataResponse,
+        ),
+        contents=f"Title {title}\n\nArticle:\n{digest}",
+    )
+
+    data = MetadataResponse.model_validate_json(strip_code_fences(response.text)).model_dump()
+    response_in_json = to_summary_response(data)
+
+    summary_cache.set(summary_cache_key(title, html_content), response_in_json)
+
     return response_in_json
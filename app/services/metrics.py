@@ -0,0 +1,180 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+
+# Buckets from 5 ms to 5 min: covers a Notion request as well as a long Gemini call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+STAGE_SECONDS = Histogram(
+    "blogagent_stage_seconds", "Duration of a job pipeline stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+JOB_SECONDS = Histogram(
+    "blogagent_job_critical_path_seconds", "Critical-path latency of a job", buckets=LATENCY_BUCKETS
+)
+JOBS = Counter("blogagent_jobs_total", "Finished jobs", ["status"])
+
+GEMINI_SECONDS = Histogram(
+    "blogagent_gemini_request_seconds", "Gemini request latency", ["kind"], buckets=LATENCY_BUCKETS
+)
+GEMINI_PROMPT_BYTES = Histogram(
+    "blogagent_gemini_prompt_bytes", "Size of the prompt sent to Gemini", ["kind"], buckets=SIZE_BUCKETS
+)
+GEMINI_TOKENS = Counter("blogagent_gemini_tokens_total", "Gemini tokens from usage metadata", ["direction"])
+
+NOTION_SECONDS = Histogram(
+    "blogagent_notion_request_seconds", "Notion request latency", ["method"], buckets=LATENCY_BUCKETS
+)
+NOTION_REQUESTS = Counter("blogagent_notion_requests_total", "Notion requests", ["method", "status"])
+NOTION_RETRIES = Counter("blogagent_notion_retries_total", "Notion requests retried after a 429", ["method"])
+
+EMAIL_SECONDS = Histogram("blogagent_email_seconds", "Email send latency", ["kind"], buckets=LATENCY_BUCKETS)
+EMAILS = Counter("blogagent_emails_total", "Emails sent", ["kind", "status"])
+
+RETRIES = Counter("blogagent_retries_total", "Outbound calls retried after a transient failure", ["dependency"])
+BREAKER_OPEN = Gauge("blogagent_circuit_open", "1 while the dependency's circuit breaker is open", ["dependency"])
+
+PROGRESS_DROPPED = Counter(
+    "blogagent_progress_events_dropped_total", "Progress events dropped because a client fell behind"
+)
+
+# Per-job measurements of the job running in the current task (see track_job)
+_job_metrics: ContextVar[dict | None] = ContextVar("job_metrics", default=None)
+
+
+@contextmanager
+def track_job(metrics: dict | None = None):
+    """
+    Collect measurements made in this context (and tasks/threads started from it) into a dict:
+    { section: { name: total } }. Pass a previous dict to keep adding to it.
+    """
+    metrics = {} if metrics is None else metrics
+    token = _job_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _job_metrics.reset(token)
+
+
+def record(section: str, **values):
+    """Add values to the current job's measurements (no-op outside track_job)."""
+    metrics = _job_metrics.get()
+    if metrics is None:
+        return
+    totals = metrics.setdefault(section, {})
+    for name, value in values.items():
+        totals[name] = round(totals.get(name, 0) + value, 6)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    record("stages", **{stage: seconds})
+
+
+def observe_gemini(kind: str, seconds: float, prompt_bytes: int, usage=None):
+    """Record one Gemini call; `usage` is the response's usage_metadata."""
+    input_tokens = (usage and usage.prompt_token_count) or 0
+    output_tokens = (usage and usage.candidates_token_count) or 0
+
+    GEMINI_SECONDS.labels(kind).observe(seconds)
+    GEMINI_PROMPT_BYTES.labels(kind).observe(prompt_bytes)
+    GEMINI_TOKENS.labels("input").inc(input_tokens)
+    GEMINI_TOKENS.labels("output").inc(output_tokens)
+    record("gemini", requests=1, seconds=seconds, prompt_bytes=prompt_bytes,
+           input_tokens=input_tokens, output_tokens=output_tokens)
+
+
+def observe_notion(method: str, seconds: float, status: str):
+    NOTION_SECONDS.labels(method).observe(seconds)
+    NOTION_REQUESTS.labels(method, status).inc()
+    record("notion", requests=1, seconds=seconds, **({"rate_limited": 1} if status == "rate_limited" else {}))
+
+
+def observe_notion_retry(method: str):
+    NOTION_RETRIES.labels(method).inc()
+    record("notion", retries=1)
+
+
+def observe_email(kind: str, seconds: float, sent: bool):
+    EMAIL_SECONDS.labels(kind).observe(seconds)
+    EMAILS.labels(kind, "sent" if sent else "failed").inc()
+    record("email", seconds=seconds)
+
+
+def timed_iter(iterable, stage: str):
+    """Yield from `iterable`, recording the time spent producing items (not consuming them) as a stage."""
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                total += time.perf_counter() - start
+            yield item
+    finally:
+        observe_stage(stage, total)
+
+
+class StatsCollector:
+    """Exposes counters kept elsewhere (summary cache, structured output stats) on /metrics."""
+
+    def __init__(self, cache, structured_output_stats: dict):
+        self.cache = cache
+        self.structured_output_stats = structured_output_stats
+
+    def collect(self):
+        return self._families(self.cache.stats())
+
+    def describe(self):
+        # Lets the registry learn the metric names without building the cache
+        return self._families({"hits": 0, "misses": 0, "memory_entries": 0})
+
+    def _families(self, stats: dict):
+        for name in ("hits", "misses"):
+            yield CounterMetricFamily(f"blogagent_summary_cache_{name}", f"Summary cache {name}", value=stats[name])
+        yield GaugeMetricFamily("blogagent_summary_cache_memory_entries", "Summaries in the memory cache",
+                                value=stats["memory_entries"])
+        for name, value in self.structured_output_stats.items():
+            yield CounterMetricFamily(f"blogagent_structured_output_{name}", f"Structured output {name}", value=value)
+
+
+def register_stats(cache, structured_output_stats: dict):
+    REGISTRY.register(StatsCollector(cache, structured_output_stats))
+
+
+class JobStoreCollector:
+    """Exposes job counts and the memory held by job payloads on /metrics."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def collect(self):
+        return self._families(self.store.stats())
+
+    def describe(self):
+        # Lets the registry learn the metric names without building the store
+        return self._families({"jobs": {}, "payloads": {"resident_bytes": 0, "spilled_bytes": 0, "uncompressed_bytes": 0}})
+
+    def _families(self, stats: dict):
+        jobs = GaugeMetricFamily("blogagent_jobs_stored", "Jobs in the job store", labels=["status"])
+        for status, count in stats["jobs"].items():
+            jobs.add_metric([status], count)
+        yield jobs
+        payloads = stats.get("payloads")
+        if payloads:
+            yield GaugeMetricFamily("blogagent_job_payload_resident_bytes", "Compressed job HTML held in memory",
+                                    value=payloads["resident_bytes"])
+            yield GaugeMetricFamily("blogagent_job_payload_spilled_bytes", "Compressed job HTML spilled to disk",
+                                    value=payloads["spilled_bytes"])
+            yield GaugeMetricFamily("blogagent_job_payload_uncompressed_bytes", "Job HTML before compression",
+                                    value=payloads["uncompressed_bytes"])
+
+
+def register_job_stats(store):
+    REGISTRY.register(JobStoreCollector(store))
@@ -1,51 +1,36 @@
+"""
+Email notifications. Messages are rendered from templates compiled once, queued in a background
+outbox and sent through a transport: Brevo, SMTP, or a folder of .eml files for local runs.
+Blog notifications queued within EMAIL_COALESCE_SECONDS of each other go out as one digest.
+"""
+import asyncio
+import html
+import logging
+import os
+import smtplib
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from string import Template
 from app.config import settings
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
+from app.services.metrics import observe_email
+from app.services.ratelimit import parse_retry_after
+from app.services.resilience import CircuitOpen, Failure, call_with_retry, status_failure
 
+logger = logging.getLogger(__name__)
 
-def send_email_notification(blog_title, blog_url):
-    """
-    Send an email notification using Brevo API when a new blog is uploaded.
-
-    Parameters:
-    - blog_title (str): Title of the new blog.
-    - blog_url (str): Notion URL link to the blog.
-    """
-
-    print("Sending email notification...")
-
-    # Configure API key authorization
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = settings.BREVO_API_KEY
+SENDER_NAME = "RILA AI Agent"
 
-    # Create an instance of the transactional email API
-    api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-        sib_api_v3_sdk.ApiClient(configuration))
 
-    # Prepare the email content
-    subject = f"New Blog Created: {blog_title}"
-    html_content = f"""
+# --------------------------------------------------------
+# Templates (compiled once; every value substituted is escaped)
+# --------------------------------------------------------
+LAYOUT = Template("""
     <html>
     <body style="font-family: Arial, sans-serif; background-color: #ffffff; color: #000000; margin: 0; padding: 0;">
         <div style="max-width: 600px; margin: 10px auto; padding: 20px;">
-        
-        <!-- Notification Header -->
-        <h2 style="color: #D32F2F; text-align: center;">🎉 New Blog Created!</h2>
-        <p style="text-align: center; font-size: 16px; color: #333333;">
-            RILA's AI Agent has successfully uploaded a new blog for you.
-        </p>
-        
-        <!-- Blog Title -->
-        <div style="margin: 20px 0; padding: 15px; background-color: #f8f8f8; border-left: 5px solid #D32F2F;">
-            <h3 style="margin: 5px 0 0 0; color: #000000;"><strong>{blog_title}</strong></h3>
-        </div>
-        
-        <!-- Blog URL -->
-        <p style="font-size: 14px; color: #000000;">
-            Please review the blog and click publish on Notion: <br/> <br/>
-            <a href="{blog_url}" style="color: #D32F2F; text-decoration: none;">{blog_url}</a>
-        </p>
-        
+        $content
         <!-- Footer -->
         <p style="margin-top: 30px; font-size: 14px; color: #000000;">
             Have a nice day!<br/><br/>
@@ -60,30 +45,442 @@ def send_email_notification(blog_title, blog_url):
         </div>
     </body>
     </html>
-    """
+    """)
+
+BLOG_TEMPLATE = Template("""
+        <!-- Notification Header -->
+        <h2 style="color: #D32F2F; text-align: center;">🎉 New Blog Created!</h2>
+        <p style="text-align: center; font-size: 16px; color: #333333;">
+            RILA's AI Agent has successfully uploaded a new blog for you.
+        </p>
+
+        <!-- Blog Title -->
+        <div style="margin: 20px 0; padding: 15px; background-color: #f8f8f8; border-left: 5px solid #D32F2F;">
+            <h3 style="margin: 5px 0 0 0; color: #000000;"><strong>$title</strong></h3>
+        </div>
 
-    sender = {"name": "RILA AI Agent", "email": settings.BREVO_SENDER_EMAIL}
+        <!-- Blog URL -->
+        <p style="font-size: 14px; color: #000000;">
+            Please review the blog and click publish on Notion: <br/> <br/>
+            <a href="$url" style="color: #D32F2F; text-decoration: none;">$url</a>
+        </p>
+        """)
+
+DIGEST_TEMPLATE = Template("""
+        <h2 style="color: #D32F2F; text-align: center;">🎉 $count New Blogs Created!</h2>
+        <p style="text-align: center; font-size: 16px; color: #333333;">
+            RILA's AI Agent has successfully uploaded a batch of blogs for you.
+        </p>
+
+        <p style="font-size: 14px; color: #000000;">Please review the blogs and click publish on Notion:</p>
+        <ul style="font-size: 14px; color: #000000; padding-left: 20px;">$posts</ul>
+        $failed
+        """)
 
-    recipients = [
-        email.strip()
-        for email in settings.EMAIL_TO.split(",")
-        if email.strip()
-    ]
+DIGEST_POST_TEMPLATE = Template(
+    '<li style="margin: 8px 0;"><strong>$title</strong><br/>'
+    '<a href="$url" style="color: #D32F2F; text-decoration: none;">$url</a></li>'
+)
 
-    to = [{"email": email} for email in recipients]
+DIGEST_FAILED_TEMPLATE = Template("""
+        <p style="font-size: 14px; color: #000000;">These documents could not be uploaded:</p>
+        <ul style="font-size: 14px; color: #999999;">$items</ul>
+        """)
 
-    send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-        to=to,
-        sender=sender,
-        subject=subject,
-        html_content=html_content
+DIGEST_FAILED_ITEM_TEMPLATE = Template('<li style="margin: 4px 0;">$title: $error</li>')
+
+
+def render(template: Template, **values) -> str:
+    return template.substitute({key: html.escape(str(value)) for key, value in values.items()})
+
+
+def render_blog_email(blog_title, blog_url) -> tuple[str, str]:
+    """(subject, HTML) of the notification for one created blog."""
+    content = render(BLOG_TEMPLATE, title=blog_title, url=blog_url)
+    return f"New Blog Created: {blog_title}", LAYOUT.substitute(content=content)
+
+
+def render_digest_email(posts, failed=()) -> tuple[str, str]:
+    """(subject, HTML) of one email listing several created blogs and the documents that failed."""
+    failed_section = ""
+    if failed:
+        items = "".join(render(DIGEST_FAILED_ITEM_TEMPLATE, title=item["title"], error=item["error"]) for item in failed)
+        failed_section = DIGEST_FAILED_TEMPLATE.substitute(items=items)
+    content = DIGEST_TEMPLATE.substitute(
+        count=len(posts),
+        posts="".join(render(DIGEST_POST_TEMPLATE, title=post["title"], url=post["url"]) for post in posts),
+        failed=failed_section,
     )
+    return f"{len(posts)} New Blogs Created", LAYOUT.substitute(content=content)
+
+
+def parse_recipients(value: str) -> list[str]:
+    return [email.strip() for email in value.split(",") if email.strip()]
+
+
+# --------------------------------------------------------
+# Transports
+# --------------------------------------------------------
+class EmailTransport:
+    """
+    Sends a rendered email. `send` blocks, so it is called from a worker thread.
+
+    Parameters:
+    - sender (str): From address.
+    - recipients (list[str]): To addresses, parsed once from EMAIL_TO.
+    """
+
+    def __init__(self, sender: str, recipients: list[str]):
+        self.sender = sender
+        self.recipients = recipients
+
+    def send(self, subject: str, html_content: str) -> str:
+        """Send the email; returns the provider's message id."""
+        raise NotImplementedError
+
+    def classify_error(self, e: Exception) -> Failure:
+        return Failure(retry=False)
+
+    def close(self):
+        pass
+
+
+_api_instance = None
+
+
+def get_email_api():
+    """Long-lived Brevo transactional email API; its ApiClient keeps a pooled urllib3 manager."""
+    global _api_instance
+    if _api_instance is None:
+        # Imported on first use: the SDK takes ~0.15s to import
+        import sib_api_v3_sdk
+
+        # Configure API key authorization
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = settings.BREVO_API_KEY
+        if settings.BREVO_API_HOST:
+            configuration.host = settings.BREVO_API_HOST
 
+        # Create an instance of the transactional email API
+        _api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
+            sib_api_v3_sdk.ApiClient(configuration))
+    return _api_instance
+
+
+class BrevoTransport(EmailTransport):
+    """Brevo transactional emails, through one long-lived API client."""
+
+    def send(self, subject: str, html_content: str) -> str:
+        import sib_api_v3_sdk
+
+        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+            to=[{"email": email} for email in self.recipients],
+            sender={"name": SENDER_NAME, "email": self.sender},
+            subject=subject,
+            html_content=html_content
+        )
+        api_response = get_email_api().send_transac_email(
+            send_smtp_email, _request_timeout=settings.EMAIL_REQUEST_TIMEOUT_SECONDS
+        )
+        return api_response.message_id
+
+    def classify_error(self, e: Exception) -> Failure:
+        import urllib3
+        from sib_api_v3_sdk.rest import ApiException
+
+        if isinstance(e, ApiException):
+            # Header names are case-insensitive, but e.headers may be a plain dict
+            retry_after = next((value for key, value in (e.headers or {}).items() if key.lower() == "retry-after"), None)
+            return status_failure(e.status, parse_retry_after(retry_after) if retry_after else None)
+        if isinstance(e, urllib3.exceptions.HTTPError):
+            # Timeouts and connection errors
+            return Failure(retry=True, outage=True)
+        return Failure(retry=False)
+
+
+def build_message(sender: str, recipients: list[str], subject: str, html_content: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = f"{SENDER_NAME} <{sender}>"
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message["Message-ID"] = f"<{uuid.uuid4()}@{sender.rpartition('@')[2] or 'localhost'}>"
+    message.set_content(html_content, subtype="html")
+    return message
+
+
+class SmtpTransport(EmailTransport):
+    """
+    SMTP with one connection kept open between emails (and reopened when the server drops it).
+
+    Parameters:
+    - host, port (str, int): SMTP server.
+    - username, password (str): Login, if the server needs one.
+    - starttls (bool): Upgrade the connection with STARTTLS before logging in.
+    """
+
+    def __init__(self, sender: str, recipients: list[str], host: str, port: int,
+                 username: str = "", password: str = "", starttls: bool = True):
+        super().__init__(sender, recipients)
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self._connection = None
+        # One SMTP conversation at a time on the shared connection
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=settings.EMAIL_REQUEST_TIMEOUT_SECONDS)
+        try:
+            if self.starttls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def _drop_connection(self):
+        """Close the socket without a QUIT, which a broken connection can't deliver. Call with the lock held."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def send(self, subject: str, html_content: str) -> str:
+        message = build_message(self.sender, self.recipients, subject, html_content)
+        with self._lock:
+            try:
+                if self._connection is None:
+                    self._connection = self._connect()
+                try:
+                    self._connection.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    # Idle connections get closed by the server; reconnect once
+                    self._drop_connection()
+                    self._connection = self._connect()
+                    self._connection.send_message(message)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # The server answered and reset the transaction: the connection is still usable
+                raise
+            except BaseException:
+                self._drop_connection()
+                raise
+        return message["Message-ID"]
+
+    def classify_error(self, e: Exception) -> Failure:
+        if isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+            # A bad address: retrying won't help, and the server is fine
+            return Failure(retry=False)
+        if isinstance(e, smtplib.SMTPResponseException):
+            # 4xx replies are temporary, 5xx are not
+            return Failure(retry=400 <= e.smtp_code < 500, outage=400 <= e.smtp_code < 500)
+        if isinstance(e, OSError):
+            # Connection errors and timeouts (send has already dropped the connection)
+            return Failure(retry=True, outage=True)
+        return Failure(retry=False)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._connection.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._drop_connection()
+
+
+class FileTransport(EmailTransport):
+    """Writes every email as an .eml file to a folder instead of sending it (local runs, tests, benchmarks)."""
+
+    def __init__(self, sender: str, recipients: list[str], directory: str):
+        super().__init__(sender, recipients)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, subject: str, html_content: str) -> str:
+        message = build_message(self.sender, self.recipients, subject, html_content)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.eml"
+        with open(os.path.join(self.directory, name), "wb") as f:
+            f.write(message.as_bytes())
+        return message["Message-ID"]
+
+
+def create_email_transport() -> EmailTransport:
+    sender = settings.EMAIL_SENDER or settings.BREVO_SENDER_EMAIL
+    recipients = parse_recipients(settings.EMAIL_TO)
+    if settings.EMAIL_TRANSPORT == "brevo":
+        return BrevoTransport(sender, recipients)
+    if settings.EMAIL_TRANSPORT == "smtp":
+        return SmtpTransport(
+            sender, recipients, settings.SMTP_HOST, settings.SMTP_PORT,
+            settings.SMTP_USERNAME, settings.SMTP_PASSWORD, settings.SMTP_STARTTLS,
+        )
+    if settings.EMAIL_TRANSPORT == "file":
+        return FileTransport(sender, recipients, settings.EMAIL_FILE_DIR)
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {settings.EMAIL_TRANSPORT}")
+
+
+_transport = None
+
+
+def get_email_transport() -> EmailTransport:
+    global _transport
+    if _transport is None:
+        _transport = create_email_transport()
+        # Create the Brevo client now (in the warm-up thread) rather than on the first email
+        if isinstance(_transport, BrevoTransport):
+            get_email_api()
+    return _transport
+
+
+async def _deliver(kind: str, subject: str, html_content: str) -> bool:
+    """
+    Send an email from a worker thread, with retries.
+    Returns False if it could not be sent; CircuitOpen propagates so the job waits for the provider.
+    """
+    transport = get_email_transport()
+    start = time.perf_counter()
+    sent = False
     try:
-        api_response = api_instance.send_transac_email(send_smtp_email)
-        print(
-            f"Email sent successfully. Message ID: {api_response.message_id}")
-        return True
-    except ApiException as e:
-        print(f"Exception when sending email: {e}")
-        return False
+        message_id = await call_with_retry(
+            "email", asyncio.to_thread, transport.send, subject, html_content, classify=transport.classify_error,
+        )
+        sent = True
+        logger.info("Email sent", extra={"kind": kind, "message_id": message_id})
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.error("Sending email failed", extra={"kind": kind, "error": str(e)})
+    finally:
+        observe_email(kind, time.perf_counter() - start, sent)
+    return sent
+
+
+# --------------------------------------------------------
+# Outbox
+# --------------------------------------------------------
+class Outbox:
+    """
+    Queue of emails sent by a background task. Blog notifications queued within
+    EMAIL_COALESCE_SECONDS of the first one (up to EMAIL_DIGEST_MAX_POSTS) are merged into one
+    digest email; batch digests are sent as they are. At most EMAIL_CONCURRENCY emails are sent
+    at the same time, and callers wait for their email to be sent.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._slots = None
+        self._sending: set[asyncio.Task] = set()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(settings.EMAIL_CONCURRENCY)
+            self._sending = set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Send what is queued, then stop."""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.put(None)
+            await self._task
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        self._task = None
+        if _transport is not None:
+            _transport.close()
+
+    async def submit(self, kind: str, item) -> bool:
+        """Queue an email ("blog": {title, url}, "digest": (posts, failed)) and wait until it is sent."""
+        # Started on first use, so scripts running the pipeline without the app get emails too
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((kind, item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            entry = await self._queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            if entry[0] == "blog" and settings.EMAIL_COALESCE_SECONDS > 0:
+                deadline = loop.time() + settings.EMAIL_COALESCE_SECONDS
+                while len(batch) < settings.EMAIL_DIGEST_MAX_POSTS:
+                    try:
+                        # Take what is already queued, then wait out the window
+                        nxt = self._queue.get_nowait() if self._queue.qsize() else \
+                            await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                    except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                        break
+                    if nxt is None:
+                        stopping = True
+                        break
+                    if nxt[0] != "blog":
+                        # Digests go out on their own
+                        self._dispatch([nxt])
+                        continue
+                    batch.append(nxt)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        task = asyncio.create_task(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch):
+        kind, item, _ = batch[0]
+        if kind == "digest":
+            subject, html_content = render_digest_email(*item)
+        elif len(batch) == 1:
+            subject, html_content = render_blog_email(item["title"], item["url"])
+        else:
+            kind = "blog_digest"
+            subject, html_content = render_digest_email([post for _, post, _ in batch])
+
+        async with self._slots:
+            try:
+                sent = await _deliver(kind, subject, html_content)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(sent)
+
+
+outbox = Outbox()
+
+
+async def send_email_notification(blog_title, blog_url) -> bool:
+    """
+    Email the recipients that a new blog was created, through the outbox
+    (possibly in one digest with other blogs created at about the same time).
+
+    Parameters:
+    - blog_title (str): Title of the new blog.
+    - blog_url (str): Notion URL link to the blog.
+    """
+    logger.info("Queueing email notification", extra={"title": blog_title})
+    return await outbox.submit("blog", {"title": blog_title, "url": blog_url})
+
+
+async def send_digest_notification(posts, failed=()) -> bool:
+    """
+    Send one email listing every blog created by a batch upload, instead of one email per blog.
+
+    Parameters:
+    - posts (list[dict]): { title, url } of each created blog.
+    - failed (list[dict]): { title, error } of each document that could not be processed.
+    """
+    logger.info("Queueing digest email", extra={"posts": len(posts), "failed": len(failed)})
+    return await outbox.submit("digest", (list(posts), list(failed)))
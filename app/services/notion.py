@@ -1,170 +1,931 @@
-from datetime import datetime
-from notion_client import Client
-from app.config import settings
-from bs4 import BeautifulSoup  # for parsing HTML
-import copy
-
-
-def rich_text_from_html(element):
-    """Recursively convert inline HTML tags into Notion rich text list."""
-    fragments = []
-
-    for node in element.children:
-        if node.name is None:
-            # plain text
-            # [{"type": "text", "text": {"content": element.get_text()}}]
-            text = (node.string or "")
-            if text:
-                fragments.append({
-                    "type": "text",
-                    "text": {"content": text}
-                })
-
-        elif node.name in ["strong", "b"]:
-            fragments.append({
-                "type": "text",
-                "text": {"content": node.get_text()},
-                "annotations": {"bold": True}
-            })
+import asyncio
+import itertools
+import logging
+import time
+import httpx
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+from app.config import LazyObject, settings
+from app.services.cache import content_key
+from app.services.ratelimit import TokenBucket, parse_retry_after
+from app.services.metrics import observe_notion, observe_notion_retry, timed_iter
+from app.services.resilience import Failure, backoff_delay, call_with_retry, status_failure
+from html.parser import HTMLParser
 
-        elif node.name in ["em", "i"]:
-            fragments.append({
-                "type": "text",
-                "text": {"content": node.get_text()},
-                "annotations": {"italic": True}
-            })
+logger = logging.getLogger(__name__)
 
-        elif node.name == "code":
-            fragments.append({
-                "type": "text",
-                "text": {"content": node.get_text()},
-                "annotations": {"code": True}
-            })
+# Notion API limits for blocks.children.append
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_BLOCKS_PER_PAYLOAD = 1000
+# Up to two levels of nesting are accepted in a single request
+MAX_NESTING_DEPTH = 2
+# Max length of one rich_text content string
+MAX_TEXT_LENGTH = 2000
+# `after` value of append_blocks that inserts at the top of the parent
+START = "start"
+# Client methods whose requests must not be resent once they may have reached Notion:
+# a second pages.create makes a duplicate page, a second append duplicates the blocks
+NOT_IDEMPOTENT_METHODS = {"create", "append"}
 
-        elif node.name == "a":
-            fragments.append({
-                "type": "text",
-                "text": {
-                    "content": node.get_text(),
-                    "link": {"url": node.get("href")}
-                }
-            })
+# Shared by every job in the process so concurrent uploads stay under the limit together
+notion_limiter = LazyObject(lambda: TokenBucket(settings.NOTION_REQUESTS_PER_SECOND, settings.NOTION_BURST))
+
+_client = None
+
+
+def get_notion_client():
+    """Long-lived async Notion client with a pooled keep-alive connection."""
+    global _client
+    if _client is None:
+        # Imported on first use, like the Gemini and Brevo SDKs
+        from notion_client import AsyncClient
+
+        options = {"base_url": settings.NOTION_BASE_URL} if settings.NOTION_BASE_URL else {}
+        _client = AsyncClient(auth=settings.NOTION_API_KEY, retry=False, **options)
+    return _client
+
+
+async def close_notion_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
-        else:
-            # handle nested inline elements recursively
-            fragments.extend(rich_text_from_html(node))
 
-    return fragments
+# --------------------------------------------------------
+# HTML -> Notion blocks (single pass, streaming)
+# --------------------------------------------------------
+INLINE_ANNOTATIONS = {
+    "strong": {"bold": True},
+    "b": {"bold": True},
+    "em": {"italic": True},
+    "i": {"italic": True},
+    "u": {"underline": True},
+    "s": {"strikethrough": True},
+    "del": {"strikethrough": True},
+    "strike": {"strikethrough": True},
+    "code": {"code": True},
+}
 
-def build_list_block(li, block_type):
+# Text blocks and the Notion block type they map to (Notion has three heading levels)
+TEXT_BLOCK_TAGS = {
+    "p": "paragraph",
+    "h1": "heading_1",
+    "h2": "heading_2",
+    "h3": "heading_3",
+    "h4": "heading_3",
+    "h5": "heading_3",
+    "h6": "heading_3",
+    "blockquote": "quote",
+    "pre": "code",
+}
+LIST_TAGS = {"ul": "bulleted_list_item", "ol": "numbered_list_item"}
+
+# Elements whose content is not part of the article; any other unknown container is descended into
+SKIPPED_TAGS = {
+    "head", "title", "script", "style", "template", "noscript", "svg", "math", "iframe", "object",
+    "canvas", "video", "audio", "select", "textarea", "button",
+}
+
+# Inline elements: at the top level they (and bare text) are wrapped in an implicit paragraph
+PHRASING_TAGS = set(INLINE_ANNOTATIONS) | {
+    "a", "span", "sub", "sup", "mark", "small", "abbr", "cite", "q", "kbd", "samp", "var", "time",
+    "label", "font", "br", "wbr", "img",
+}
+
+# Block-level tags nested inside another text block start a new line in it
+LINE_BREAK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"}
+
+# Elements that never have an end tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Languages accepted by Notion code blocks that <code class="language-..."> may name
+CODE_LANGUAGES = {
+    "bash", "c", "c#", "c++", "css", "go", "html", "java", "javascript", "json", "kotlin", "markdown",
+    "php", "python", "ruby", "rust", "shell", "sql", "swift", "typescript", "xml", "yaml",
+}
+
+# Stack entries that receive text, and those whose direct text is ignored
+TEXT_TARGETS = {"block", "item", "cell"}
+TEXT_BARRIERS = {"list", "table", "row", "skip"}
+
+
+def split_text(text: str):
+    """Split a string into pieces that fit Notion's rich_text content limit."""
+    return [text[i:i + MAX_TEXT_LENGTH] for i in range(0, len(text), MAX_TEXT_LENGTH)] or [""]
+
+
+def rich_text_items(fragments):
     """
-    Build a Notion list item block, supporting nested lists without duplicating nested text.
-    Only the direct text/inline children of <li> are used in rich_text.
+    Turn (text, annotations, href) fragments into Notion rich_text,
+    coalescing neighbours with identical formatting.
     """
-    # Extract only direct content of <li> excluding nested <ul>/<ol>
-    li_content = copy.deepcopy(li)
-    
-    # Remove nested lists from this copy
-    for child_list in li_content.find_all(["ul", "ol"], recursive=False):
-        child_list.decompose()  # remove nested lists from rich_text
+    merged = []
+    for text, annotations, href in fragments:
+        if not text:
+            continue
+        if merged and merged[-1][1] == annotations and merged[-1][2] == href:
+            merged[-1][0].append(text)
+        else:
+            merged.append(([text], annotations, href))
 
-    # Build base block
-    block = {
+    rich_text = []
+    for parts, annotations, href in merged:
+        for piece in split_text("".join(parts)):
+            text = {"content": piece}
+            if href:
+                text["link"] = {"url": href}
+            item = {"type": "text", "text": text}
+            if annotations:
+                item["annotations"] = dict(annotations)
+            rich_text.append(item)
+    return rich_text
+
+
+def text_block(block_type: str, rich_text: list, **fields):
+    return {
         "object": "block",
         "type": block_type,
-        block_type: {
-            "rich_text": rich_text_from_html(li_content)
-        }
+        block_type: {"rich_text": rich_text, **fields},
     }
 
-    # Handle nested lists
-    children = []
-    for nested_list in li.find_all(["ul", "ol"], recursive=False):
-        nested_type = "bulleted_list_item" if nested_list.name == "ul" else "numbered_list_item"
-        for nested_li in nested_list.find_all("li", recursive=False):
-            children.append(build_list_block(nested_li, nested_type))
 
-    if children:
-        block[block_type]["children"] = children
+class NotionBlockParser(HTMLParser):
+    """
+    Event-driven HTML -> Notion blocks converter covering what mammoth emits:
+    <p>, <h1>-<h6>, <ul>/<ol> (nested), <table>, <img>, <blockquote>, <pre>, <hr>,
+    and inline <strong>/<b>, <em>/<i>, <u>, <s>, <code>, <a>, <br> (nested formatting is combined).
+    Other containers (<div>, <section>, <figure>...) are descended into, and text outside any block
+    becomes a paragraph. Finished top-level blocks are collected in `completed` as soon as their element closes.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.completed = []
+        # Open elements: dicts with "tag" and "kind"
+        # (block, item, list, table, row, cell, inline, transparent, skip, other)
+        self._open = []
+        # Images/dividers found inside a block; emitted after the enclosing top-level block
+        self._pending = []
+        # True while consecutive data events belong to the same text node (split across feeds)
+        self._in_text = False
+
+    def drain(self):
+        blocks, self.completed = self.completed, []
+        return blocks
+
+    def close(self):
+        super().close()
+        while self._open:
+            self._pop()
+
+    # ----- element stack -----
+    def _at_top(self) -> bool:
+        return all(entry["kind"] == "transparent" for entry in self._open)
+
+    def _push(self, tag, kind, **fields):
+        self._open.append({"tag": tag, "kind": kind, **fields})
+
+    def _open_implicit_paragraph(self):
+        # No tag: only closed by a block-level element or the end of its container
+        self._push("", "block", block_type="paragraph", fragments=[], language="plain text", implicit=True)
+
+    def _close_implicit_paragraph(self):
+        if any(entry.get("implicit") for entry in self._open):
+            while not self._open[-1].get("implicit"):
+                self._pop()
+            self._pop()
+
+    def _pop(self):
+        entry = self._open.pop()
+        kind = entry["kind"]
+        if kind == "block":
+            self._finish_block(entry)
+        elif kind == "item":
+            self._finish_item(entry)
+        elif kind == "cell":
+            entry["row"]["cells"].append(rich_text_items(entry["fragments"]))
+        elif kind == "row":
+            entry["table"]["rows"].append((entry["cells"], entry["header"]))
+        elif kind == "table":
+            self._finish_table(entry)
+
+        if self._at_top() and self._pending:
+            self.completed.extend(self._pending)
+            self._pending = []
+
+    def _nearest(self, kinds):
+        for entry in reversed(self._open):
+            if entry["kind"] in kinds:
+                return entry
+        return None
+
+    def _text_target(self):
+        """Innermost entry collecting text, or None if text here is dropped."""
+        for index in range(len(self._open) - 1, -1, -1):
+            kind = self._open[index]["kind"]
+            if kind in TEXT_BARRIERS:
+                return None, None
+            if kind in TEXT_TARGETS:
+                return index, self._open[index]
+        return None, None
+
+    def _emit(self, block):
+        """Emit a standalone block (image, divider) now, or after the enclosing top-level block."""
+        if self._at_top():
+            if block:
+                self.completed.append(block)
+            return
+        index, target = self._text_target()
+        if target is not None:
+            target["media"] = True
+        if block:
+            self._pending.append(block)
+
+    def handle_starttag(self, tag, attrs):
+        self._in_text = False
+
+        if self._nearest({"skip"}):
+            if tag not in VOID_TAGS:
+                self._push(tag, "other")
+            return
+        if tag not in PHRASING_TAGS:
+            self._close_implicit_paragraph()
+
+        if tag == "img":
+            src = dict(attrs).get("src") or ""
+            alt = dict(attrs).get("alt") or ""
+            # Notion can only show images it can fetch; data: URIs are dropped
+            self._emit({
+                "object": "block",
+                "type": "image",
+                "image": {"type": "external", "external": {"url": src},
+                          "caption": rich_text_items([(alt, None, None)])},
+            } if src.startswith(("http://", "https://")) else None)
+            return
+        if tag == "hr":
+            self._emit({"object": "block", "type": "divider", "divider": {}})
+            return
+        if tag == "br":
+            self.handle_data("\n")
+            self._in_text = False
+            return
+        if tag in VOID_TAGS:
+            return
+
+        if self._at_top():
+            if tag in TEXT_BLOCK_TAGS:
+                self._push(tag, "block", block_type=TEXT_BLOCK_TAGS[tag], fragments=[], language="plain text")
+            elif tag in LIST_TAGS:
+                self._push(tag, "list", parent=None)
+            elif tag == "table":
+                self._push(tag, "table", rows=[])
+            elif tag in SKIPPED_TAGS:
+                self._push(tag, "skip")
+            elif tag in PHRASING_TAGS:
+                self._open_implicit_paragraph()
+                self._push(tag, "inline" if tag in INLINE_ANNOTATIONS or tag == "a" else "other",
+                           href=dict(attrs).get("href"))
+            else:
+                # Containers (div, section, figure...): their content is treated as top-level content
+                self._push(tag, "transparent")
+            return
+
+        top = self._open[-1]
+        structure = self._nearest({"list", "item", "table", "row", "cell", "block"})
+
+        if tag in LIST_TAGS and top["kind"] == "item":
+            self._push(tag, "list", parent=top)
+        elif tag == "li" and top["kind"] == "list":
+            self._push(tag, "item", block_type=LIST_TAGS[top["tag"]], fragments=[], children=[], parent=top["parent"])
+        elif tag == "tr" and structure["kind"] == "table":
+            self._push(tag, "row", table=structure, cells=[], header=structure.get("in_head", False))
+        elif tag in ("td", "th") and structure["kind"] == "row":
+            if tag == "td":
+                structure["header"] = False
+            elif not structure["cells"]:
+                structure["header"] = True
+            self._push(tag, "cell", row=structure, fragments=[])
+        elif tag == "thead" and structure["kind"] == "table":
+            structure["in_head"] = True
+            self._push(tag, "other")
+        elif tag in ("tbody", "tfoot") and structure["kind"] == "table":
+            structure["in_head"] = False
+            self._push(tag, "other")
+        elif tag == "table":
+            # Nested tables have no Notion equivalent
+            self._push(tag, "skip")
+        elif tag == "code" and structure and structure.get("block_type") == "code":
+            language = (dict(attrs).get("class") or "").removeprefix("language-").lower()
+            if language in CODE_LANGUAGES:
+                structure["language"] = language
+            self._push(tag, "other")
+        elif tag in INLINE_ANNOTATIONS or tag == "a":
+            self._push(tag, "inline", href=dict(attrs).get("href"))
+        else:
+            if tag in LINE_BREAK_TAGS:
+                index, target = self._text_target()
+                if target is not None and target["fragments"]:
+                    self.handle_data("\n")
+                    self._in_text = False
+            self._push(tag, "other")
+
+    def handle_endtag(self, tag):
+        self._in_text = False
+        if not any(entry["tag"] == tag for entry in self._open):
+            return
+        # Close everything up to the matching element (tolerates unclosed inline tags)
+        while self._open:
+            closing = self._open[-1]["tag"] == tag
+            self._pop()
+            if closing:
+                break
+
+    def handle_data(self, data):
+        target_index, target = self._text_target()
+        if target is None:
+            if not (data.strip() and self._at_top()):
+                return
+            self._open_implicit_paragraph()
+            target_index, target = self._text_target()
+
+        fragments = target["fragments"]
+        continues_text = self._in_text and fragments
+        self._in_text = True
+        if continues_text:
+            fragments[-1] = (fragments[-1][0] + data, fragments[-1][1], fragments[-1][2])
+            return
+
+        # Combine the formatting of every enclosing inline element; the innermost link wins
+        annotations, href = {}, None
+        if target.get("block_type") != "code":
+            for entry in self._open[target_index + 1:]:
+                if entry["kind"] == "inline":
+                    if entry["tag"] == "a":
+                        href = entry["href"] or href
+                    else:
+                        annotations.update(INLINE_ANNOTATIONS[entry["tag"]])
+        fragments.append((data, annotations or None, href))
+
+    # ----- block construction -----
+    def _finish_block(self, entry):
+        block_type = entry["block_type"]
+        fragments = entry["fragments"]
+        if entry.get("implicit") and fragments:
+            # Whitespace around loose text is only the source's indentation
+            fragments[0] = (fragments[0][0].lstrip(), *fragments[0][1:])
+            fragments[-1] = (fragments[-1][0].rstrip(), *fragments[-1][1:])
+        rich_text = rich_text_items(fragments)
 
-    return block
+        if block_type == "paragraph" and not rich_text and (entry.get("media") or entry.get("implicit")):
+            # <p><img/></p>: the image block replaces the empty paragraph
+            return
+        if block_type.startswith("heading") and not rich_text:
+            rich_text = [{"type": "text", "text": {"content": ""}}]
+
+        fields = {"language": entry["language"]} if block_type == "code" else {}
+        self.completed.append(text_block(block_type, rich_text, **fields))
+
+    def _finish_item(self, entry):
+        block = text_block(entry["block_type"], rich_text_items(entry["fragments"]))
+        if entry["children"]:
+            block[entry["block_type"]]["children"] = entry["children"]
+
+        if entry["parent"] is None:
+            self.completed.append(block)
+        else:
+            entry["parent"]["children"].append(block)
+
+    def _finish_table(self, entry):
+        rows = entry["rows"]
+        if not rows:
+            return
+        width = max(len(cells) for cells, _ in rows) or 1
+        self.completed.append({
+            "object": "block",
+            "type": "table",
+            "table": {
+                "table_width": width,
+                "has_column_header": rows[0][1],
+                "has_row_header": False,
+                "children": [
+                    {
+                        "object": "block",
+                        "type": "table_row",
+                        "table_row": {"cells": cells + [[] for _ in range(width - len(cells))]},
+                    }
+                    for cells, _ in rows
+                ],
+            },
+        })
+
+
+def iter_notion_blocks(html: str, chunk_size: int = 16 * 1024):
+    """
+    Convert HTML to Notion blocks in one pass, yielding each top-level block
+    as soon as it is complete so uploads can start before conversion finishes.
+    """
+    parser = NotionBlockParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
 
 
 def html_to_notion_blocks(html: str):
     """
-    Converts simple HTML content to Notion blocks.
-    Currently supports: <p>, <h1>-<h3>, <ul>, <ol>, <li>, <strong>, <em>
+    Converts HTML content to Notion blocks.
+    Supports: <p>, <h1>-<h6>, <ul>, <ol>, <li>, <table>, <img>, <blockquote>, <pre>, <hr>,
+    and inline <strong>, <em>, <u>, <s>, <code>, <a>, <br>
     """
-    soup = BeautifulSoup(html, "html.parser")
-    blocks = []
+    return list(iter_notion_blocks(html))
 
-    for element in soup.children:
-        if element.name == "p":
-            blocks.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": rich_text_from_html(element)
-                }
-            })
-        elif element.name in ["h1", "h2", "h3"]:
-            blocks.append({
-                "object": "block",
-                "type": "heading_" + str(element.name[-1]),
-                "heading_" + str(element.name[-1]): {
-                    "rich_text": [{"type": "text", "text": {"content": element.get_text()}}]
-                }
-            })
-        elif element.name in ["ul", "ol"]:
 
-            list_block_type = "bulleted_list_item" if element.name == "ul" else "numbered_list_item"
+def notion_error_code(e: Exception) -> str | None:
+    """The Notion API error code of `e` (e.g. "object_not_found"), or None for other exceptions."""
+    from notion_client.errors import APIResponseError
 
-            for li in element.find_all("li", recursive=False):
-                blocks.append(build_list_block(li, list_block_type))
+    return e.code if isinstance(e, APIResponseError) else None
 
-    return blocks
 
-async def create_notion_page(title: str, slug: str, seo_keywords: str, coverImg: str, ai_summary: str, html_content: str):
-    print("Creating Notion page with title:", title)
-    
-    # Convert HTML to Notion blocks
-    blocks = html_to_notion_blocks(html_content)
+def is_rate_limited(e: Exception) -> bool:
+    return notion_error_code(e) == "rate_limited"
 
-    print("Converted HTML to Notion blocks")
 
-    notion = Client(auth=settings.NOTION_API_KEY)
+def is_not_found(e: Exception) -> bool:
+    return notion_error_code(e) == "object_not_found"
 
-    today = datetime.today().strftime('%Y-%m-%d')
 
-    try:
-        # Create the page first
-        new_page = notion.pages.create(
-            parent={"database_id": settings.NOTION_PARENT_PAGE},
-            properties={
-                "title": {"title": [{"text": {"content": title}}]},
-                "date": {"date": {"start": today}},
-                "lastEditedAt": {"date": {"start": today}},
-                "slug": {"rich_text": [{"text": {"content": slug}}]},
-                "keywords": {"rich_text": [{"text": {"content": seo_keywords}}]},
-                "summary": {"rich_text": [{"text": {"content": ai_summary}}]},
-            },
-            cover={
-                "type": "external",
-                "external": {"url": coverImg} 
-            }
+def classify_notion_error(e: Exception) -> Failure:
+    from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+    if isinstance(e, HTTPResponseError):
+        retry_after = e.headers.get("retry-after") if e.headers else None
+        return status_failure(e.status, parse_retry_after(retry_after) if retry_after else None)
+    if isinstance(e, (RequestTimeoutError, httpx.TransportError)):
+        return Failure(retry=True, outage=True)
+    return Failure(retry=False)
+
+
+def request_not_sent(e: Exception) -> bool:
+    """The request failed before reaching Notion (no connection could be made)."""
+    from notion_client.errors import RequestTimeoutError
+
+    # The SDK turns every httpx timeout into RequestTimeoutError; the original is its context
+    if isinstance(e, RequestTimeoutError):
+        e = e.__context__
+    return isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def classify_notion_write_error(e: Exception) -> Failure:
+    """Like classify_notion_error, but only retries failures that Notion certainly did not apply."""
+    failure = classify_notion_error(e)
+    if is_rate_limited(e) or request_not_sent(e):
+        return failure
+    return Failure(retry=False, outage=failure.outage)
+
+
+def write_outcome_unknown(e: Exception) -> bool:
+    """A non-idempotent write failed in a way Notion may still have applied (timeout, 5xx, dropped connection)."""
+    return classify_notion_error(e).retry and not classify_notion_write_error(e).retry
+
+
+async def notion_request(method, *args, **kwargs):
+    """
+    Call an async Notion client method through the shared rate limiter, with retries.
+    On 429 the whole process backs off for the server's Retry-After before retrying.
+    Page creations and block appends are only retried when Notion cannot have applied them.
+    """
+    name = getattr(method, "__qualname__", "request")
+    idempotent = getattr(method, "__name__", "") not in NOT_IDEMPOTENT_METHODS
+
+    async def attempt():
+        await notion_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = await method(*args, **kwargs)
+        except Exception as e:
+            observe_notion(name, time.perf_counter() - start, "rate_limited" if is_rate_limited(e) else "error")
+            raise
+        observe_notion(name, time.perf_counter() - start, "ok")
+        return response
+
+    def on_retry(e, delay):
+        observe_notion_retry(name)
+        if is_rate_limited(e):
+            notion_limiter.pause(delay)
+
+    return await call_with_retry(
+        "notion", attempt,
+        classify=classify_notion_error if idempotent else classify_notion_write_error,
+        max_attempts=settings.NOTION_MAX_RATE_LIMIT_RETRIES + 1,
+        on_retry=on_retry,
+    )
+
+
+def block_children(block):
+    return block[block["type"]].get("children") or []
+
+
+def block_depth(block) -> int:
+    """Number of nested `children` levels below a block."""
+    children = block_children(block)
+    if not children:
+        return 0
+    return 1 + max(block_depth(child) for child in children)
+
+
+def count_blocks(block) -> int:
+    """A block plus all of its nested children."""
+    return 1 + sum(count_blocks(child) for child in block_children(block))
+
+
+def children_fit(block) -> bool:
+    children = block_children(block)
+    return len(children) <= MAX_BLOCKS_PER_REQUEST and all(children_fit(child) for child in children)
+
+
+def fits_in_request(block) -> bool:
+    """Whether a block (with its children) can be sent in one append request."""
+    return (
+        block_depth(block) <= MAX_NESTING_DEPTH
+        and count_blocks(block) <= MAX_BLOCKS_PER_PAYLOAD
+        and children_fit(block)
+    )
+
+
+def split_deferred_children(block):
+    """
+    Return (block_to_send, deferred_children).
+    Blocks too deep or too large for one request are sent without children,
+    which are appended to the created block in follow-up requests.
+    """
+    if fits_in_request(block):
+        return block, None
+
+    block_type = block["type"]
+    children = block_children(block)
+    # A table must be created with rows; send the first batch and append the rest
+    sent = children[:MAX_BLOCKS_PER_REQUEST] if block_type == "table" else []
+
+    shallow = dict(block)
+    shallow[block_type] = {k: v for k, v in block[block_type].items() if k != "children"}
+    if sent:
+        shallow[block_type]["children"] = sent
+    return shallow, children[len(sent):]
+
+
+def batch_blocks(blocks):
+    """Pack blocks into append requests that respect Notion's per-request limits."""
+    batch, size = [], 0
+
+    for block in blocks:
+        prepared = split_deferred_children(block)
+        block_count = count_blocks(prepared[0])
+
+        if batch and (len(batch) == MAX_BLOCKS_PER_REQUEST or size + block_count > MAX_BLOCKS_PER_PAYLOAD):
+            yield batch
+            batch, size = [], 0
+
+        batch.append(prepared)
+        size += block_count
+
+    if batch:
+        yield batch
+
+
+async def append_blocks(notion, parent_id: str, blocks, on_batch=None, after: str | None = None,
+                        created: list | None = None) -> int:
+    """
+    Append blocks to a page/block in as few requests as possible.
+    Returns the number of append requests made.
+
+    Parameters:
+    - on_batch (async callable): Called with the number of blocks of each batch once it is
+      completely appended, including deferred children.
+    - after (str): Insert the blocks after this child block (START: at the top) instead of at the end.
+    - created (list): Receives the ids of the created top-level blocks.
+    """
+    requests_made = 0
+
+    for batch in batch_blocks(blocks):
+        position = {}
+        if after == START:
+            position = {"position": {"type": "start"}}
+        elif after:
+            position = {"after": after}
+        response = await notion_request(
+            notion.blocks.children.append,
+            parent_id,
+            children=[block for block, _ in batch],
+            **position,
         )
+        requests_made += 1
+        if after:
+            # The next batch goes after the last block of this one
+            after = response["results"][-1]["id"]
+        if created is not None:
+            created += [block["id"] for block in response["results"]]
+
+        # Deferred children need the id of their (now created) parent block
+        for (_, deferred), created_block in zip(batch, response["results"]):
+            if deferred:
+                requests_made += await append_blocks(notion, created_block["id"], deferred)
+
+        if on_batch is not None:
+            await on_batch(len(batch))
+
+    return requests_made
+
+
+async def list_child_blocks(notion, block_id: str, counts: dict | None = None) -> list[dict]:
+    """A block's direct children (without their own children), in order; adds each request to counts["requests"]."""
+    blocks, cursor = [], None
+    while True:
+        options = {"start_cursor": cursor} if cursor else {}
+        response = await notion_request(notion.blocks.children.list, block_id, page_size=100, **options)
+        if counts is not None:
+            counts["requests"] += 1
+        blocks += response["results"]
+        if not response.get("has_more"):
+            return blocks
+        cursor = response["next_cursor"]
+
+
+async def list_child_ids(notion, block_id: str) -> list[str]:
+    """Ids of a block's direct children, in order."""
+    return [child["id"] for child in await list_child_blocks(notion, block_id)]
+
+
+async def delete_unrecorded_blocks(notion, page_id: str, appended: int) -> int:
+    """Delete the page's top-level blocks past the first `appended` (possibly missing their children); returns how many."""
+    unrecorded = (await list_child_ids(notion, page_id))[appended:]
+    for block_id in unrecorded:
+        await notion_request(notion.blocks.delete, block_id)
+    return len(unrecorded)
+
+
+# --------------------------------------------------------
+# Block hashes: diffing a published page against new content
+# --------------------------------------------------------
+def _normalized(value):
+    """
+    Block content with what Notion fills in on its own removed (defaults, plain_text, href),
+    so a block we send and the same block read back from Notion hash alike.
+    """
+    if isinstance(value, list):
+        return [_normalized(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if value.get("type") == "text" and "text" in value:
+        # rich_text item: content, link and the annotations that are set
+        annotations = value.get("annotations") or {}
+        return [
+            value["text"].get("content", ""),
+            (value["text"].get("link") or {}).get("url"),
+            sorted(key for key, on in annotations.items() if on and on != "default"),
+        ]
+    return {
+        key: _normalized(item) for key, item in value.items()
+        if key not in ("plain_text", "href") and item not in (None, False, "", "default", [], {})
+    }
+
+
+def block_hash(block) -> str:
+    """Stable hash of a block's type and content, including its children."""
+    block_type = block["type"]
+    return content_key(block_type, _normalized(block.get(block_type, {})))
+
+
+def block_record(block, block_id: str) -> dict:
+    """What the publish index keeps about a top-level block of a page."""
+    return {"id": block_id, "type": block["type"], "hash": block_hash(block), "has_children": bool(block_children(block))}
+
+
+def fetched_block_record(block) -> dict:
+    """
+    block_record for a block read from Notion. Its children are not part of the response,
+    so a block with children gets a hash that matches nothing and is rewritten.
+    """
+    has_children = block.get("has_children", False)
+    return {
+        "id": block["id"],
+        "type": block["type"],
+        "hash": f"unknown:{block['id']}" if has_children else block_hash(block),
+        "has_children": has_children,
+    }
+
 
-        print("Notion page created with ID:", new_page["id"])
+def updatable(record: dict, block) -> bool:
+    """Whether a published block can be edited in place into `block` (Notion can't change a block's type or children)."""
+    return record["type"] == block["type"] and not record["has_children"] and not block_children(block)
 
-        print("Appending blocks to Notion page...")
 
-        # Append blocks to the page
+def page_properties(title: str, slug: str, seo_keywords: str, ai_summary: str) -> dict:
+    today = datetime.today().strftime('%Y-%m-%d')
+    return {
+        "title": {"title": [{"text": {"content": title}}]},
+        "lastEditedAt": {"date": {"start": today}},
+        "slug": {"rich_text": [{"text": {"content": slug}}]},
+        "keywords": {"rich_text": [{"text": {"content": seo_keywords}}]},
+        "summary": {"rich_text": [{"text": {"content": ai_summary}}]},
+    }
+
+
+async def create_page(title: str, slug: str, seo_keywords: str, coverImg: str, ai_summary: str) -> dict:
+    """Create the (empty) database page with its properties; returns the Notion page object."""
+    logger.info("Creating Notion page", extra={"title": title})
+
+    notion = get_notion_client()
+
+    properties = page_properties(title, slug, seo_keywords, ai_summary)
+    # Notion's created_time is rounded down to the minute
+    started = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    for attempt in itertools.count():
+        try:
+            new_page = await notion_request(
+                notion.pages.create,
+                parent={"database_id": settings.NOTION_PARENT_PAGE},
+                properties={**properties, "date": properties["lastEditedAt"]},
+                cover={
+                    "type": "external",
+                    "external": {"url": coverImg} 
+                }
+            )
+            break
+        except Exception as e:
+            if not write_outcome_unknown(e) or attempt >= settings.NOTION_MAX_RATE_LIMIT_RETRIES:
+                raise
+            # Notion may have created the page anyway: look for it before creating another
+            await asyncio.sleep(backoff_delay(attempt))
+            existing = await find_page_by_slug(slug)
+            if existing is not None and datetime.fromisoformat(existing["created_time"].replace("Z", "+00:00")) >= started:
+                new_page = existing
+                break
+            logger.warning("Page creation failed, retrying", extra={"title": title, "error": str(e)})
+
+    logger.info("Notion page created", extra={"page_id": new_page["id"]})
+    return new_page
+
+
+async def update_page(page_id: str, title: str, slug: str, seo_keywords: str, coverImg: str, ai_summary: str) -> dict:
+    """Update the properties of a published page (its publication date is kept); returns the Notion page object."""
+    logger.info("Updating Notion page", extra={"page_id": page_id, "title": title})
+
+    notion = get_notion_client()
+
+    return await notion_request(
+        notion.pages.update,
+        page_id,
+        properties=page_properties(title, slug, seo_keywords, ai_summary),
+        cover={"type": "external", "external": {"url": coverImg}},
+    )
+
+
+_data_source_id = None
+
+
+async def find_page_by_slug(slug: str) -> dict | None:
+    """The newest page of the blog database whose `slug` property is `slug`, if any."""
+    global _data_source_id
+    notion = get_notion_client()
+
+    # Databases are queried through their data source, which is looked up once
+    if _data_source_id is None:
+        database = await notion_request(notion.databases.retrieve, settings.NOTION_PARENT_PAGE)
+        _data_source_id = database["data_sources"][0]["id"]
+
+    response = await notion_request(
+        notion.data_sources.query,
+        _data_source_id,
+        filter={"property": "slug", "rich_text": {"equals": slug}},
+        sorts=[{"timestamp": "created_time", "direction": "descending"}],
+        page_size=1,
+    )
+    return response["results"][0] if response["results"] else None
+
+
+async def append_page_content(page_id: str, html_content: str, appended: int = 0, resume: bool = False,
+                              on_progress=None, published: list | None = None) -> int:
+    """
+    Append the article body to a created page; returns the number of append requests.
+
+    Parameters:
+    - appended (int): Top-level blocks already appended by a previous attempt; they are skipped.
+    - resume (bool): A previous attempt may have appended more blocks than it recorded; those
+      (possibly missing their children) are deleted before appending the rest.
+    - on_progress (async callable): Called with the total number of top-level blocks appended so far.
+    - published (list): Receives a block_record of every top-level block (not filled when resuming).
+    """
+    notion = get_notion_client()
+    sent, created = [], []
+
+    def keep_sent(blocks):
         for block in blocks:
-            notion.blocks.children.append(new_page["id"], children=[block])
+            sent.append(block)
+            yield block
+
+    async def on_batch(count):
+        nonlocal appended
+        appended += count
+        if on_progress is not None:
+            await on_progress(appended)
+
+    requests_made = 0
+    for attempt in itertools.count():
+        # Convert HTML to Notion blocks lazily, so appends start while the rest is converted
+        blocks = timed_iter(iter_notion_blocks(html_content), "html_to_blocks")
+
+        if resume:
+            deleted = await delete_unrecorded_blocks(notion, page_id, appended)
+            blocks = itertools.islice(blocks, appended, None)
+            logger.info("Resuming Notion page", extra={"page_id": page_id, "appended": appended, "deleted": deleted})
+        elif published is not None:
+            blocks = keep_sent(blocks)
+
+        try:
+            requests_made += await append_blocks(notion, page_id, blocks, on_batch, created=created)
+            break
+        except Exception as e:
+            if not write_outcome_unknown(e) or attempt >= settings.NOTION_MAX_RATE_LIMIT_RETRIES:
+                raise
+            # Notion may have appended the failed batch: start again from the last checkpoint, not a resend
+            delay = backoff_delay(attempt)
+            logger.warning("Append failed, resuming from the last checkpoint", extra={
+                "page_id": page_id, "appended": appended, "delay": round(delay, 3), "error": str(e),
+            })
+            await asyncio.sleep(delay)
+            resume, published = True, None
+            sent.clear()
+            created.clear()
+
+    if sent:
+        published += [block_record(block, block_id) for block, block_id in zip(sent, created)]
+
+    logger.info("Appended blocks to Notion page", extra={"page_id": page_id, "requests": requests_made})
+    return requests_made
+
+
+async def sync_page_content(page_id: str, html_content: str, published: list | None = None) -> tuple[dict, list]:
+    """
+    Bring a published page's body in line with new HTML, writing only the blocks that changed:
+    top-level blocks are matched by hash, changed blocks of the same type are updated in place,
+    and the rest are deleted or inserted at their position.
+    Returns (counts of updated, inserted and deleted blocks and of requests, block_record of every block).
+
+    Parameters:
+    - published (list): block_record of the page's current top-level blocks, from the publish index;
+      fetched from Notion when missing.
+    """
+    notion = get_notion_client()
+    blocks = list(timed_iter(iter_notion_blocks(html_content), "html_to_blocks"))
+    hashes = [block_hash(block) for block in blocks]
+
+    counts = {"updated": 0, "inserted": 0, "deleted": 0, "requests": 0}
+    if published is None:
+        fetched = await list_child_blocks(notion, page_id, counts)
+        published = [fetched_block_record(block) for block in fetched]
+
+    records = []
+    matcher = SequenceMatcher(None, [record["hash"] for record in published], hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            records += published[i1:i2]
+            continue
+        old, new = published[i1:i2], blocks[j1:j2]
+
+        # Pair old and new blocks in order while they can be edited in place
+        paired = 0
+        while paired < min(len(old), len(new)) and updatable(old[paired], new[paired]):
+            block = new[paired]
+            await notion_request(notion.blocks.update, old[paired]["id"], **{block["type"]: block[block["type"]]})
+            records.append(block_record(block, old[paired]["id"]))
+            paired += 1
+        counts["updated"] += paired
+
+        for record in old[paired:]:
+            await notion_request(notion.blocks.delete, record["id"])
+        counts["deleted"] += len(old) - paired
+
+        if new[paired:]:
+            created = []
+            counts["requests"] += await append_blocks(
+                notion, page_id, new[paired:], after=records[-1]["id"] if records else START, created=created,
+            )
+            records += [block_record(block, block_id) for block, block_id in zip(new[paired:], created)]
+            counts["inserted"] += len(created)
+
+    counts["requests"] += counts["updated"] + counts["deleted"]
+    logger.info("Synced Notion page content", extra={"page_id": page_id, **counts})
+    return counts, records
+
+
+async def create_notion_page(title: str, slug: str, seo_keywords: str, coverImg: str, ai_summary: str, html_content: str):
+    """Create a page with its content in one go. Errors propagate, so a caller can retry or resume."""
+    new_page = await create_page(title, slug, seo_keywords, coverImg, ai_summary)
+    await append_page_content(new_page["id"], html_content)
 
-        print("Notion page created successfully at:", new_page["url"])
+    logger.info("Notion page created successfully", extra={"url": new_page["url"]})
 
-        return {"status": "success", "url": new_page["url"]}
-    except Exception as e:
-        return {"status": "error", "detail": str(e)}
-    
\ No newline at end of file
+    return {"status": "success", "url": new_page["url"]}
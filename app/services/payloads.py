@@ -0,0 +1,136 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+
+class Codec:
+    """Compresses payloads: "zlib", "zstd" (needs the zstandard package) or "none"."""
+
+    def __init__(self, name: str):
+        self.name = name
+        if name == "zlib":
+            # Level 1: HTML still shrinks ~4x, at a fraction of the default level's CPU time
+            self.compress = lambda data: zlib.compress(data, 1)
+            self.decompress = zlib.decompress
+        elif name == "zstd":
+            try:
+                import zstandard  # optional: only needed for JOB_PAYLOAD_COMPRESSION=zstd
+            except ImportError:
+                raise RuntimeError("JOB_PAYLOAD_COMPRESSION=zstd needs the zstandard package: pip install zstandard")
+            self.compress = zstandard.ZstdCompressor(level=3).compress
+            self.decompress = zstandard.ZstdDecompressor().decompress
+        elif name == "none":
+            self.compress = self.decompress = bytes
+        else:
+            raise ValueError(f"Unknown JOB_PAYLOAD_COMPRESSION: {name}")
+
+
+class PayloadStore:
+    """
+    Compressed job payloads (the converted HTML) kept in memory up to a byte budget.
+    Past the budget, the least recently used payloads are written to files in a
+    temporary directory and read back when their job runs.
+
+    Parameters:
+    - memory_budget (int): Compressed bytes kept in memory (0 = keep every payload on disk).
+    - compression (str): "zlib", "zstd" or "none".
+    - spill_dir (str): Where the temporary directory is created (default: the system temp dir).
+    """
+
+    def __init__(self, memory_budget: int, compression: str = "zlib", spill_dir: str = ""):
+        self.memory_budget = memory_budget
+        self.codec = Codec(compression)
+        self.spill_dir = spill_dir
+        self.raw_bytes = 0
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._resident_bytes = 0
+        # key => (compressed size, uncompressed size) of every payload, in memory or on disk
+        self._sizes: dict[str, tuple[int, int]] = {}
+        self._spilled: set[str] = set()
+        self._directory = None
+        self._lock = threading.Lock()
+
+    def put(self, key: str, text: str):
+        raw = text.encode("utf-8")
+        data = self.codec.compress(raw)
+        with self._lock:
+            self._discard(key)
+            self._sizes[key] = (len(data), len(raw))
+            self.raw_bytes += len(raw)
+            self._memory[key] = data
+            self._resident_bytes += len(data)
+            self._spill()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            elif key in self._spilled:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            else:
+                return None
+        return self.codec.decompress(data).decode("utf-8")
+
+    def discard(self, key: str):
+        with self._lock:
+            self._discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            spilled_bytes = sum(self._sizes[key][0] for key in self._spilled)
+            return {
+                "compression": self.codec.name,
+                "payloads": len(self._sizes),
+                "resident_payloads": len(self._memory),
+                "resident_bytes": self._resident_bytes,
+                "spilled_payloads": len(self._spilled),
+                "spilled_bytes": spilled_bytes,
+                "uncompressed_bytes": self.raw_bytes,
+            }
+
+    def close(self):
+        """Drop every payload and delete the spill directory."""
+        with self._lock:
+            self._memory.clear()
+            self._sizes.clear()
+            self._spilled.clear()
+            self._resident_bytes = self.raw_bytes = 0
+            if self._directory is not None:
+                shutil.rmtree(self._directory, ignore_errors=True)
+                self._directory = None
+
+    def _path(self, key: str) -> str:
+        # Job ids come from clients in some code paths; never use them as file names
+        return os.path.join(self._directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _spill(self):
+        while self._resident_bytes > self.memory_budget and self._memory:
+            key, data = self._memory.popitem(last=False)
+            self._resident_bytes -= len(data)
+            if self._directory is None:
+                # One directory per process: files left by a previous process belong to jobs that died with it
+                self._directory = tempfile.mkdtemp(prefix="job-payloads-", dir=self.spill_dir or None)
+            with open(self._path(key), "wb") as f:
+                f.write(data)
+            self._spilled.add(key)
+
+    def _discard(self, key: str):
+        sizes = self._sizes.pop(key, None)
+        if sizes is None:
+            return
+        self.raw_bytes -= sizes[1]
+        data = self._memory.pop(key, None)
+        if data is not None:
+            self._resident_bytes -= len(data)
+        if key in self._spilled:
+            self._spilled.discard(key)
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
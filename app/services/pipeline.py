@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+
+class StageTimeout(Exception):
+    pass
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+class Stage:
+    """
+    One step of a job pipeline.
+
+    Parameters:
+    - name (str): Unique stage name; dependents refer to it and receive its result under this key.
+    - run (async callable): Called with the dict of results of the stages it depends on.
+    - after (list[str]): Stages that must finish first.
+    - timeout (float): Seconds before the stage fails with StageTimeout (0 = no limit).
+    """
+
+    def __init__(self, name: str, run, after=(), timeout: float = 0):
+        self.name = name
+        self.run = run
+        self.after = list(after)
+        self.timeout = timeout
+
+
+class Pipeline:
+    """
+    Runs stages as a dependency graph: every stage starts as soon as the stages
+    it depends on have finished, so independent stages run concurrently.
+    The first failure cancels everything still running and is re-raised.
+    """
+
+    def __init__(self, stages: list[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [name for name in stage.after if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+        self.results: dict = {}
+        # name => (started, finished) in seconds since the pipeline started
+        self.timings: dict[str, tuple[float, float]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._cancel_reason = ""
+        self._started = 0.0
+
+    async def _run_stage(self, stage: Stage):
+        for name in stage.after:
+            await self._tasks[name]
+
+        started = time.perf_counter() - self._started
+        inputs = {name: self.results[name] for name in stage.after}
+        try:
+            if stage.timeout:
+                result = await asyncio.wait_for(stage.run(inputs), stage.timeout)
+            else:
+                result = await stage.run(inputs)
+        except asyncio.TimeoutError:
+            raise StageTimeout(f"Stage '{stage.name}' took longer than {stage.timeout}s.")
+
+        self.results[stage.name] = result
+        self.timings[stage.name] = (started, time.perf_counter() - self._started)
+        return result
+
+    async def run(self) -> dict:
+        """Run every stage; returns {stage name: result}."""
+        if self._cancel_reason:
+            raise PipelineCancelled(self._cancel_reason)
+        self._started = time.perf_counter()
+        self._tasks = {name: asyncio.create_task(self._run_stage(stage)) for name, stage in self.stages.items()}
+
+        try:
+            done, pending = await asyncio.wait(self._tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+            if self._cancel_reason:
+                raise PipelineCancelled(self._cancel_reason)
+            failed = [task for task in done if not task.cancelled() and task.exception()]
+            if failed:
+                raise failed[0].exception()
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        return self.results
+
+    def cancel(self, reason: str):
+        """Stop a running pipeline; run() raises PipelineCancelled(reason)."""
+        self._cancel_reason = reason
+        for task in self._tasks.values():
+            task.cancel()
+
+    def critical_path(self) -> tuple[float, list[str]]:
+        """
+        The chain of stages that determined the total latency: starting from the stage that
+        finished last, follow the dependency that finished last.
+        Returns (seconds, stage names in order).
+        """
+        if not self.timings:
+            return 0.0, []
+
+        name = max(self.timings, key=lambda n: self.timings[n][1])
+        total = self.timings[name][1]
+        path = [name]
+        while self.stages[name].after:
+            name = max(self.stages[name].after, key=lambda n: self.timings[n][1])
+            path.append(name)
+        return total, path[::-1]
+
+    def report(self) -> dict:
+        """Per-stage durations and the critical path, in seconds."""
+        total, path = self.critical_path()
+        return {
+            "stages": {name: round(end - start, 3) for name, (start, end) in self.timings.items()},
+            "critical_path": path,
+            "critical_path_seconds": round(total, 3),
+        }
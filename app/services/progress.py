@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from app.config import LazyObject, settings
+from app.services.metrics import PROGRESS_DROPPED
+
+logger = logging.getLogger(__name__)
+
+# Seconds a job's events stay in Redis after its last event
+EVENTS_TTL_SECONDS = 24 * 3600
+
+
+class Subscription:
+    """
+    Bounded, non-blocking event queue of one client (one socket or SSE stream),
+    which may follow several jobs. When full, the oldest event is dropped.
+    """
+
+    def __init__(self, maxsize: int):
+        self.events: deque[dict] = deque(maxlen=maxsize)
+        self.jobs: set[str] = set()
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict):
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+            PROGRESS_DROPPED.inc()
+        self.events.append(event)
+        self._ready.set()
+
+    async def get(self) -> dict:
+        while not self.events:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.events.popleft()
+
+
+class JobEvents:
+    """Ring buffer of a job's latest events, numbered by `seq` from 1."""
+
+    def __init__(self, size: int):
+        self.events: deque[dict] = deque(maxlen=size)
+        self.subscribers: set[Subscription] = set()
+        self.last_seq = 0
+        self.finished = False
+
+
+class ProgressBackend:
+    """In-process backend: events only reach clients connected to this process."""
+
+    async def start(self, hub: "ProgressHub"):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, event: dict):
+        """Share an event published in this process (must not block)."""
+
+    async def history(self, job_id: str) -> list[dict]:
+        """Buffered events of a job, including those published by other processes."""
+        return []
+
+
+class RedisProgressBackend(ProgressBackend):
+    """
+    Shares events between processes and machines: every event is appended to a capped
+    Redis list (for replay) and published on a channel that every hub listens to.
+    Events are sent from a background task, so publishing never waits on Redis.
+    """
+
+    def __init__(self, url: str, buffer_size: int, prefix: str = "blogagent"):
+        try:
+            import redis.asyncio  # optional: only needed for PROGRESS_BACKEND=redis
+        except ImportError:
+            raise RuntimeError("PROGRESS_BACKEND=redis needs the redis package: pip install redis")
+        self.url = url
+        self.buffer_size = buffer_size
+        self.prefix = prefix
+        self.channel = f"{prefix}:progress"
+        # Identifies this process so it ignores its own events on the channel
+        self.origin = uuid.uuid4().hex
+        self._outbox: asyncio.Queue[dict] = asyncio.Queue()
+        self._redis = None
+        self._tasks: list[asyncio.Task] = []
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:progress:{job_id}"
+
+    async def start(self, hub):
+        import redis.asyncio
+
+        self._redis = redis.asyncio.Redis.from_url(self.url)
+        self._tasks = [asyncio.create_task(self._forward()), asyncio.create_task(self._listen(hub))]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def publish(self, event):
+        self._outbox.put_nowait(event)
+
+    async def history(self, job_id):
+        if self._redis is None:
+            return []
+        return [json.loads(item) for item in await self._redis.lrange(self._key(job_id), 0, -1)]
+
+    async def _forward(self):
+        while True:
+            event = await self._outbox.get()
+            key = self._key(event["job_id"])
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.rpush(key, json.dumps(event))
+                    pipe.ltrim(key, -self.buffer_size, -1)
+                    pipe.expire(key, EVENTS_TTL_SECONDS)
+                    pipe.publish(self.channel, json.dumps({"origin": self.origin, "event": event}))
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning("Could not share progress event", extra={"job_id": event["job_id"], "error": str(e)})
+
+    async def _listen(self, hub: "ProgressHub"):
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        data = json.loads(message["data"])
+                        if data["origin"] != self.origin:
+                            hub.receive(data["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Progress channel disconnected", extra={"error": str(e)})
+                await asyncio.sleep(1)
+
+
+def create_progress_backend() -> ProgressBackend:
+    if settings.PROGRESS_BACKEND == "redis":
+        return RedisProgressBackend(settings.REDIS_URL, settings.PROGRESS_BUFFER_SIZE)
+    if settings.PROGRESS_BACKEND == "memory":
+        return ProgressBackend()
+    raise ValueError(f"Unknown PROGRESS_BACKEND: {settings.PROGRESS_BACKEND}")
+
+
+class ProgressHub:
+    """
+    Fans job events out to any number of subscribers without ever waiting on them:
+    publish() only appends to in-memory queues, and each client drains its own queue.
+    Recent events are kept per job so a reconnecting client can replay what it missed.
+
+    Parameters:
+    - buffer_size (int): Events kept per job for replay.
+    - subscriber_queue_size (int): Undelivered events kept per client before dropping the oldest.
+    - max_jobs (int): Jobs whose events are kept; past it, finished jobs without subscribers are forgotten
+      (running jobs never are: their numbering would restart and reconnecting clients would miss events).
+    - backend (ProgressBackend): Shares events with other processes; in-process only by default.
+    """
+
+    def __init__(self, buffer_size: int, subscriber_queue_size: int, max_jobs: int, backend: ProgressBackend | None = None):
+        self.buffer_size = buffer_size
+        self.subscriber_queue_size = subscriber_queue_size
+        self.max_jobs = max_jobs
+        self.backend = backend or ProgressBackend()
+        self.jobs: OrderedDict[str, JobEvents] = OrderedDict()
+
+    async def start(self):
+        await self.backend.start(self)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    def _job(self, job_id: str) -> JobEvents:
+        job = self.jobs.get(job_id)
+        if job is None:
+            job = self.jobs[job_id] = JobEvents(self.buffer_size)
+            self._evict()
+        return job
+
+    def _evict(self):
+        if len(self.jobs) <= self.max_jobs:
+            return
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished and not job.subscribers]
+        for job_id in finished[:len(self.jobs) - self.max_jobs]:
+            del self.jobs[job_id]
+
+    def publish(self, job_id: str, step: str, detail: str = "", final: bool = False, **fields) -> dict:
+        """
+        Record a timeline event and hand it to every subscriber of the job.
+        React expects: { step, detail, timestamp }; `job_id`, `seq`, `final` and extra fields are added.
+        """
+        job = self._job(job_id)
+        event = self._event(job_id, step, detail, seq=job.last_seq + 1, **fields)
+        if final:
+            event["final"] = True
+        self._record(job, event)
+        self.backend.publish(event)
+        return event
+
+    def receive(self, event: dict):
+        """Record an event published by another process (ignored if already known)."""
+        job = self._job(event["job_id"])
+        if event["seq"] > job.last_seq:
+            self._record(job, event)
+
+    def _record(self, job: JobEvents, event: dict):
+        job.last_seq = event["seq"]
+        # A requeued or resumed job is live again
+        job.finished = bool(event.get("final"))
+        job.events.append(event)
+        for subscription in job.subscribers:
+            subscription.push(event)
+
+    async def load(self, job_id: str):
+        """Catch up on a job's events from the backend (e.g. a job resumed or followed on another process)."""
+        for event in await self.backend.history(job_id):
+            self.receive(event)
+
+    @staticmethod
+    def _event(job_id: str, step: str, detail: str, **fields) -> dict:
+        return {
+            "job_id": job_id,
+            "step": step,
+            "detail": detail,
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            **fields,
+        }
+
+    def notify(self, subscription: Subscription, job_id: str, step: str, detail: str = ""):
+        """Send an event to one client only (e.g. a reply to its command); it is not buffered and has no seq."""
+        subscription.push(self._event(job_id, step, detail))
+
+    def subscription(self) -> Subscription:
+        return Subscription(self.subscriber_queue_size)
+
+    def subscribe(self, subscription: Subscription, job_id: str, since: int = 0):
+        """Follow a job, first replaying its buffered events with seq > since."""
+        job = self._job(job_id)
+        for event in job.events:
+            if event["seq"] > since:
+                subscription.push(event)
+        job.subscribers.add(subscription)
+        subscription.jobs.add(job_id)
+
+    async def follow(self, subscription: Subscription, job_id: str, since: int = 0):
+        """subscribe(), after loading events published elsewhere."""
+        await self.load(job_id)
+        self.subscribe(subscription, job_id, since)
+
+    def unsubscribe(self, subscription: Subscription, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.subscribers.discard(subscription)
+        subscription.jobs.discard(job_id)
+
+    def unsubscribe_all(self, subscription: Subscription) -> list[str]:
+        """Stop following every job; returns the jobs that no longer have any subscriber."""
+        abandoned = []
+        for job_id in list(subscription.jobs):
+            self.unsubscribe(subscription, job_id)
+            job = self.jobs.get(job_id)
+            if job is not None and not job.subscribers and not job.finished:
+                abandoned.append(job_id)
+        return abandoned
+
+    def finished(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        return job is not None and job.finished
+
+    async def connect(self, websocket) -> Subscription:
+        """Accept a websocket and create the subscription its events are sent from."""
+        await websocket.accept()
+        return self.subscription()
+
+    async def send_events(self, websocket, subscription: Subscription, close_when_finished: bool = False):
+        """
+        Forward a subscription's events to its socket until the socket fails (or, with
+        close_when_finished, until every followed job has sent its final event).
+        Runs as its own task, so a slow client only ever delays itself.
+        """
+        while True:
+            event = await subscription.get()
+            await websocket.send_json(event)
+            if close_when_finished and event.get("final") and all(self.finished(job_id) for job_id in subscription.jobs):
+                await websocket.close()
+                return
+
+
+hub = LazyObject(lambda: ProgressHub(
+    settings.PROGRESS_BUFFER_SIZE,
+    settings.PROGRESS_SUBSCRIBER_QUEUE_SIZE,
+    settings.PROGRESS_MAX_JOBS,
+    create_progress_backend(),
+))
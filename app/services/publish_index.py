@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class PublishIndex:
+    """
+    Local SQLite index of the pages published to Notion, so re-publishing an article
+    needs no lookup requests: slug -> page id and URL, the hash of the article body the
+    page was built from, its summary, and a block_record of each top-level block.
+
+    Parameters:
+    - db_path (str): SQLite file (":memory:" keeps the index for the life of the process).
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                slug TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                body_hash TEXT,
+                summary TEXT,
+                blocks TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_body ON pages (body_hash, updated_at)")
+        self._db.commit()
+
+    def _row(self, row) -> dict | None:
+        if row is None:
+            return None
+        slug, title, page_id, url, body_hash, summary, blocks = row
+        return {
+            "slug": slug,
+            "title": title,
+            "page_id": page_id,
+            "url": url,
+            "body_hash": body_hash,
+            "summary": json.loads(summary) if summary else None,
+            "blocks": json.loads(blocks) if blocks else None,
+        }
+
+    def get(self, slug: str) -> dict | None:
+        with self._lock:
+            return self._row(self._db.execute(
+                "SELECT slug, title, page_id, url, body_hash, summary, blocks FROM pages WHERE slug = ?", (slug,)
+            ).fetchone())
+
+    def find_by_body(self, body_hash: str) -> dict | None:
+        """The most recently published page built from this article body."""
+        with self._lock:
+            return self._row(self._db.execute(
+                "SELECT slug, title, page_id, url, body_hash, summary, blocks FROM pages "
+                "WHERE body_hash = ? ORDER BY updated_at DESC LIMIT 1", (body_hash,)
+            ).fetchone())
+
+    def save_page(self, slug: str, title: str, page_id: str, url: str):
+        """Record the page published under `slug`; its content is recorded by save_content."""
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO pages (slug, title, page_id, url, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (slug) DO UPDATE SET
+                    title = excluded.title, page_id = excluded.page_id, url = excluded.url,
+                    updated_at = excluded.updated_at,
+                    -- Content recorded for another page no longer applies
+                    body_hash = CASE WHEN page_id = excluded.page_id THEN body_hash END,
+                    summary = CASE WHEN page_id = excluded.page_id THEN summary END,
+                    blocks = CASE WHEN page_id = excluded.page_id THEN blocks END
+                """,
+                (slug, title, page_id, url, time.time()),
+            )
+            self._db.commit()
+
+    def save_content(self, slug: str, body_hash: str, summary: dict, blocks: list | None):
+        """Record what the page was built from; blocks=None when its block ids are unknown."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET body_hash = ?, summary = ?, blocks = ?, updated_at = ? WHERE slug = ?",
+                (body_hash, json.dumps(summary), json.dumps(blocks) if blocks is not None else None, time.time(), slug),
+            )
+            self._db.commit()
+
+    def forget_blocks(self, slug: str):
+        """Drop the recorded blocks (e.g. the page was edited in Notion); they are fetched again next time."""
+        with self._lock:
+            self._db.execute("UPDATE pages SET blocks = NULL WHERE slug = ?", (slug,))
+            self._db.commit()
+
+    def forget(self, slug: str):
+        with self._lock:
+            self._db.execute("DELETE FROM pages WHERE slug = ?", (slug,))
+            self._db.commit()
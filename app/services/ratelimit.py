@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by every job running in the process.
+
+    Parameters:
+    - rate (float): Tokens added per second.
+    - capacity (int): Maximum burst size.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until `tokens` are available (and no pause is active), then take them."""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds`, e.g. after a 429 with Retry-After."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        # Start from an empty bucket once the pause is over, so we don't burst
+        self._tokens = 0.0
+        self._updated_at = self._paused_until
+
+
+def parse_retry_after(value, default: float = 1.0) -> float:
+    """Parse a Retry-After header value (seconds) into a float, falling back to `default`."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
@@ -1,18 +1,153 @@
-import tempfile
-from docx import Document
-import pdfplumber
-
-def extract_text_from_pdf(content: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=True) as tmp:
-        tmp.write(content)
-        tmp.flush()
-        with pdfplumber.open(tmp.name) as pdf:
-            text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-        return text
-
-def extract_text_from_docx(content: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=True) as tmp:
-        tmp.write(content)
-        tmp.flush()
-        doc = Document(tmp.name)
-        return "\n".join(p.text for p in doc.paragraphs)
\ No newline at end of file
+"""
+Document readers: turn an uploaded file into the HTML the pipeline works on.
+Readers are registered per file extension and take a path, bytes or a binary file object.
+Their libraries are imported on first use (see import_readers), so importing this module is cheap.
+"""
+import html
+import io
+import os
+import re
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterator
+from app.services.assets import asset_store, asset_url
+
+Source = str | bytes | BinaryIO
+
+# extension => reader(source, offload_images) -> HTML
+READERS: dict[str, Callable[..., str]] = {}
+
+
+def reader(*extensions: str):
+    """Register a reader for the given file extensions (".docx", ...)."""
+    def register(func):
+        for extension in extensions:
+            READERS[extension] = func
+        return func
+    return register
+
+
+def file_extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+
+def is_supported(filename: str) -> bool:
+    return file_extension(filename) in READERS
+
+
+def supported_formats() -> str:
+    return ", ".join(sorted(READERS))
+
+
+def import_readers():
+    """Import every reader's library up front; conversion workers do this when they start."""
+    import mammoth  # noqa: F401
+    import markdown  # noqa: F401
+    import pdfplumber  # noqa: F401
+
+
+def read_document(source: Source, extension: str, offload_images: bool = True) -> str:
+    """
+    Convert a document to HTML with the reader registered for its extension.
+
+    Parameters:
+    - source (str | bytes | BinaryIO): Path, contents or open binary file.
+    - extension (str): File extension, e.g. ".pdf".
+    - offload_images (bool): Store embedded images in the asset store instead of inlining them.
+    """
+    read = READERS.get(extension.lower())
+    if read is None:
+        raise ValueError(f"Unsupported file type {extension!r}; supported: {supported_formats()}")
+    return read(source, offload_images=offload_images)
+
+
+@contextmanager
+def _open(source: Source):
+    # Bytes are read in place; no temp file copy
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            yield file
+    else:
+        yield source
+
+
+def _read_text(source: Source) -> str:
+    with _open(source) as file:
+        return file.read().decode("utf-8-sig", errors="replace")
+
+
+# --------------------------------------------------------
+# .docx
+# --------------------------------------------------------
+def offload_image(image):
+    """Store an embedded image in the asset store and reference it by URL instead of a data: URI."""
+    with image.open() as image_bytes:
+        name = asset_store.save(image_bytes.read(), image.content_type)
+    return {"src": asset_url(name)}
+
+
+@reader(".docx")
+def read_docx(source: Source, offload_images: bool = True) -> str:
+    import mammoth
+
+    options = {"convert_image": mammoth.images.img_element(offload_image)} if offload_images else {}
+    with _open(source) as file:
+        return mammoth.convert_to_html(file, **options).value
+
+
+# --------------------------------------------------------
+# .pdf (text only)
+# --------------------------------------------------------
+def _pdf_page_html(page) -> str:
+    """Group a page's text lines into paragraphs, splitting where the vertical gap exceeds a line height."""
+    paragraphs, current, last_bottom = [], [], None
+    for line in page.extract_text_lines():
+        if current and line["top"] - last_bottom > (line["bottom"] - line["top"]) * 0.8:
+            paragraphs.append(" ".join(current))
+            current = []
+        current.append(line["text"].strip())
+        last_bottom = line["bottom"]
+    if current:
+        paragraphs.append(" ".join(current))
+    return "".join(f"<p>{html.escape(paragraph)}</p>" for paragraph in paragraphs if paragraph)
+
+
+def iter_pdf_html(source: Source) -> Iterator[str]:
+    """Yield the HTML of each page in turn, releasing every page once it is converted."""
+    import pdfplumber
+
+    with _open(source) as file, pdfplumber.open(file) as pdf:
+        for page in pdf.pages:
+            yield _pdf_page_html(page)
+            page.close()
+
+
+@reader(".pdf")
+def read_pdf(source: Source, offload_images: bool = True) -> str:
+    return "".join(iter_pdf_html(source))
+
+
+# --------------------------------------------------------
+# Markdown
+# --------------------------------------------------------
+@reader(".md", ".markdown")
+def read_markdown(source: Source, offload_images: bool = True) -> str:
+    import markdown
+
+    return markdown.markdown(_read_text(source), extensions=["extra", "sane_lists"])
+
+
+# --------------------------------------------------------
+# HTML
+# --------------------------------------------------------
+_BODY = re.compile(r"<body[^>]*>(.*)</body\s*>", re.S | re.I)
+# Elements whose content is not part of the article
+_HIDDEN = re.compile(r"<(head|script|style|noscript|template)\b.*?</\1\s*>", re.S | re.I)
+
+
+@reader(".html", ".htm")
+def read_html(source: Source, offload_images: bool = True) -> str:
+    text = _read_text(source)
+    body = _BODY.search(text)
+    return _HIDDEN.sub("", body.group(1) if body else text).strip()
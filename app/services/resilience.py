@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+from app.config import LazyObject, settings
+from app.services.metrics import RETRIES, BREAKER_OPEN
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: rate limits and server-side/transient failures
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """A dependency is considered down; the call was not attempted."""
+
+    def __init__(self, dependency: str, retry_in: float):
+        super().__init__(f"{dependency} is unavailable, retrying in {retry_in:.0f}s")
+        self.dependency = dependency
+        self.retry_in = retry_in
+
+
+class Failure:
+    """
+    How a failed call should be handled.
+
+    Parameters:
+    - retry (bool): Worth trying again.
+    - outage (bool): Counts towards opening the circuit (server errors, timeouts; not 4xx or 429).
+    - retry_after (float): Seconds the server asked us to wait, if any.
+    """
+
+    def __init__(self, retry: bool, outage: bool = False, retry_after: float | None = None):
+        self.retry = retry
+        self.outage = outage
+        self.retry_after = retry_after
+
+
+def status_failure(status: int | None, retry_after: float | None = None) -> Failure:
+    """Classify an HTTP error status."""
+    if status in RETRYABLE_STATUSES:
+        return Failure(retry=True, outage=status != 429, retry_after=retry_after)
+    return Failure(retry=False)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after `failure_threshold` consecutive outage failures.
+    After `reset_seconds` one trial call is let through: success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def before_call(self):
+        """Raise CircuitOpen unless the call may go ahead."""
+        if self.state == "closed":
+            return
+        if self.state == "open" and self.retry_in() == 0:
+            # Let this call through as the trial
+            self.state = "half_open"
+            return
+        raise CircuitOpen(self.name, self.retry_in() or 1.0)
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("Circuit closed", extra={"dependency": self.name})
+            BREAKER_OPEN.labels(self.name).set(0)
+        self.state = "closed"
+        self.failures = 0
+
+    def record_cancelled(self):
+        """The trial call was cancelled (timeout, shutdown): it says nothing, so let the next call be the trial."""
+        if self.state == "half_open":
+            self.state = "open"
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("Circuit opened", extra={"dependency": self.name, "failures": self.failures})
+                BREAKER_OPEN.labels(self.name).set(1)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+breakers = LazyObject(lambda: {
+    name: CircuitBreaker(name, settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS)
+    for name in ("gemini", "notion", "email")
+})
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(max, base * 2^attempt)]."""
+    return random.uniform(0, min(settings.RETRY_MAX_DELAY_SECONDS, settings.RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+
+async def call_with_retry(dependency: str, func, *args, classify, max_attempts: int = 0, on_retry=None, **kwargs):
+    """
+    Await func(*args, **kwargs) through the dependency's circuit breaker, retrying failures that
+    `classify` (exception -> Failure) marks as retryable, waiting at least as long as Retry-After.
+
+    Parameters:
+    - dependency (str): Key in `breakers`.
+    - max_attempts (int): Defaults to RETRY_MAX_ATTEMPTS.
+    - on_retry (callable): Called with (exception, delay) before waiting for a retry.
+    """
+    breaker = breakers[dependency]
+    max_attempts = max_attempts or settings.RETRY_MAX_ATTEMPTS
+
+    for attempt in range(max_attempts):
+        breaker.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            raise
+        except Exception as e:
+            failure = classify(e)
+            if failure.outage:
+                breaker.record_failure()
+            else:
+                # The dependency answered, even if with an error
+                breaker.record_success()
+            if not failure.retry or attempt == max_attempts - 1:
+                raise
+
+            delay = max(backoff_delay(attempt), failure.retry_after or 0)
+            logger.warning("Retrying failed call", extra={
+                "dependency": dependency, "attempt": attempt + 1, "delay": round(delay, 3), "error": str(e),
+            })
+            RETRIES.labels(dependency).inc()
+            if on_retry is not None:
+                on_retry(e, delay)
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
@@ -0,0 +1,88 @@
+"""
+Benchmark: importing N documents one at a time through /upload and the
+websocket (what the web UI does) versus a single zip via /upload/batch.
+Runs against the fake Gemini, Notion and Brevo servers.
+
+    python -m benchmarks.batch_import --documents 50 --latency 0.5
+"""
+import argparse
+import io
+import os
+import time
+import uuid
+import zipfile
+
+from benchmarks.docs import build_docx
+from benchmarks.fakes import FakeBrevoServer, FakeGeminiServer, FakeNotionServer
+
+
+def one_by_one(client, documents):
+    for name, data in documents:
+        job = client.post("/upload", files={"file": (name, data)}).json()
+        with client.websocket_connect(job["ws_path"]) as ws:
+            ws.receive_json()
+            ws.send_text("start")
+            while not ws.receive_json()["step"].startswith(("Step 5", "Error")):
+                pass
+
+
+def batch(client, documents):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name, data in documents:
+            zf.writestr(name, data)
+
+    response = client.post("/upload/batch", files={"files": ("posts.zip", archive.getvalue())}).json()
+    while True:
+        progress = client.get(response["status_path"]).json()
+        if progress["sealed"] and progress["finished"] == progress["total"] and (progress["digest_sent"] or not progress["total"]):
+            return progress
+        time.sleep(0.1)
+
+
+def main(args):
+    with FakeGeminiServer(latency=args.latency) as gemini, \
+            FakeNotionServer(latency=args.latency / 10) as notion, \
+            FakeBrevoServer(latency=args.latency / 5) as brevo:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": gemini.url,
+            "NOTION_BASE_URL": notion.url,
+            "BREVO_API_HOST": brevo.url + "/v3",
+            "NOTION_REQUESTS_PER_SECOND": str(args.notion_rps),
+            "JOB_WORKERS": str(args.workers),
+            "LLM_CONCURRENCY": str(args.workers),
+        })
+        from fastapi.testclient import TestClient
+        from app.app import app
+
+        document = build_docx(paragraphs=args.paragraphs)
+
+        def documents():
+            # Unique titles so the summary cache never hits
+            return [(f"Post {uuid.uuid4().hex[:8]}.docx", document) for _ in range(args.documents)]
+
+        print(f"{'mode':<14}{'wall time':>11}{'docs/s':>9}{'emails':>8}{'notion reqs':>13}")
+        with TestClient(app) as client:
+            for name, run in (("one by one", one_by_one), ("batch", batch)):
+                for server in (gemini, notion, brevo):
+                    server.reset()
+                brevo.sent.clear()
+
+                start = time.perf_counter()
+                run(client, documents())
+                elapsed = time.perf_counter() - start
+                print(f"{name:<14}{elapsed:>10.2f}s{args.documents / elapsed:>9.1f}"
+                      f"{len(brevo.sent):>8}{notion.request_count:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Gemini latency in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="JOB_WORKERS and LLM_CONCURRENCY")
+    parser.add_argument("--notion-rps", type=float, default=3.0, help="NOTION_REQUESTS_PER_SECOND")
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""
+Load test: N pipeline jobs run concurrently should finish in roughly the
+time of one job, and the event loop must stay responsive meanwhile.
+
+Runs run_processing_pipeline against local Gemini, Notion and Brevo stubs:
+
+    python -m benchmarks.concurrent_jobs --jobs 10 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from benchmarks.fakes import FakeBrevoServer, FakeGeminiServer, FakeNotionServer
+
+
+def article(paragraphs: int) -> str:
+    return "".join(f"<p>Paragraph {i} of the benchmark article.</p>" for i in range(paragraphs))
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Largest delay seen between scheduled and actual wake-ups."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_jobs(pipeline, count: int, paragraphs: int):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        pipeline(str(uuid.uuid4()), f"Benchmark article {uuid.uuid4()}", article(paragraphs))
+        for i in range(count)
+    ))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    return elapsed, await lag_task
+
+
+async def run(args):
+    with FakeGeminiServer(latency=args.latency) as gemini, \
+            FakeNotionServer(latency=args.latency / 10) as notion, \
+            FakeBrevoServer(latency=args.latency / 5) as brevo:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": gemini.url,
+            "NOTION_BASE_URL": notion.url,
+            "BREVO_API_HOST": brevo.url + "/v3",
+            "NOTION_REQUESTS_PER_SECOND": "0",
+            "LLM_CONCURRENCY": str(args.jobs),
+            "NOTION_CONCURRENCY": str(args.jobs),
+            "EMAIL_CONCURRENCY": str(args.jobs),
+        })
+        from app.app import run_processing_pipeline, close_clients
+
+        # Warm-up: imports, client construction and first connections
+        await run_jobs(run_processing_pipeline, 1, args.paragraphs)
+
+        one, one_lag = await run_jobs(run_processing_pipeline, 1, args.paragraphs)
+        many, many_lag = await run_jobs(run_processing_pipeline, args.jobs, args.paragraphs)
+        await close_clients()
+
+        print(f"{'jobs':<6}{'wall time':>12}{'max loop lag':>15}")
+        print(f"{1:<6}{one:>11.2f}s{one_lag * 1000:>13.1f}ms")
+        print(f"{args.jobs:<6}{many:>11.2f}s{many_lag * 1000:>13.1f}ms")
+        print(f"{args.jobs} concurrent jobs took {many / one:.2f}x the time of one "
+              f"({gemini.request_count} Gemini, {notion.request_count} Notion, {len(brevo.sent)} emails)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--paragraphs", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Gemini latency in seconds")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Synthetic .docx documents for benchmarks (requires python-docx)."""
+import io
+import os
+import struct
+import zlib
+
+from docx import Document
+
+
+def random_png(width: int, height: int) -> bytes:
+    """An incompressible RGB PNG of roughly width*height*3 bytes."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + os.urandom(width * 3) for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(rows, 0)) + chunk(b"IEND", b""))
+
+
+def build_docx(paragraphs: int = 50, image_bytes: int = 0, images: int = 1) -> bytes:
+    """A .docx with text paragraphs and optionally `images` random images totalling ~image_bytes."""
+    document = Document()
+    document.add_heading("Benchmark article", level=1)
+    for i in range(paragraphs):
+        paragraph = document.add_paragraph(f"Paragraph {i} of the benchmark article, ")
+        paragraph.add_run("with bold text").bold = True
+        paragraph.add_run(" and more words to summarize.")
+
+    if image_bytes:
+        side = max(1, int((image_bytes / images / 3) ** 0.5))
+        for _ in range(images):
+            document.add_picture(io.BytesIO(random_png(side, side)))
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def build_pdf(pages: int = 10, paragraphs: int = 8) -> bytes:
+    """A text-only PDF with `paragraphs` two-line paragraphs per page (Helvetica, no fonts embedded)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = []
+        for i in range(paragraphs):
+            lines += [f"Page {page} paragraph {i} of the benchmark article, with words",
+                      "to summarize and a second line of text.", ""]
+        text = " ".join(f"({line}) Tj 0 -14 Td" for line in lines)
+        stream = f"BT /F1 11 Tf 50 780 Td {text} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build_markdown(paragraphs: int = 50) -> bytes:
+    parts = ["# Benchmark article"]
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f"## Section {i // 10}")
+        parts.append(f"Paragraph {i} of the benchmark article, **with bold text** and more words to summarize.")
+        if i % 5 == 0:
+            parts.append("- a list item\n- another [link](https://example.com)")
+    return "\n\n".join(parts).encode()
+
+
+def build_html(paragraphs: int = 50) -> bytes:
+    body = "".join(
+        f"<p>Paragraph {i} of the benchmark article, <strong>with bold text</strong> and more words to summarize.</p>"
+        for i in range(paragraphs)
+    )
+    return (f"<!DOCTYPE html><html><head><title>Benchmark</title><style>p {{}}</style></head>"
+            f"<body><h1>Benchmark article</h1>{body}<script>var x = 1;</script></body></html>").encode()
@@ -0,0 +1,421 @@
+"""
+Local stand-ins for the external APIs used by the pipeline, so benchmarks
+can run offline and reproducibly.
+"""
+import json
+import random
+import re
+import threading
+import time
+import types
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeServer:
+    """
+    Base class: runs a ThreadingHTTPServer on a free local port in a daemon thread.
+
+    Parameters:
+    - latency (float): Seconds added to every request.
+    - rate_limit (float): Requests/second before answering 429 with Retry-After (0 = unlimited).
+    - error_rate (float): Fraction of requests answered with a 503.
+    - seed (int): Seed of the random error injection, for reproducible runs.
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit: float = 0.0, error_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.request_count = 0
+        self.failed_count = 0
+        self.rate_limited_count = 0
+        self._failures = []
+        self._window = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def reset(self):
+        with self._lock:
+            self.request_count = 0
+            self.failed_count = 0
+            self.rate_limited_count = 0
+            self._window = []
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def fail_next(self, count: int, status: int = 503, retry_after: str | None = None):
+        """Answer the next `count` requests with an error status (e.g. to simulate an outage)."""
+        with self._lock:
+            self._failures += [(status, retry_after)] * count
+
+    def _take_failure(self):
+        with self._lock:
+            if self._failures:
+                self.failed_count += 1
+                return self._failures.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.failed_count += 1
+                return 503, None
+            return None
+
+    def _over_rate_limit(self) -> bool:
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate_limit:
+                self.rate_limited_count += 1
+                return True
+            self._window.append(now)
+            return False
+
+    def stats(self) -> dict:
+        return {"requests": self.request_count, "failed": self.failed_count, "rate_limited": self.rate_limited_count}
+
+    def handle(self, method: str, path: str, body: dict):
+        """
+        Return (status, json_body, headers). Implemented by subclasses.
+        A generator json_body is streamed as server-sent events.
+        """
+        raise NotImplementedError
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else {}
+
+                fake.count_request()
+                # Rate limited requests are answered right away, as real APIs do
+                failure = (429, "1") if fake._over_rate_limit() else None
+                if failure is None and fake.latency:
+                    time.sleep(fake.latency)
+
+                failure = failure or fake._take_failure()
+                if failure:
+                    status, retry_after = failure
+                    # Understood by all three clients: Notion reads "code", Gemini "error"
+                    code, message = ("rate_limited", "Rate limited") if status == 429 else ("service_unavailable", "Injected failure")
+                    payload = {"object": "error", "status": status, "code": code,
+                               "message": message, "error": {"code": status, "message": message}}
+                    headers = {"Retry-After": retry_after} if retry_after else None
+                else:
+                    status, payload, headers = fake.handle(self.command, self.path, body)
+                if isinstance(payload, types.GeneratorType):
+                    return self._stream(status, payload)
+                data = json.dumps(payload).encode()
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, status, events):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in events:
+                    data = f"data: {json.dumps(event)}\r\n\r\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeNotionServer(FakeServer):
+    """Implements the slice of the Notion API the pipeline uses (see FakeServer for the parameters)."""
+
+    def __init__(self, latency: float = 0.0, rate_limit: float = 0.0, error_rate: float = 0.0, seed: int | None = None):
+        super().__init__(latency, rate_limit, error_rate, seed)
+        self.blocks_created = 0
+        self.blocks_updated = 0
+        self.blocks_deleted = 0
+        # parent id => ids of its (non-deleted) child blocks, in order
+        self.children: dict[str, list[str]] = {}
+        # block id => (type, content without children)
+        self.blocks: dict[str, tuple[str, dict]] = {}
+        # page id => properties, in creation order
+        self.pages: dict[str, dict] = {}
+        self.created_times: dict[str, str] = {}
+
+    def reset(self):
+        self.reset_counts()
+        with self._lock:
+            self.children = {}
+            self.blocks = {}
+            self.pages = {}
+            self.created_times = {}
+
+    def reset_counts(self):
+        """Reset the counters but keep the pages and blocks."""
+        super().reset()
+        with self._lock:
+            self.blocks_created = self.blocks_updated = self.blocks_deleted = 0
+
+    def _created_block(self, block, parent_id, siblings: list):
+        self.blocks_created += 1
+        block_id = str(uuid.uuid4())
+        block_type = block.get("type")
+        content = dict(block.get(block_type, {}))
+        children = content.pop("children", None) or []
+        self.blocks[block_id] = (block_type, content)
+        siblings.append(block_id)
+        for child in children:
+            self._created_block(child, block_id, self.children.setdefault(block_id, []))
+        return {"object": "block", "id": block_id, "type": block_type}
+
+    def _returned_block(self, block_id):
+        """A block as Notion returns it: default annotations, colors and plain_text filled in."""
+        block_type, content = self.blocks.get(block_id, ("paragraph", {}))
+        content = json.loads(json.dumps(content))
+        for key in ("rich_text", "caption"):
+            for item in content.get(key, []):
+                item["annotations"] = {"bold": False, "italic": False, "strikethrough": False, "underline": False,
+                                       "code": False, "color": "default", **item.get("annotations", {})}
+                item["plain_text"] = item["text"]["content"]
+                item["href"] = (item["text"].get("link") or {}).get("url")
+                item["text"].setdefault("link", None)
+        if block_type in ("paragraph", "quote", "bulleted_list_item", "numbered_list_item") or block_type.startswith("heading"):
+            content.setdefault("color", "default")
+        return {"object": "block", "id": block_id, "type": block_type, block_type: content,
+                "has_children": bool(self.children.get(block_id))}
+
+    def _page(self, page_id):
+        return {"object": "page", "id": page_id, "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+                "created_time": self.created_times[page_id], "properties": self.pages[page_id]}
+
+    def handle(self, method, path, body):
+        if method == "POST" and path.rstrip("/") == "/v1/pages":
+            page_id = str(uuid.uuid4())
+            with self._lock:
+                self.pages[page_id] = body.get("properties", {})
+                self.created_times[page_id] = time.strftime("%Y-%m-%dT%H:%M:00.000Z", time.gmtime())
+            return 200, self._page(page_id), None
+
+        match = re.fullmatch(r"/v1/pages/([^/?]+)", path)
+        if method == "PATCH" and match and match[1] in self.pages:
+            with self._lock:
+                self.pages[match[1]].update(body.get("properties", {}))
+            return 200, self._page(match[1]), None
+
+        match = re.fullmatch(r"/v1/databases/([^/?]+)", path)
+        if method == "GET" and match:
+            return 200, {"object": "database", "id": match[1], "data_sources": [{"id": f"ds-{match[1]}", "name": "Blog"}]}, None
+
+        match = re.fullmatch(r"/v1/data_sources/([^/?]+)/query", path)
+        if method == "POST" and match:
+            condition = body.get("filter", {})
+            wanted = condition.get("rich_text", {}).get("equals")
+            with self._lock:
+                results = [
+                    self._page(page_id) for page_id, properties in self.pages.items()
+                    if "".join(item["text"]["content"] for item in properties.get(condition.get("property"), {}).get("rich_text", [])) == wanted
+                ]
+            if any(sort.get("direction") == "descending" for sort in body.get("sorts", [])):
+                # Only created_time is sorted on: pages are kept in creation order
+                results.reverse()
+            return 200, {"object": "list", "results": results[:body.get("page_size", 100)], "has_more": False, "next_cursor": None}, None
+
+        match = re.fullmatch(r"/v1/blocks/([^/?]+)/children(\?.*)?", path)
+        if method == "PATCH" and match:
+            with self._lock:
+                siblings = self.children.setdefault(match[1], [])
+                # New blocks go at the end, at the top or after a given child
+                index = len(siblings)
+                if body.get("position", {}).get("type") == "start":
+                    index = 0
+                elif body.get("after") in siblings:
+                    index = siblings.index(body["after"]) + 1
+                inserted = []
+                results = [self._created_block(block, match[1], inserted) for block in body.get("children", [])]
+                siblings[index:index] = inserted
+            return 200, {"object": "list", "results": results}, None
+
+        if method == "GET" and match:
+            query = dict(part.split("=", 1) for part in (match[2] or "?")[1:].split("&") if "=" in part)
+            with self._lock:
+                ids = list(self.children.get(match[1], []))
+                start = ids.index(query["start_cursor"]) if query.get("start_cursor") in ids else 0
+                page = ids[start:start + int(query.get("page_size", 100))]
+                results = [self._returned_block(i) for i in page]
+            has_more = start + len(page) < len(ids)
+            return 200, {"object": "list", "results": results,
+                         "has_more": has_more, "next_cursor": ids[start + len(page)] if has_more else None}, None
+
+        match = re.fullmatch(r"/v1/blocks/([^/?]+)", path)
+        if method == "PATCH" and match:
+            with self._lock:
+                if match[1] not in self.blocks:
+                    return 404, {"object": "error", "status": 404, "code": "object_not_found",
+                                 "message": f"Could not find block with ID: {match[1]}"}, None
+                block_type = self.blocks[match[1]][0]
+                self.blocks[match[1]] = (block_type, body.get(block_type, {}))
+                self.blocks_updated += 1
+            return 200, self._returned_block(match[1]), None
+
+        if method == "DELETE" and match:
+            with self._lock:
+                self.blocks.pop(match[1], None)
+                self.blocks_deleted += 1
+                for ids in self.children.values():
+                    if match[1] in ids:
+                        ids.remove(match[1])
+            return 200, {"object": "block", "id": match[1], "archived": True}, None
+
+        return 404, {"object": "error", "status": 404, "code": "object_not_found",
+                     "message": f"No route for {method} {path}"}, None
+
+
+def article_from_prompt(prompt: str) -> tuple[str, str]:
+    """Pull (title, html) back out of the prompt built by summarize_text."""
+    head, _, html = prompt.partition("Article Content in HTML format:\n")
+    title = head.rpartition("Title ")[2].split("\n", 1)[0].strip()
+    return title, html
+
+
+class FakeGeminiServer(FakeServer):
+    """
+    Answers generateContent / streamGenerateContent like Gemini would for the summarization prompt.
+
+    Parameters:
+    - latency (float): Seconds before the first token.
+    - seconds_per_chunk (float): Generation time per `chunk_size` characters of output.
+    - invalid_fields (set): Fields answered with an empty value in full (non-repair) responses.
+    - options: rate_limit, error_rate and seed, as for FakeServer.
+    """
+
+    def __init__(self, latency: float = 0.0, seconds_per_chunk: float = 0.0, chunk_size: int = 200,
+                 invalid_fields=(), **options):
+        super().__init__(latency, **options)
+        self.seconds_per_chunk = seconds_per_chunk
+        self.chunk_size = chunk_size
+        self.invalid_fields = set(invalid_fields)
+        self.last_request = None
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def reset(self):
+        super().reset()
+        with self._lock:
+            self.prompt_tokens = 0
+            self.output_tokens = 0
+
+    def summary_for(self, title: str, html: str) -> dict:
+        slug = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-") or "article"
+        summary = f"A short summary of {title or 'this article'}."
+        return {
+            "title": title,
+            "slug": slug,
+            "seo_keywords": "benchmark, fake, gemini",
+            "cover_imgUrl": "https://example.com/cover.png",
+            "plain_text_summary": summary,
+            "html_content": f"<h2>Summary</h2><p>{summary}</p>{html}",
+        }
+
+    def _response(self, text: str, prompt: str, finished: bool = True) -> dict:
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                **({"finishReason": "STOP"} if finished else {}),
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4,
+            },
+        }
+
+    def _stream(self, text: str, prompt: str):
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for i, chunk in enumerate(chunks):
+            if i and self.seconds_per_chunk:
+                time.sleep(self.seconds_per_chunk)
+            yield self._response(chunk, prompt, finished=i == len(chunks) - 1)
+
+    def handle(self, method, path, body):
+        streaming = ":streamGenerateContent" in path
+        if method != "POST" or not (streaming or ":generateContent" in path):
+            return 404, {"error": {"code": 404, "message": f"No route for {method} {path}"}}, None
+
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        self.last_request = body
+        config = body.get("generationConfig", {})
+        summary = self.summary_for(*article_from_prompt(prompt))
+
+        requested = set((config.get("responseSchema") or {}).get("properties", summary))
+        if requested == set(summary):
+            summary.update({field: "" for field in self.invalid_fields})
+        else:
+            # Partial schema (repair, metadata, chunk summary): answer only the requested fields
+            summary = {k: summary.get(k, f"Fake {k} for this text.") for k in requested}
+
+        text = json.dumps(summary)
+        if config.get("responseMimeType") != "application/json":
+            text = "```json\n" + text + "\n```"
+
+        with self._lock:
+            self.prompt_tokens += len(prompt) // 4
+            self.output_tokens += len(text) // 4
+
+        if streaming:
+            return 200, self._stream(text, prompt), None
+
+        if self.seconds_per_chunk:
+            time.sleep(self.seconds_per_chunk * (len(text) // self.chunk_size))
+        return 200, self._response(text, prompt), None
+
+
+class FakeBrevoServer(FakeServer):
+    """Accepts transactional emails and remembers them (see FakeServer for the parameters)."""
+
+    def __init__(self, latency: float = 0.0, **options):
+        super().__init__(latency, **options)
+        self.sent = []
+
+    def handle(self, method, path, body):
+        if method == "POST" and path.rstrip("/").endswith("/smtp/email"):
+            with self._lock:
+                self.sent.append(body)
+            return 201, {"messageId": f"<{uuid.uuid4()}@fake.brevo>"}, None
+        return 404, {"code": "not_found", "message": f"No route for {method} {path}"}, None
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: HTML -> Notion blocks conversion, comparing the single-pass
+parser (app/services/notion.py) with the old BeautifulSoup converter
+(benchmarks/legacy_converter.py), on synthetic documents.
+
+    python -m benchmarks.html_to_blocks
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("NOTION_API_KEY", "benchmark")
+os.environ.setdefault("NOTION_PARENT_PAGE", "benchmark")
+
+from app.services.notion import html_to_notion_blocks, iter_notion_blocks
+from benchmarks import legacy_converter
+
+
+def paragraphs_doc(count: int) -> str:
+    return "".join(
+        f"<p>Paragraph {i} with <strong>bold</strong>, <em>italic</em> and <a href='https://example.com/{i}'>a link</a>.</p>"
+        for i in range(count)
+    )
+
+
+def nested_list(depth: int, width: int) -> str:
+    if depth == 0:
+        return ""
+    items = "".join(f"<li>Item {depth}.{i}{nested_list(depth - 1, width)}</li>" for i in range(width))
+    return f"<ul>{items}</ul>"
+
+
+def nested_lists_doc(depth: int, width: int, count: int) -> str:
+    return "".join(f"<h2>List {i}</h2>{nested_list(depth, width)}" for i in range(count))
+
+
+def measure(convert, html: str):
+    start = time.perf_counter()
+    blocks = convert(html)
+    elapsed = time.perf_counter() - start
+
+    # Separate run for memory: tracemalloc slows everything down
+    tracemalloc.start()
+    convert(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(blocks)
+
+
+def first_block_latency(html: str) -> float:
+    start = time.perf_counter()
+    next(iter_notion_blocks(html))
+    return time.perf_counter() - start
+
+
+def main(args):
+    documents = {
+        f"{args.paragraphs} paragraphs": paragraphs_doc(args.paragraphs),
+        f"{args.depth}-deep lists": nested_lists_doc(args.depth, args.width, args.lists),
+    }
+    converters = {
+        "beautifulsoup": legacy_converter.html_to_notion_blocks,
+        "single-pass": html_to_notion_blocks,
+    }
+
+    print(f"{'document':<18}{'converter':<15}{'time':>9}{'peak mem':>11}{'blocks':>8}")
+    for name, html in documents.items():
+        results = {}
+        for converter_name, convert in converters.items():
+            results[converter_name] = convert(html)
+            elapsed, peak, count = measure(convert, html)
+            print(f"{name:<18}{converter_name:<15}{elapsed:>8.3f}s{peak / 2**20:>9.1f}MB{count:>8}")
+        same = results["beautifulsoup"] == results["single-pass"]
+        print(f"{'':<18}first block after {first_block_latency(html) * 1000:.1f} ms, "
+              f"output {'matches' if same else 'differs from'} the legacy converter")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=10_000)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--width", type=int, default=2)
+    parser.add_argument("--lists", type=int, default=20)
+    main(parser.parse_args())
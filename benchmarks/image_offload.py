@@ -0,0 +1,50 @@
+"""
+Benchmark: size of the converted HTML (what is stored per job and sent to
+Gemini as the prompt) for image-heavy documents, with images inlined as
+base64 data: URIs (before) versus offloaded to the asset store (after).
+
+    python -m benchmarks.image_offload --images 5 --size-mb 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.docs import build_docx
+
+
+def main(args):
+    asset_dir = tempfile.mkdtemp(prefix="assets-")
+    os.environ.setdefault("NOTION_API_KEY", "benchmark")
+    os.environ.setdefault("NOTION_PARENT_PAGE", "benchmark")
+    os.environ["ASSET_DIR"] = asset_dir
+    os.environ["PUBLIC_BASE_URL"] = "https://blogagent.example.com"
+
+    from app.services.read_files import read_document
+    from app.services.llm import build_prompt
+
+    document = build_docx(paragraphs=args.paragraphs, image_bytes=int(args.size_mb * 2**20), images=args.images)
+    with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as f:
+        f.write(document)
+
+    print(f"Document: {len(document) / 2**20:.1f} MB with {args.images} images")
+    print(f"{'images':<10}{'html bytes':>14}{'prompt bytes':>15}{'~tokens':>12}{'convert':>10}")
+    try:
+        for offload in (False, True):
+            start = time.perf_counter()
+            html = read_document(f.name, ".docx", offload_images=offload)
+            elapsed = time.perf_counter() - start
+            prompt = len(build_prompt("Benchmark article", html).encode())
+            mode = "offloaded" if offload else "inline"
+            print(f"{mode:<10}{len(html.encode()):>14,}{prompt:>15,}{prompt // 4:>12,}{elapsed:>9.2f}s")
+    finally:
+        os.unlink(f.name)
+    print(f"Asset store: {len(os.listdir(asset_dir))} files in {asset_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--paragraphs", type=int, default=100)
+    main(parser.parse_args())
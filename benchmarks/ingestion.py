@@ -0,0 +1,75 @@
+"""
+Benchmark: conversion throughput per input format (.docx, .pdf, .md, .html),
+in this process and through the conversion process pool with several documents
+in flight, plus the peak Python memory of converting one document.
+
+    python -m benchmarks.ingestion --documents 20 --paragraphs 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.docs import build_docx, build_html, build_markdown, build_pdf
+
+
+def samples(args) -> dict[str, bytes]:
+    return {
+        ".docx": build_docx(paragraphs=args.paragraphs),
+        ".pdf": build_pdf(pages=max(1, args.paragraphs // 8), paragraphs=8),
+        ".md": build_markdown(paragraphs=args.paragraphs),
+        ".html": build_html(paragraphs=args.paragraphs),
+    }
+
+
+async def pooled(path: str, extension: str, documents: int) -> float:
+    from app.services.conversion import convert_to_html
+
+    start = time.perf_counter()
+    await asyncio.gather(*(convert_to_html(path, f"doc{extension}") for _ in range(documents)))
+    return time.perf_counter() - start
+
+
+def main(args):
+    os.environ.setdefault("NOTION_API_KEY", "benchmark")
+    os.environ.setdefault("NOTION_PARENT_PAGE", "benchmark")
+    from app.services.conversion import conversion_workers, start_conversion_pool, stop_conversion_pool
+    from app.services.read_files import read_document
+
+    start_conversion_pool()
+    print(f"{args.documents} documents of {args.paragraphs} paragraphs per format, {conversion_workers()} pool workers")
+    print(f"{'format':<8}{'size':>10}{'html':>10}{'in-process':>13}{'MB/s':>8}{'pool':>10}{'docs/s':>9}{'peak mem':>11}")
+    try:
+        for extension, document in samples(args).items():
+            with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as f:
+                f.write(document)
+            try:
+                html = read_document(document, extension)  # warm-up
+                start = time.perf_counter()
+                for _ in range(args.documents):
+                    read_document(document, extension)
+                in_process = (time.perf_counter() - start) / args.documents
+
+                pool = asyncio.run(pooled(f.name, extension, args.documents))
+
+                tracemalloc.start()
+                read_document(f.name, extension)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            finally:
+                os.unlink(f.name)
+
+            print(f"{extension:<8}{len(document) / 1024:>8.0f}KB{len(html) / 1024:>8.0f}KB{in_process * 1000:>11.1f}ms"
+                  f"{len(document) / 2**20 / in_process:>8.2f}{pool:>9.2f}s{args.documents / pool:>9.1f}"
+                  f"{peak / 2**20:>9.1f}MB")
+    finally:
+        stop_conversion_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    main(parser.parse_args())
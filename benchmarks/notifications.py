@@ -0,0 +1,58 @@
+"""
+Benchmark: blog notifications for jobs finishing at about the same time, sent one email per
+blog (EMAIL_COALESCE_SECONDS=0, as before) versus coalesced by the outbox into digests.
+Reports emails sent to the fake Brevo API, time until every caller got its result, and the
+time to render one email with the compiled templates.
+
+    python -m benchmarks.notifications --notifications 100 --latency 0.2 --window 1
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import timeit
+
+from benchmarks.fakes import FakeBrevoServer
+
+
+async def run(args):
+    with FakeBrevoServer(latency=args.latency, rate_limit=args.rate_limit) as brevo:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "BREVO_API_HOST": brevo.url + "/v3",
+            "BREVO_SENDER_EMAIL": "agent@example.com",
+            "EMAIL_TO": "editor@example.com, reviewer@example.com",
+            "EMAIL_TRANSPORT": "brevo",
+        })
+        from app.config import settings
+        from app.services.notifier import outbox, render_blog_email, send_email_notification
+
+        async def notify(i: int):
+            # Jobs finish spread over `spread` seconds
+            await asyncio.sleep(random.uniform(0, args.spread))
+            return await send_email_notification(f"Article {i} <draft>", f"https://www.notion.so/page-{i}")
+
+        print(f"{args.notifications} notifications over {args.spread}s, Brevo latency {args.latency * 1000:.0f} ms")
+        print(f"{'':<24}{'time':>9}{'emails':>8}{'sent':>6}")
+        for label, window in [("one email per blog", 0), (f"coalesced ({args.window}s)", args.window)]:
+            settings.EMAIL_COALESCE_SECONDS = window
+            brevo.sent.clear()
+            start = time.perf_counter()
+            results = await asyncio.gather(*(notify(i) for i in range(args.notifications)))
+            print(f"{label:<24}{time.perf_counter() - start:>8.2f}s{len(brevo.sent):>8}{sum(results):>6}")
+        await outbox.stop()
+
+        seconds = timeit.timeit(lambda: render_blog_email("Article <draft>", "https://www.notion.so/page"), number=10000)
+        print(f"render one email: {seconds / 10000 * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=100)
+    parser.add_argument("--spread", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--window", type=float, default=1.0)
+    asyncio.run(run(parser.parse_args()))
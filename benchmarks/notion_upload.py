@@ -0,0 +1,79 @@
+"""
+Benchmark: appending a large article to Notion, one request per block (before)
+versus batched appends through the shared rate limiter (after).
+
+Runs against a local fake Notion server:
+
+    python -m benchmarks.notion_upload --paragraphs 300 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("NOTION_API_KEY", "benchmark")
+os.environ.setdefault("NOTION_PARENT_PAGE", "benchmark")
+
+from notion_client import AsyncClient
+
+from app.services import notion as notion_service
+from benchmarks.fakes import FakeNotionServer
+
+
+def build_article(paragraphs: int, list_depth: int) -> str:
+    html = []
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            html.append(f"<h2>Section {i // 50}</h2>")
+        html.append(f"<p>Paragraph {i} with <strong>bold</strong> and <em>italic</em> text.</p>")
+
+    # One deeply nested list to exercise deferred children
+    nested = "<li>Deepest item</li>"
+    for depth in range(list_depth, 0, -1):
+        nested = f"<li>Level {depth}<ul>{nested}</ul></li>"
+    html.append(f"<ul>{nested}</ul>")
+    return "".join(html)
+
+
+async def append_one_by_one(notion, page_id, blocks):
+    for block in blocks:
+        await notion.blocks.children.append(page_id, children=[block])
+
+
+async def run(args):
+    blocks = notion_service.html_to_notion_blocks(build_article(args.paragraphs, args.list_depth))
+    notion_service.notion_limiter.rate = args.rps
+
+    with FakeNotionServer(latency=args.latency, rate_limit=args.server_rate_limit) as server:
+        notion = AsyncClient(auth="benchmark", base_url=server.url, retry=False)
+        page = await notion.pages.create(parent={"database_id": "benchmark"}, properties={})
+
+        server.reset()
+        start = time.perf_counter()
+        try:
+            await append_one_by_one(notion, page["id"], blocks)
+            before = (time.perf_counter() - start, server.request_count, "ok")
+        except Exception as e:
+            before = (time.perf_counter() - start, server.request_count, f"failed: {e}")
+
+        server.reset()
+        start = time.perf_counter()
+        await notion_service.append_blocks(notion, page["id"], blocks)
+        after = (time.perf_counter() - start, server.request_count, "ok")
+        rate_limited = server.rate_limited_count
+        await notion.aclose()
+
+    print(f"Top-level blocks: {len(blocks)} (latency {args.latency * 1000:.0f} ms/request)")
+    print(f"{'mode':<12}{'wall time':>12}{'requests':>10}  status")
+    print(f"{'per-block':<12}{before[0]:>11.2f}s{before[1]:>10}  {before[2]}")
+    print(f"{'batched':<12}{after[0]:>11.2f}s{after[1]:>10}  {after[2]} ({rate_limited} x 429)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=300)
+    parser.add_argument("--list-depth", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake request")
+    parser.add_argument("--rps", type=float, default=3.0, help="client-side limiter rate")
+    parser.add_argument("--server-rate-limit", type=float, default=0, help="fake server 429 threshold (req/s)")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,57 @@
+"""
+Benchmark: critical-path latency of the stage graph versus running the same
+stages one after another (the sum of the stage durations), with a slow email
+provider and an article large enough to need several Notion append requests.
+
+    python -m benchmarks.pipeline_overlap --paragraphs 500 --email-latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import uuid
+
+from benchmarks.concurrent_jobs import article
+from benchmarks.fakes import FakeBrevoServer, FakeGeminiServer, FakeNotionServer
+
+PIPELINE_STAGES = ("summarize", "create_page", "append_content", "email")
+
+
+async def run(args):
+    with FakeGeminiServer(latency=args.latency) as gemini, \
+            FakeNotionServer(latency=args.notion_latency) as notion, \
+            FakeBrevoServer(latency=args.email_latency) as brevo:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": gemini.url,
+            "NOTION_BASE_URL": notion.url,
+            "BREVO_API_HOST": brevo.url + "/v3",
+            "NOTION_REQUESTS_PER_SECOND": "0",
+        })
+        from app.app import run_processing_pipeline, job_store, close_clients
+
+        print(f"{'run':<5}{'critical path':>15}{'sequential':>12}{'saved':>9}  path")
+        for i in range(args.runs + 1):
+            job_id = str(uuid.uuid4())
+            # Distinct titles so the summary cache never hits
+            await run_processing_pipeline(job_id, f"Benchmark article {uuid.uuid4()}", article(args.paragraphs))
+            timings = job_store.get(job_id)["timings"]
+            if i == 0:
+                continue  # warm-up: imports and first connections
+
+            critical = timings["critical_path_seconds"]
+            sequential = sum(timings["stages"][stage] for stage in PIPELINE_STAGES)
+            print(f"{i:<5}{critical:>14.2f}s{sequential:>11.2f}s{sequential - critical:>8.2f}s  "
+                  f"{' -> '.join(timings['critical_path'])}")
+        await close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--paragraphs", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Gemini latency in seconds")
+    parser.add_argument("--notion-latency", type=float, default=0.1)
+    parser.add_argument("--email-latency", type=float, default=0.5)
+    asyncio.run(run(parser.parse_args()))
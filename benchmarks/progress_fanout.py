@@ -0,0 +1,90 @@
+"""
+Benchmark: how long a job's progress events take to publish when some clients are
+slow, comparing awaiting each client's send inline (the previous connection manager)
+with the progress hub, where every client drains its own bounded queue.
+
+    python -m benchmarks.progress_fanout --events 200 --fast 50 --slow 5 --send-latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.progress import ProgressHub
+
+
+class FakeSocket:
+    """A websocket whose sends take `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.received = 0
+
+    async def send_json(self, event):
+        await asyncio.sleep(self.latency)
+        self.received += 1
+
+    async def close(self):
+        pass
+
+
+def clients(args) -> list[FakeSocket]:
+    return [FakeSocket(0) for _ in range(args.fast)] + [FakeSocket(args.send_latency) for _ in range(args.slow)]
+
+
+async def inline(args) -> float:
+    sockets = clients(args)
+    start = time.perf_counter()
+    for i in range(args.events):
+        for socket in sockets:
+            await socket.send_json({"step": f"event {i}"})
+    return time.perf_counter() - start
+
+
+async def hub(args):
+    progress = ProgressHub(args.events, args.queue_size, max_jobs=10)
+    sockets = clients(args)
+    subscriptions = []
+    for socket in sockets:
+        subscription = progress.subscription()
+        progress.subscribe(subscription, "job")
+        subscriptions.append(subscription)
+    senders = [
+        asyncio.create_task(progress.send_events(socket, subscription, close_when_finished=True))
+        for socket, subscription in zip(sockets, subscriptions)
+    ]
+
+    start = time.perf_counter()
+    worst = 0.0
+    for i in range(args.events):
+        publish_start = time.perf_counter()
+        progress.publish("job", f"event {i}", final=i == args.events - 1)
+        worst = max(worst, time.perf_counter() - publish_start)
+        # Give the senders a turn, as the pipeline's own awaits do
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    await asyncio.gather(*senders)
+    slow = subscriptions[args.fast:]
+    return elapsed, worst, sum(s.dropped for s in slow) / max(len(slow), 1)
+
+
+async def run(args):
+    print(f"{args.events} events, {args.fast} fast clients, {args.slow} clients with "
+          f"{args.send_latency * 1000:.0f} ms sends, client queue {args.queue_size}")
+    if args.slow * args.events * args.send_latency <= 60:
+        print(f"inline sends: {await inline(args):.3f}s to publish")
+    else:
+        print("inline sends: skipped (would take over a minute)")
+    elapsed, worst, dropped = await hub(args)
+    print(f"progress hub: {elapsed:.3f}s to publish, slowest publish {worst * 1e6:.0f} us, "
+          f"{dropped:.0f} events dropped per slow client")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--fast", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=5)
+    parser.add_argument("--send-latency", type=float, default=0.05, help="seconds per send for slow clients")
+    parser.add_argument("--queue-size", type=int, default=64, help="undelivered events kept per client")
+    asyncio.run(run(parser.parse_args()))
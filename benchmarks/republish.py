@@ -0,0 +1,87 @@
+"""
+Benchmark: re-publishing a revised article through the whole pipeline, recreating the
+Notion page (before) versus INCREMENTAL_PUBLISH, which updates the published page and
+writes only the blocks that changed. Counts Gemini calls, Notion requests and blocks
+written for a one-word fix and for an unchanged re-upload, with and without the local
+publish index.
+
+    python -m benchmarks.republish --paragraphs 200 --notion-latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from benchmarks.fakes import FakeBrevoServer, FakeGeminiServer, FakeNotionServer
+
+TITLE = "Republished article"
+
+
+def article(paragraphs: int, typo: bool = False) -> str:
+    html = []
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            html.append(f"<h2>Section {i // 50}</h2>")
+        word = "recieve" if typo and i == paragraphs // 2 else "receive"
+        html.append(f"<p>Paragraph {i}: readers <strong>{word}</strong> the article text.</p>")
+    html.append("<ul><li>Item<ul><li>Nested item</li></ul></li></ul>")
+    return "".join(html)
+
+
+async def run(args):
+    with FakeGeminiServer(latency=args.gemini_latency) as gemini, \
+            FakeNotionServer(latency=args.notion_latency) as notion, \
+            FakeBrevoServer() as brevo:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": gemini.url,
+            "NOTION_BASE_URL": notion.url,
+            "BREVO_API_HOST": brevo.url + "/v3",
+            "NOTION_REQUESTS_PER_SECOND": "0",
+            "SUMMARY_MODE": "metadata",
+            # Only the publish index may skip Gemini
+            "SUMMARY_CACHE_MAX_ENTRIES": "0",
+            "INCREMENTAL_PUBLISH": "true",
+            "PUBLISH_INDEX_DB_PATH": ":memory:",
+        })
+        from app.config import settings
+        from app.app import run_processing_pipeline, publish_index, body_hash, close_clients
+
+        async def publish(label: str, html: str, incremental: bool = True):
+            settings.INCREMENTAL_PUBLISH = incremental
+            gemini.reset()
+            notion.reset_counts()
+            start = time.perf_counter()
+            await run_processing_pipeline(str(uuid.uuid4()), TITLE, html)
+            written = notion.blocks_created + notion.blocks_updated + notion.blocks_deleted
+            print(f"{label:<34}{time.perf_counter() - start:>8.2f}s{gemini.request_count:>8}"
+                  f"{notion.request_count:>10}{written:>9}  ({notion.blocks_created} created, "
+                  f"{notion.blocks_updated} updated, {notion.blocks_deleted} deleted)")
+
+        original, revised = article(args.paragraphs, typo=True), article(args.paragraphs)
+        print(f"{args.paragraphs} paragraphs, Notion latency {args.notion_latency * 1000:.0f} ms, "
+              f"Gemini latency {args.gemini_latency * 1000:.0f} ms")
+        print(f"{'':<34}{'time':>9}{'gemini':>8}{'requests':>10}{'blocks':>9}")
+        await publish("first publish", original)
+        await publish("typo fixed, recreate page", revised, incremental=False)
+        await publish("typo fixed, incremental", revised)
+        await publish("unchanged, incremental", revised)
+
+        # Without the index: the page is found by a Notion query and its blocks are fetched
+        slug = publish_index.find_by_body(body_hash(revised))["slug"]
+        publish_index.forget(slug)
+        await publish("typo reverted, page not indexed", original)
+        publish_index.forget_blocks(slug)
+        await publish("typo fixed, blocks not indexed", revised)
+        await close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--notion-latency", type=float, default=0.05)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,126 @@
+"""
+Benchmark and regression check for cold starts: how long `import app.app` takes
+(with the slowest imports), whether any SDK that should load lazily was imported,
+and the time from starting uvicorn to the first response and to GET /ready.
+The import runs without the required settings, so it fails if a setting is read at import.
+Exits with status 1 if the import fails or takes longer than --max-import-seconds, or a
+lazily loaded SDK is imported at startup.
+
+    python -m benchmarks.startup --max-import-seconds 0.8
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Heavy packages that must only be imported on first use (or in the warm-up after startup)
+LAZY_MODULES = (
+    "google.genai", "sib_api_v3_sdk", "notion_client", "mammoth", "pdfplumber", "markdown", "redis", "PIL", "uvicorn",
+)
+
+ENV = {
+    "NOTION_API_KEY": "benchmark",
+    "NOTION_PARENT_PAGE": "benchmark",
+    "GEMINI_API_KEY": "benchmark",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def environment() -> dict:
+    return {**os.environ, **ENV, "PYTHONPATH": os.getcwd()}
+
+
+class ImportFailed(Exception):
+    pass
+
+
+def import_profile() -> tuple[float, list[tuple[int, str]]]:
+    """Run `python -X importtime -c "import app.app"`; returns (seconds, [(cumulative us, depth, module)])."""
+    # Settings must not be read at import, so the required ones are left out
+    env = {name: value for name, value in environment().items() if name not in ("NOTION_API_KEY", "NOTION_PARENT_PAGE")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.app"], env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise ImportFailed("\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:")))
+    modules = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            # Nesting is shown by indenting two spaces per level
+            modules.append((int(match.group(1)), len(match.group(2)) // 2, match.group(3)))
+    total = next(cumulative for cumulative, _, name in modules if name == "app.app")
+    return total / 1e6, sorted(modules, reverse=True)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_response(reload: bool) -> tuple[float, float]:
+    """Start uvicorn; returns seconds until GET / answers and until GET /ready returns 200."""
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "app.app:app", "--port", str(port)] + (["--reload"] if reload else [])
+    start = time.perf_counter()
+    server = subprocess.Popen(command, env=environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            while ready is None and time.perf_counter() - start < 60:
+                try:
+                    if first is None and client.get("/").status_code == 200:
+                        first = time.perf_counter() - start
+                    # 404: a version without the readiness endpoint is ready when it answers
+                    if first is not None and client.get("/ready").status_code in (200, 404):
+                        ready = time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return first, ready
+
+
+def main(args) -> int:
+    try:
+        seconds, modules = import_profile()
+    except ImportFailed as e:
+        print(f"import app.app failed (are settings read at import?):\n{e}")
+        return 1
+    print(f"import app.app: {seconds:.3f}s (budget {args.max_import_seconds:.3f}s)")
+    # Top-level imports and those made directly by app.app
+    for cumulative, _, name in [module for module in modules if module[1] <= 1][:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+    failed = seconds > args.max_import_seconds
+    imported = {name for _, _, name in modules}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        print(f"Imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+
+    if not args.skip_server:
+        for reload in (False, True) if args.compare_reload else (False,):
+            first, ready = first_response(reload)
+            mode = "uvicorn --reload" if reload else "uvicorn"
+            print(f"{mode:<18} first response {first:.3f}s, ready {ready:.3f}s")
+
+    print("FAILED: startup regressed" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-import-seconds", type=float, default=0.8)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--compare-reload", action="store_true", help="also time uvicorn --reload")
+    parser.add_argument("--skip-server", action="store_true", help="only profile the import")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""
+Benchmark: time to first websocket event during the summarization step,
+with and without GEMINI_STREAMING, against a fake Gemini that generates
+output at a fixed rate.
+
+    python -m benchmarks.streaming --paragraphs 200 --seconds-per-chunk 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from benchmarks.fakes import FakeGeminiServer
+
+
+def article(paragraphs: int) -> str:
+    return "".join(f"<p>Paragraph {i} of the benchmark article.</p>" for i in range(paragraphs))
+
+
+async def summarize(llm, streaming: bool, html: str):
+    start = time.perf_counter()
+    events = []
+
+    async def on_event(*args):
+        events.append((time.perf_counter() - start, args))
+
+    if streaming:
+        await llm.summarize_text_stream(f"Article {uuid.uuid4()}", html, on_progress=on_event, on_field=on_event)
+    else:
+        await llm.summarize_text(f"Article {uuid.uuid4()}", html)
+        await on_event("done")
+
+    total = time.perf_counter() - start
+    slug_at = next((t for t, args in events if args and args[0] == "slug"), total)
+    return events[0][0], slug_at, total, len(events)
+
+
+async def run(args):
+    with FakeGeminiServer(latency=args.latency, seconds_per_chunk=args.seconds_per_chunk) as gemini:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": gemini.url,
+        })
+        from app.services import llm
+
+        html = article(args.paragraphs)
+        print(f"{'mode':<12}{'first event':>13}{'slug ready':>12}{'total':>9}{'events':>8}")
+        for streaming in (False, True):
+            first, slug_at, total, count = await summarize(llm, streaming, html)
+            mode = "streaming" if streaming else "blocking"
+            print(f"{mode:<12}{first:>12.2f}s{slug_at:>11.2f}s{total:>8.2f}s{count:>8}")
+        await llm.close_gemini_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time to first token")
+    parser.add_argument("--seconds-per-chunk", type=float, default=0.05, help="fake generation time per 200 chars")
+    asyncio.run(run(parser.parse_args()))
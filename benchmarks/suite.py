@@ -0,0 +1,336 @@
+"""
+Benchmark suite: replays a corpus of documents through /upload and /ws/process/{job_id},
+as the web UI does, with the app served by uvicorn and Gemini, Notion and Brevo replaced by
+local fake servers (configurable latency, error rate and rate limit each). Reports throughput,
+p50/p95/p99 of every pipeline stage, event-loop lag and peak RSS, and saves them as JSON so
+runs on different commits can be compared.
+
+    python -m benchmarks.suite --synthetic 20 --corpus posts/ --concurrency 4 --output before.json
+    python -m benchmarks.suite --synthetic 20 --corpus posts/ --concurrency 4 --compare before.json
+    python -m benchmarks.suite --notion-error-rate 0.05 --notion-rate-limit 3 --set SUMMARY_MODE=metadata
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+import uvicorn
+import websockets
+
+from benchmarks.docs import build_docx
+from benchmarks.fakes import FakeBrevoServer, FakeGeminiServer, FakeNotionServer
+from benchmarks.upload_latency import free_port, percentile
+
+SERVICES = {"gemini": FakeGeminiServer, "notion": FakeNotionServer, "brevo": FakeBrevoServer}
+DEFAULT_LATENCY = {"gemini": 0.5, "notion": 0.05, "brevo": 0.1}
+
+# (metric, True if higher is better) checked by --compare
+HEADLINE_METRICS = (
+    ("throughput_jobs_per_second", True),
+    ("end_to_end_seconds.p95", False),
+    ("event_loop_lag_ms.p99", False),
+    ("peak_rss_mb.server", False),
+)
+
+
+def distribution(values) -> dict:
+    if not values:
+        return {}
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values),
+        "max": max(values),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+
+def load_corpus(args) -> list[tuple[str, bytes]]:
+    """(filename, contents) of the synthetic documents and the files found under --corpus."""
+    from app.services.read_files import is_supported
+
+    documents = []
+    for i in range(args.synthetic):
+        paragraphs = args.paragraphs[i % len(args.paragraphs)]
+        documents.append((f"synthetic {i} {paragraphs}.docx", build_docx(paragraphs=paragraphs)))
+
+    for root in args.corpus:
+        paths = [root] if os.path.isfile(root) else sorted(
+            os.path.join(folder, name) for folder, _, names in os.walk(root) for name in names
+        )
+        for path in paths:
+            if is_supported(path):
+                with open(path, "rb") as f:
+                    documents.append((os.path.basename(path), f.read()))
+    return documents
+
+
+class AppServer:
+    """uvicorn serving the app on its own event loop in a thread, so its loop lag can be sampled."""
+
+    def __init__(self):
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config("app.app:app", host="127.0.0.1", port=self.port, log_level="warning"))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.server.serve(),), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+    def sample_loop_lag(self, stop: threading.Event, samples: list, interval: float = 0.01):
+        """Start recording, on the server's loop, how late each `interval` sleep wakes up."""
+        async def sample():
+            while not stop.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(interval)
+                samples.append(time.perf_counter() - start - interval)
+
+        return asyncio.run_coroutine_threadsafe(sample(), self.loop)
+
+
+async def replay(client, ws_url: str, filename: str, data: bytes, timeout: float) -> dict:
+    """Upload one document, start its job over the websocket and wait for the final event."""
+    result = {"document": filename, "bytes": len(data)}
+    start = time.perf_counter()
+    response = await client.post("/upload", files={"file": (filename, data)})
+    result["upload_seconds"] = time.perf_counter() - start
+    job = response.json()
+    if "job_id" not in job:
+        return {**result, "status": f"upload failed: {job.get('error')}"}
+
+    event = {}
+    try:
+        async with asyncio.timeout(timeout):
+            async with websockets.connect(ws_url + job["ws_path"], max_size=None) as ws:
+                started = time.perf_counter()
+                await ws.send("start")
+                # The server closes the socket after the final event
+                async for message in ws:
+                    event = json.loads(message)
+                    if event.get("final"):
+                        break
+    except TimeoutError:
+        return {**result, "status": "timed out"}
+
+    timings = event.get("timings") or {}
+    return {
+        **result,
+        "status": "ok" if event.get("step", "").startswith("Step 5") else f"{event.get('step')}: {event.get('detail')}",
+        "job_seconds": time.perf_counter() - started,
+        "end_to_end_seconds": time.perf_counter() - start,
+        "stages": timings.get("stages", {}),
+        "critical_path_seconds": timings.get("critical_path_seconds"),
+    }
+
+
+async def replay_corpus(server: AppServer, documents, args) -> tuple[list[dict], float]:
+    limit = asyncio.Semaphore(args.concurrency)
+    base_url = f"http://127.0.0.1:{server.port}"
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.job_timeout) as client:
+        # Wait for the conversion workers and API clients, as the platform does
+        while (await client.get("/ready")).status_code != 200:
+            await asyncio.sleep(0.05)
+
+        async def run(filename, data, round_number):
+            if not args.reuse_titles:
+                # A distinct title per upload, so the summary cache never hits
+                stem, extension = os.path.splitext(filename)
+                filename = f"{stem} {round_number} {uuid.uuid4().hex[:8]}{extension}"
+            async with limit:
+                return await replay(client, base_url.replace("http", "ws"), filename, data, args.job_timeout)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            run(filename, data, round_number)
+            for round_number in range(args.repeat) for filename, data in documents
+        ))
+        return results, time.perf_counter() - start
+
+
+def summarize(results: list[dict], wall_seconds: float, lag: list[float], fakes: dict, args) -> dict:
+    completed = [r for r in results if r["status"] == "ok"]
+    stages = {}
+    for result in completed:
+        for stage, seconds in result["stages"].items():
+            stages.setdefault(stage, []).append(seconds)
+
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "jobs": {"total": len(results), "completed": len(completed), "failed": len(results) - len(completed)},
+        "failures": sorted({r["status"] for r in results if r["status"] != "ok"}),
+        "wall_seconds": wall_seconds,
+        "throughput_jobs_per_second": len(completed) / wall_seconds,
+        "throughput_mb_per_second": sum(r["bytes"] for r in completed) / 2**20 / wall_seconds,
+        "upload_seconds": distribution([r["upload_seconds"] for r in results]),
+        "job_seconds": distribution([r["job_seconds"] for r in completed]),
+        "end_to_end_seconds": distribution([r["end_to_end_seconds"] for r in completed]),
+        "critical_path_seconds": distribution([r["critical_path_seconds"] for r in completed if r["critical_path_seconds"]]),
+        "stages": {stage: distribution(values) for stage, values in sorted(stages.items())},
+        "event_loop_lag_ms": distribution([seconds * 1000 for seconds in lag]),
+        # The harness, the app and the fake servers share this process; conversion workers are children
+        "peak_rss_mb": {"server": self_rss, "conversion_worker": children_rss},
+        "fakes": {name: fake.stats() for name, fake in fakes.items()},
+    }
+
+
+def print_report(report: dict):
+    jobs = report["jobs"]
+    print(f"commit {report['commit']}: {jobs['completed']}/{jobs['total']} jobs in {report['wall_seconds']:.2f}s, "
+          f"{report['throughput_jobs_per_second']:.2f} jobs/s, {report['throughput_mb_per_second']:.2f} MB/s")
+    for failure in report["failures"]:
+        print(f"  failed: {failure}")
+
+    print(f"{'':<26}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    rows = [("upload", report["upload_seconds"]), ("job (after start)", report["job_seconds"]),
+            ("end to end", report["end_to_end_seconds"]), ("critical path", report["critical_path_seconds"])]
+    rows += [(f"  {stage}", values) for stage, values in report["stages"].items()]
+    for label, values in rows:
+        if values:
+            print(f"{label:<26}" + "".join(f"{values[key] * 1000:>8.0f}ms" for key in ("p50", "p95", "p99", "max")))
+    lag = report["event_loop_lag_ms"]
+    if lag:
+        print(f"{'event loop lag':<26}" + "".join(f"{lag[key]:>8.1f}ms" for key in ("p50", "p95", "p99", "max")))
+    rss = report["peak_rss_mb"]
+    print(f"peak RSS: {rss['server']:.0f} MB (app, harness and fakes), {rss['conversion_worker']:.0f} MB (conversion worker)")
+    print("fakes: " + ", ".join(f"{name} {stats['requests']} requests ({stats['failed']} failed, "
+                               f"{stats['rate_limited']} rate limited)" for name, stats in report["fakes"].items()))
+
+
+def flatten(report: dict, prefix: str = "") -> dict:
+    values = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[f"{prefix}{key}"] = value
+    return values
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> bool:
+    """Print every metric next to the baseline's; returns False if a headline metric regressed."""
+    current, before = flatten(report), flatten(baseline)
+    print(f"\ncompared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for key in sorted(current.keys() & before.keys()):
+        if key.startswith("config."):
+            continue
+        change = (current[key] - before[key]) / before[key] if before[key] else 0.0
+        print(f"  {key:<48}{before[key]:>12.4f}{current[key]:>12.4f}{change:>+9.1%}")
+
+    ok = True
+    for key, higher_is_better in HEADLINE_METRICS:
+        if key in current and before.get(key):
+            change = (current[key] - before[key]) / before[key]
+            if (-change if higher_is_better else change) > max_regression:
+                print(f"REGRESSION: {key} {change:+.1%} (allowed {max_regression:.0%})")
+                ok = False
+    return ok
+
+
+def main(args) -> int:
+    fakes = {
+        name: fake(
+            latency=getattr(args, f"{name}_latency"),
+            rate_limit=getattr(args, f"{name}_rate_limit"),
+            error_rate=getattr(args, f"{name}_error_rate"),
+            seed=args.seed + i,
+        )
+        for i, (name, fake) in enumerate(SERVICES.items())
+    }
+    for fake in fakes.values():
+        fake.__enter__()
+
+    try:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "BREVO_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": fakes["gemini"].url,
+            "NOTION_BASE_URL": fakes["notion"].url,
+            "BREVO_API_HOST": fakes["brevo"].url + "/v3",
+            "LOG_LEVEL": "WARNING",
+            **dict(setting.split("=", 1) for setting in args.set),
+        })
+
+        documents = load_corpus(args)
+        if not documents:
+            print("No documents: use --synthetic and/or --corpus")
+            return 2
+        print(f"Replaying {len(documents)} documents x {args.repeat}, {args.concurrency} at a time")
+
+        lag = []
+        stop = threading.Event()
+        with AppServer() as server:
+            sampler = server.sample_loop_lag(stop, lag)
+            results, wall_seconds = asyncio.run(replay_corpus(server, documents, args))
+            stop.set()
+            sampler.result()
+    finally:
+        for fake in fakes.values():
+            fake.__exit__(None, None, None)
+
+    report = summarize(results, wall_seconds, lag, fakes, args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(report, json.load(f), args.max_regression):
+                return 1
+    return 0 if report["jobs"]["failed"] == 0 or args.allow_failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", nargs="*", default=[], help="documents, or folders of documents, to replay")
+    parser.add_argument("--synthetic", type=int, default=10, help="synthetic .docx documents to add")
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[20, 200, 1000],
+                        help="sizes of the synthetic documents, used in turn")
+    parser.add_argument("--repeat", type=int, default=1, help="times the corpus is replayed")
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs in flight at once")
+    parser.add_argument("--reuse-titles", action="store_true", help="upload under the same name each time (summary cache hits)")
+    parser.add_argument("--job-timeout", type=float, default=300)
+    for service, fake in SERVICES.items():
+        parser.add_argument(f"--{service}-latency", type=float, default=DEFAULT_LATENCY[service], help="seconds per request")
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+        parser.add_argument(f"--{service}-rate-limit", type=float, default=0.0, help="requests/second before 429 (0 = none)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the injected errors")
+    parser.add_argument("--set", action="append", default=[], metavar="SETTING=VALUE", help="app setting, e.g. SUMMARY_MODE=metadata")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="with --compare, exit with status 1 if a headline metric is this much worse")
+    parser.add_argument("--allow-failures", action="store_true", help="exit with status 0 even if jobs failed")
+    sys.exit(main(parser.parse_args()))
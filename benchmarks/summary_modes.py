@@ -0,0 +1,56 @@
+"""
+Benchmark: output tokens and latency of SUMMARY_MODE=full (Gemini echoes the
+article) versus SUMMARY_MODE=metadata (Gemini returns metadata only), per
+article size. The fake Gemini spends a fixed time per 200 characters of output.
+
+    python -m benchmarks.summary_modes --sizes 10 100 1000 --strategy excerpt
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from benchmarks.fakes import FakeGeminiServer
+
+
+def article(paragraphs: int) -> str:
+    return "".join(
+        f"<p>Paragraph {i} explains one more detail of the benchmark article in a full sentence.</p>"
+        for i in range(paragraphs)
+    )
+
+
+async def run(args):
+    with FakeGeminiServer(latency=args.latency, seconds_per_chunk=args.seconds_per_chunk) as gemini:
+        os.environ.update({
+            "NOTION_API_KEY": "benchmark",
+            "NOTION_PARENT_PAGE": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": gemini.url,
+            "SUMMARY_LONG_ARTICLE_STRATEGY": args.strategy,
+        })
+        from app.config import settings
+        from app.services import llm
+
+        print(f"{'paragraphs':>10}  {'mode':<9}{'calls':>6}{'prompt tok':>12}{'output tok':>12}{'latency':>10}")
+        for size in args.sizes:
+            html = article(size)
+            for mode in ("full", "metadata"):
+                settings.SUMMARY_MODE = mode
+                gemini.reset()
+                start = time.perf_counter()
+                await llm.summarize_text(f"Article {uuid.uuid4()}", html)
+                elapsed = time.perf_counter() - start
+                print(f"{size:>10}  {mode:<9}{gemini.request_count:>6}{gemini.prompt_tokens:>12}"
+                      f"{gemini.output_tokens:>12}{elapsed:>9.2f}s")
+        await llm.close_gemini_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--strategy", choices=["excerpt", "map_reduce"], default="excerpt")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake time to first token")
+    parser.add_argument("--seconds-per-chunk", type=float, default=0.02, help="fake generation time per 200 chars")
+    asyncio.run(run(parser.parse_args()))
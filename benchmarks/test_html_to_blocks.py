@@ -0,0 +1,71 @@
+"""
+Inputs the single-pass parser must not drop: loose text and unknown containers,
+as found in real .html uploads (read_files.read_html passes the body markup through).
+
+    python -m pytest benchmarks/test_html_to_blocks.py
+"""
+import os
+
+os.environ.setdefault("NOTION_API_KEY", "benchmark")
+os.environ.setdefault("NOTION_PARENT_PAGE", "benchmark")
+
+import pytest
+
+from app.services.notion import html_to_notion_blocks, iter_notion_blocks
+from benchmarks import legacy_converter
+from benchmarks.html_to_blocks import nested_lists_doc, paragraphs_doc
+
+
+def summary(blocks) -> list[tuple]:
+    """(type, [(text, annotations)]) of each block, or (type, url) for images."""
+    result = []
+    for block in blocks:
+        content = block[block["type"]]
+        if "rich_text" in content:
+            result.append((block["type"], [(item["text"]["content"], item.get("annotations")) for item in content["rich_text"]]))
+        else:
+            result.append((block["type"], content.get("external", {}).get("url")))
+    return result
+
+
+@pytest.mark.parametrize("html, expected", [
+    ("<div>Hello <b>world</b></div>", [("paragraph", [("Hello ", None), ("world", {"bold": True})])]),
+    ("Bare text", [("paragraph", [("Bare text", None)])]),
+    ("<figure><img src='https://example.com/a.png'></figure>", [("image", "https://example.com/a.png")]),
+    (
+        "<figure><img src='https://example.com/a.png'><figcaption>Caption</figcaption></figure>",
+        [("image", "https://example.com/a.png"), ("paragraph", [("Caption", None)])],
+    ),
+    (
+        "<body>\n  <p>First</p>\n  loose <i>text</i>\n  <h2>Title</h2>tail</body>",
+        [
+            ("paragraph", [("First", None)]),
+            ("paragraph", [("loose ", None), ("text", {"italic": True})]),
+            ("heading_2", [("Title", None)]),
+            ("paragraph", [("tail", None)]),
+        ],
+    ),
+    (
+        "<section><header>Top</header><article><p>Body</p>after</article></section>",
+        [("paragraph", [("Top", None)]), ("paragraph", [("Body", None)]), ("paragraph", [("after", None)])],
+    ),
+    ("<span>one</span><br>two", [("paragraph", [("one\ntwo", None)])]),
+    ("<script>var x = 1</script><style>p {}</style><p>ok</p>", [("paragraph", [("ok", None)])]),
+    ("<div>\n  \n</div>", []),
+])
+def test_loose_text_and_unknown_containers(html, expected):
+    assert summary(html_to_notion_blocks(html)) == expected
+
+
+@pytest.mark.parametrize("html", [
+    "<div>Hello <b>world</b> and more text</div><p>next</p>",
+    "<figure><img src='https://example.com/a.png'><figcaption>Caption</figcaption></figure>",
+])
+def test_streaming_matches_whole_document(html):
+    # Chunk boundaries fall inside text and tags
+    assert list(iter_notion_blocks(html, chunk_size=3)) == html_to_notion_blocks(html)
+
+
+@pytest.mark.parametrize("html", [paragraphs_doc(50), nested_lists_doc(4, 2, 3)])
+def test_matches_legacy_converter(html):
+    assert html_to_notion_blocks(html) == legacy_converter.html_to_notion_blocks(html)
@@ -0,0 +1,161 @@
+"""
+Memory under a sustained flood of uploads that are never started (abandoned jobs). Each
+configuration runs the app in its own process, uploads HTML documents for --duration
+seconds and samples the process RSS:
+
+- unbounded: job HTML kept uncompressed in memory, pending jobs never expire (as before)
+- bounded: HTML compressed, spilled to disk past --budget-mb, pending jobs expire after --ttl
+
+Exits with status 1 if the bounded run's RSS grew by more than --max-growth-mb over the
+second half of the flood.
+
+    python -m benchmarks.upload_flood --duration 30 --size-kb 500 --budget-mb 8 --ttl 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+WORDS = ("article notion summary gemini upload document paragraph heading image table list "
+         "reader editor agent publish draft review section content block page blog").split()
+
+
+def document(size: int, rng: random.Random) -> bytes:
+    """HTML of about `size` bytes, with different text every time."""
+    parts, length = [], 0
+    while length < size:
+        if rng.random() < 0.1:
+            part = f"<h2>{' '.join(rng.choices(WORDS, k=4)).title()}</h2>"
+        else:
+            part = f"<p>{' '.join(rng.choices(WORDS, k=40))}. <strong>{rng.randrange(10 ** 6)}</strong></p>"
+        parts.append(part)
+        length += len(part)
+    return "".join(parts).encode()
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux: peak RSS is the best available
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+async def flood(url: str, args) -> int:
+    import httpx
+
+    rng = random.Random(args.seed)
+    deadline = time.perf_counter() + args.duration
+    uploads = 0
+
+    async def uploader(client):
+        nonlocal uploads
+        while time.perf_counter() < deadline:
+            data = document(args.size_kb * 1024, rng)
+            response = await client.post(f"{url}/upload", files={"file": (f"post-{uploads}.html", data, "text/html")})
+            response.raise_for_status()
+            uploads += 1
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        await asyncio.gather(*(uploader(client) for _ in range(args.concurrency)))
+    return uploads
+
+
+def child(args) -> dict:
+    """Run the app in this process, flood it and report RSS samples as JSON."""
+    os.environ.update({
+        "NOTION_API_KEY": "benchmark", "NOTION_PARENT_PAGE": "benchmark", "GEMINI_API_KEY": "benchmark",
+        "LOG_LEVEL": "WARNING",
+    })
+    os.environ.update(dict(setting.split("=", 1) for setting in args.set))
+    from benchmarks.suite import AppServer
+    import httpx
+
+    samples = []
+    stop = threading.Event()
+
+    def sample():
+        start = time.perf_counter()
+        while not stop.is_set():
+            samples.append((time.perf_counter() - start, rss_mb()))
+            stop.wait(0.25)
+
+    with AppServer() as server:
+        url = f"http://127.0.0.1:{server.port}"
+        threading.Thread(target=sample, daemon=True).start()
+        uploads = asyncio.run(flood(url, args))
+        stop.set()
+        stats = httpx.get(f"{url}/jobs/stats").json()
+
+    half = [rss for t, rss in samples if t >= args.duration / 2]
+    return {
+        "uploads": uploads,
+        "start_rss_mb": samples[0][1],
+        "midway_rss_mb": half[0],
+        "end_rss_mb": samples[-1][1],
+        "peak_rss_mb": max(rss for _, rss in samples),
+        "second_half_growth_mb": samples[-1][1] - half[0],
+        "store": stats,
+    }
+
+
+CONFIGS = {
+    "unbounded": lambda args: [
+        "JOB_PAYLOAD_COMPRESSION=none", f"JOB_PAYLOAD_MEMORY_BYTES={10 ** 12}", "JOB_PENDING_TTL_SECONDS=0",
+    ],
+    "bounded": lambda args: [
+        "JOB_PAYLOAD_COMPRESSION=zlib", f"JOB_PAYLOAD_MEMORY_BYTES={int(args.budget_mb * 1024 * 1024)}",
+        f"JOB_PENDING_TTL_SECONDS={args.ttl}",
+    ],
+}
+
+
+def main(args) -> int:
+    print(f"{args.duration:.0f}s of {args.size_kb} KB uploads, {args.concurrency} at a time")
+    print(f"{'':<11}{'uploads':>8}{'start':>9}{'midway':>9}{'end':>9}{'peak':>9}{'growth':>9}"
+          f"{'pending':>9}{'in memory':>11}{'on disk':>9}  (MB)")
+    ok = True
+    for name, settings in CONFIGS.items():
+        command = [sys.executable, "-m", "benchmarks.upload_flood", "--child", *sys.argv[1:]]
+        for setting in settings(args):
+            command += ["--set", setting]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        payloads = result["store"].get("payloads", {})
+        print(f"{name:<11}{result['uploads']:>8}{result['start_rss_mb']:>9.0f}{result['midway_rss_mb']:>9.0f}"
+              f"{result['end_rss_mb']:>9.0f}{result['peak_rss_mb']:>9.0f}{result['second_half_growth_mb']:>9.1f}"
+              f"{result['store']['jobs'].get('pending', 0):>9}{payloads.get('resident_bytes', 0) / 2 ** 20:>11.1f}"
+              f"{payloads.get('spilled_bytes', 0) / 2 ** 20:>9.1f}")
+        if name == "bounded" and result["second_half_growth_mb"] > args.max_growth_mb:
+            print(f"bounded RSS grew by {result['second_half_growth_mb']:.1f} MB (limit {args.max_growth_mb} MB)")
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--size-kb", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--budget-mb", type=float, default=8)
+    parser.add_argument("--ttl", type=float, default=5)
+    parser.add_argument("--max-growth-mb", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--set", action="append", default=[], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(args)))
+    else:
+        sys.exit(main(args))
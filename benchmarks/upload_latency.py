@@ -0,0 +1,95 @@
+"""
+Concurrency benchmark for /upload: N simultaneous large .docx uploads,
+reporting p50/p99 upload latency and the latency of a cheap request (GET /)
+issued while the uploads are being converted.
+
+Starts the app with uvicorn on a local port:
+
+    python -m benchmarks.upload_latency --uploads 20 --size-mb 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+os.environ.setdefault("NOTION_API_KEY", "benchmark")
+os.environ.setdefault("NOTION_PARENT_PAGE", "benchmark")
+
+import httpx
+import uvicorn
+
+from benchmarks.docs import build_docx
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config("app.app:app", host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    response = await coro
+    return time.perf_counter() - start, response
+
+
+async def probe(client, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        elapsed, _ = await timed(client.get("/"))
+        latencies.append(elapsed)
+        await asyncio.sleep(0.05)
+
+
+async def run(args):
+    document = build_docx(paragraphs=200, image_bytes=int(args.size_mb * 2**20))
+    print(f"Document size: {len(document) / 2**20:.1f} MB, {args.uploads} concurrent uploads")
+
+    port = free_port()
+    server = start_server(port)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+        stop = asyncio.Event()
+        probe_latencies = []
+        probe_task = asyncio.create_task(probe(client, stop, probe_latencies))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            timed(client.post("/upload", files={"file": (f"Doc {i}.docx", document)}))
+            for i in range(args.uploads)
+        ))
+        total = time.perf_counter() - start
+        stop.set()
+        await probe_task
+
+    server.should_exit = True
+
+    latencies = [elapsed for elapsed, _ in results]
+    failures = [response.status_code for _, response in results if response.status_code != 200]
+    print(f"upload  p50 {percentile(latencies, 50):6.2f}s  p99 {percentile(latencies, 99):6.2f}s  "
+          f"total {total:.2f}s  failures {len(failures)}")
+    print(f"GET /   p50 {percentile(probe_latencies, 50) * 1000:6.1f}ms p99 {percentile(probe_latencies, 99) * 1000:6.1f}ms  "
+          f"max {max(probe_latencies) * 1000:.1f}ms  ({len(probe_latencies)} probes, mean "
+          f"{statistics.mean(probe_latencies) * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=10)
+    asyncio.run(run(parser.parse_args()))